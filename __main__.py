@@ -1,12 +1,161 @@
+import argparse
+import os
+import sys
+import time
 import unittest
 
+from components.CPU import CPU, NO_LIMIT
+from components.Loader import load
+from components.Vectors import run_files, vector_files
+
 
 def run_tests():
     loader = unittest.TestLoader()
-    suite = loader.discover('test')
+    suite = loader.discover('test', pattern='Test_*.py')
     runner = unittest.TextTestRunner(verbosity=2)
-    runner.run(suite)
+    return runner.run(suite).wasSuccessful()
+
+
+def address(text):
+    # 0x1234, $1234 or plain decimal
+    if text.startswith('$'):
+        text = '0x' + text[1:]
+    value = int(text, 0)
+    if not 0 <= value <= 0xFFFF:
+        raise argparse.ArgumentTypeError(f'{text} is not a 16-bit address')
+    return value
+
+
+def memory_range(text):
+    start, _, end = text.partition(':')
+    start = address(start)
+    end = address(end) if end else start + 0xFF
+    if end < start:
+        raise argparse.ArgumentTypeError(f'{text} ends before it starts')
+    return start, min(end, 0xFFFF)
+
+
+def format_registers(cpu):
+    return (f'PC:{cpu.pc:04X} A:{cpu.a:02X} X:{cpu.x:02X} Y:{cpu.y:02X} SP:{cpu.sp:04X} '
+            f'P:{cpu.p:02X} CYC:{cpu.taken_cycles}')
+
+
+def format_memory(cpu, start, end):
+    lines = []
+    for row in range(start & ~0x0F, end + 1, 16):
+        values = cpu.memory.dump(max(row, start), min(row + 16, end + 1))
+        pad = '   ' * (max(row, start) - row)
+        lines.append(f'{row:04X}  {pad}' + ' '.join(f'{value:02X}' for value in values))
+    return '\n'.join(lines)
+
+
+def run_program(args):
+    cpu = CPU()
+    try:
+        loaded = load(cpu.memory, args.path, base=args.base, reset=args.start is None)
+    except (OSError, ValueError) as error:
+        sys.exit(f'cannot load {args.path}: {error}')
+
+    # start from the reset vector unless told otherwise, a raw image that does not
+    # reach the vector gets one pointing at --base
+    cpu.reset(use_vector=True)
+    if args.start is not None:
+        cpu.pc = args.start
+
+    # stop in idle loops, unless there is a cycle budget to spend and no --trap
+    cpu.stop_on_trap = args.trap or args.cycles is None
+    cycles = NO_LIMIT if args.cycles is None and args.trap else args.cycles
+
+    start = time.perf_counter()
+    result = cpu.run_until(pc=args.until or None, cycles=cycles)
+    elapsed = time.perf_counter() - start
+
+    print(f'loaded {loaded} bytes from {args.path}')
+    print(f'stopped on {result.reason} at {result.pc:04X}')
+    print(f'{result.instructions} instructions, {result.cycles} cycles in {elapsed:.3f}s')
+    if result.skipped_cycles:
+        print(f'{result.skipped_instructions} instructions, {result.skipped_cycles} cycles '
+              f'skipped in idle loops')
+    # rates of what was actually run, skipped rounds take no time
+    if elapsed > 0:
+        print(f'{(result.instructions - result.skipped_instructions) / elapsed:,.0f} instructions/s')
+        print(f'{(result.cycles - result.skipped_cycles) / elapsed:,.0f} cycles/s')
+
+    if args.registers:
+        print(format_registers(cpu))
+    for start, end in args.dump:
+        print(format_memory(cpu, start, end))
+    return True
+
+
+def run_vectors(args):
+    if not os.path.isdir(args.directory):
+        sys.exit(f'{args.directory} is not a directory')
+    paths = vector_files(args.directory, args.opcode or None)
+    if not paths:
+        sys.exit(f'no test vector files for documented opcodes in {args.directory}')
+
+    start = time.perf_counter()
+    results = run_files(paths, args.workers)
+    elapsed = time.perf_counter() - start
+
+    passed = failed = 0
+    for result in results:
+        passed += result.passed
+        failed += result.failed
+        name = os.path.basename(result.path)
+        print(f'{name:10s} {result.passed:>8d} passed {result.failed:>8d} failed')
+        for case, errors in result.failures:
+            print(f'    {case}: ' + '; '.join(errors))
+
+    print(f'{passed} passed, {failed} failed, {len(results)} files in {elapsed:.1f}s')
+    return failed == 0
+
+
+def opcode(text):
+    value = int(text, 16)
+    if not 0 <= value <= 0xFF:
+        raise argparse.ArgumentTypeError(f'{text} is not an opcode')
+    return value
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python .', description='6502 emulator')
+    commands = parser.add_subparsers(dest='command')
+
+    commands.add_parser('test', help='run the unit tests (the default)')
+
+    run = commands.add_parser('run', help='load a program and run it headless')
+    run.add_argument('path', help='raw binary, iNES (.nes) or Intel HEX (.hex) image')
+    run.add_argument('--base', type=address, default=0, help='load address of a raw binary')
+    run.add_argument('--start', type=address, help='start here instead of the reset vector')
+    run.add_argument('--cycles', type=int, help='cycle budget')
+    run.add_argument('--until', type=address, action='append', default=[], metavar='PC',
+                     help='stop when PC reaches this address, may be repeated')
+    run.add_argument('--trap', action='store_true', help='stop when the program gets stuck in an idle loop (JMP *)')
+    run.add_argument('--registers', action='store_true', help='print the registers when done')
+    run.add_argument('--dump', type=memory_range, action='append', default=[], metavar='START[:END]',
+                     help='hex dump a memory range when done, may be repeated')
+
+    vectors = commands.add_parser('vectors', help='check every opcode against per-opcode JSON test vectors')
+    vectors.add_argument('directory', help='directory of <opcode>.json files, e.g. SingleStepTests 6502/v1')
+    vectors.add_argument('--opcode', type=opcode, action='append', default=[], metavar='HEX',
+                         help='only this opcode, may be repeated')
+    vectors.add_argument('--workers', type=int, help='processes to spread the files over, default one per CPU')
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'run':
+        if args.cycles is None and not args.until and not args.trap:
+            sys.exit('run needs --cycles, --until or --trap to know when to stop')
+        return run_program(args)
+    if args.command == 'vectors':
+        return run_vectors(args)
+    return run_tests()
 
 
 if __name__ == '__main__':
-    run_tests()
+    sys.exit(0 if main() else 1)
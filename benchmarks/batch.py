@@ -0,0 +1,38 @@
+import time
+
+from benchmarks.dispatch import PROGRAM_START, build_cpu, calibrate
+from components.Batch import BatchCPU
+
+BATCH_SIZES = [1, 16, 256, 1024]
+
+
+def run(count, repeats=8):
+    cpu, program_end = build_cpu(repeats)
+    cycles, instructions = calibrate(cpu, program_end)
+    cpu.pc = PROGRAM_START
+    cpu.taken_cycles = 0
+
+    batch = BatchCPU.from_cpus([cpu] * count)
+
+    start = time.perf_counter()
+    batch.execute(cycles)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'count': count,
+        'instructions': instructions * count,
+        'cycles': cycles * count,
+        'seconds': elapsed,
+        'ips': instructions * count / elapsed,
+        'cps': cycles * count / elapsed,
+    }
+
+
+def main():
+    for count in BATCH_SIZES:
+        result = run(count)
+        print(f"{count:5d} CPUs: {result['ips']:>14,.0f} instructions/s {result['cps']:>14,.0f} cycles/s")
+
+
+if __name__ == '__main__':
+    main()
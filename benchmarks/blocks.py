@@ -0,0 +1,43 @@
+import time
+
+from benchmarks.dispatch import PROGRAM_START, build_cpu, calibrate
+from components.Translator import BlockCache
+
+
+def run(passes=200, repeats=64, translate=True):
+    cpu, program_end = build_cpu(repeats)
+    cycles, instructions = calibrate(cpu, program_end)
+    cache = BlockCache(cpu)
+
+    # warm up so the timed passes run from the cache
+    if translate:
+        for _ in range(cache.threshold):
+            cpu.pc = PROGRAM_START
+            cache.execute(cycles)
+
+    start = time.perf_counter()
+    for _ in range(passes):
+        cpu.pc = PROGRAM_START
+        if translate:
+            cache.execute(cycles)
+        else:
+            cpu.execute(cycles)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'instructions': instructions * passes,
+        'cycles': cycles * passes,
+        'seconds': elapsed,
+        'ips': instructions * passes / elapsed,
+        'cps': cycles * passes / elapsed,
+    }
+
+
+def main():
+    for label, translate in (('interpreter', False), ('block cache', True)):
+        result = run(translate=translate)
+        print(f"{label:12s} {result['ips']:>14,.0f} instructions/s {result['cps']:>14,.0f} cycles/s")
+
+
+if __name__ == '__main__':
+    main()
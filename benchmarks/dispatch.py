@@ -0,0 +1,105 @@
+import time
+
+from components.CPU import CPU, OP_CODES
+
+PROGRAM_START = 0x0400
+DATA_VALUE = 0x30  # every load returns this, so X/Y stay put and no page is crossed
+
+# one instruction of each load/store opcode, operands chosen to stay inside
+# the zero page / 0x3000 data area filled with DATA_VALUE
+LOAD_STORE_SET = [
+    ('LDA_IMM', [DATA_VALUE]),
+    ('LDA_ZPG', [0x20]),
+    ('LDA_ZPX', [0x20]),
+    ('LDA_ABS', [0x00, 0x30]),
+    ('LDA_ABX', [0x00, 0x30]),
+    ('LDA_ABY', [0x00, 0x30]),
+    ('LDA_INX', [0x20]),
+    ('LDA_INY', [0x40]),
+    ('LDX_IMM', [DATA_VALUE]),
+    ('LDX_ZPG', [0x20]),
+    ('LDX_ZPY', [0x20]),
+    ('LDX_ABS', [0x00, 0x30]),
+    ('LDX_ABY', [0x00, 0x30]),
+    ('LDY_IMM', [DATA_VALUE]),
+    ('LDY_ZPG', [0x20]),
+    ('LDY_ZPX', [0x20]),
+    ('LDY_ABS', [0x00, 0x30]),
+    ('LDY_ABX', [0x00, 0x30]),
+    ('STA_ZPG', [0x20]),
+    ('STA_ZPX', [0x20]),
+    ('STA_ABS', [0x00, 0x30]),
+    ('STA_ABX', [0x00, 0x30]),
+    ('STA_ABY', [0x00, 0x30]),
+    ('STA_INX', [0x20]),
+    ('STA_INY', [0x40]),
+    ('STX_ZPG', [0x20]),
+    ('STX_ZPY', [0x20]),
+    ('STX_ABS', [0x00, 0x30]),
+    ('STY_ZPG', [0x20]),
+    ('STY_ZPX', [0x20]),
+    ('STY_ABS', [0x00, 0x30]),
+]
+
+
+def build_cpu(repeats=64):
+    cpu = CPU()
+    cpu.reset()
+    cpu.a, cpu.x, cpu.y = DATA_VALUE, DATA_VALUE, DATA_VALUE
+
+    for addr in range(0x0000, 0x0200):
+        cpu.memory.data[addr] = DATA_VALUE
+    for addr in range(0x3000, 0x3200):
+        cpu.memory.data[addr] = DATA_VALUE
+
+    addr = PROGRAM_START
+    for _ in range(repeats):
+        for name, operands in LOAD_STORE_SET:
+            cpu.memory.data[addr] = OP_CODES[name]
+            addr += 1
+            for operand in operands:
+                cpu.memory.data[addr] = operand
+                addr += 1
+
+    return cpu, addr
+
+
+def calibrate(cpu, program_end):
+    # step one instruction at a time to find the exact budget for one pass
+    cpu.pc = PROGRAM_START
+    cpu.taken_cycles = 0
+    instructions = 0
+    while cpu.pc < program_end:
+        cpu.execute(1)
+        instructions += 1
+    return cpu.taken_cycles, instructions
+
+
+def run(passes=200, repeats=64):
+    cpu, program_end = build_cpu(repeats)
+    cycles, instructions = calibrate(cpu, program_end)
+
+    start = time.perf_counter()
+    for _ in range(passes):
+        cpu.pc = PROGRAM_START
+        cpu.execute(cycles)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'instructions': instructions * passes,
+        'cycles': cycles * passes,
+        'seconds': elapsed,
+        'ips': instructions * passes / elapsed,
+        'cps': cycles * passes / elapsed,
+    }
+
+
+def main():
+    result = run()
+    print(f"{result['instructions']} instructions, {result['cycles']} cycles in {result['seconds']:.3f}s")
+    print(f"{result['ips']:,.0f} instructions/s")
+    print(f"{result['cps']:,.0f} cycles/s")
+
+
+if __name__ == '__main__':
+    main()
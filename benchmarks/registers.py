@@ -0,0 +1,91 @@
+import time
+
+from components.CPU import CPU, OP_CODES
+from components.Memory import MAX_MEMORY
+
+PROGRAM_START = 0x0400
+
+
+class DictMemory():
+
+    def __init__(self):
+        self.data = bytearray(MAX_MEMORY)
+
+
+class DictRegisters():
+    # the old layout: instance __dict__ and a self.memory.data double hop
+
+    def __init__(self):
+        self.pc, self.a, self.p = PROGRAM_START, 0, 0
+        self.memory = DictMemory()
+
+
+class SlotRegisters():
+
+    __slots__ = ('pc', 'a', 'p', 'memory', 'mem')
+
+    def __init__(self):
+        self.pc, self.a, self.p = PROGRAM_START, 0, 0
+        self.memory = DictMemory()
+        self.mem = self.memory.data
+
+
+def lda_sta_dict(regs, count):
+    # LDA $10 / STA $11 as the handlers spell it
+    for _ in range(count):
+        addr = regs.memory.data[regs.pc]
+        regs.pc += 1
+        regs.a = regs.memory.data[addr]
+        addr = regs.memory.data[regs.pc]
+        regs.pc += 1
+        regs.memory.data[addr] = regs.a
+        regs.pc = PROGRAM_START
+
+
+def lda_sta_slots(regs, count):
+    for _ in range(count):
+        addr = regs.mem[regs.pc]
+        regs.pc += 1
+        regs.a = regs.mem[addr]
+        addr = regs.mem[regs.pc]
+        regs.pc += 1
+        regs.mem[addr] = regs.a
+        regs.pc = PROGRAM_START
+
+
+def time_access(count=200000):
+    results = {}
+    for label, regs, loop in (('dict', DictRegisters(), lda_sta_dict), ('slots', SlotRegisters(), lda_sta_slots)):
+        regs.memory.data[PROGRAM_START] = 0x10
+        regs.memory.data[PROGRAM_START + 1] = 0x11
+        start = time.perf_counter()
+        loop(regs, count)
+        results[label] = count * 2 / (time.perf_counter() - start)
+    return results
+
+
+def time_cpu(passes=200, pairs=1024):
+    # a tight run of LDA $10 / STA $11 through the real core
+    cpu = CPU()
+    addr = PROGRAM_START
+    for _ in range(pairs):
+        cpu.memory.load(bytes([OP_CODES['LDA_ZPG'], 0x10, OP_CODES['STA_ZPG'], 0x11]), addr)
+        addr += 4
+    cycles = pairs * 6
+
+    start = time.perf_counter()
+    for _ in range(passes):
+        cpu.pc = PROGRAM_START
+        cpu.execute(cycles)
+    return passes * pairs * 2 / (time.perf_counter() - start)
+
+
+def main():
+    access = time_access()
+    print(f"dict + memory.data: {access['dict']:>14,.0f} instructions/s")
+    print(f"slots + mem:        {access['slots']:>14,.0f} instructions/s")
+    print(f"CPU LDA/STA loop:   {time_cpu():>14,.0f} instructions/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from collections import namedtuple
+
+from benchmarks.dispatch import DATA_VALUE, LOAD_STORE_SET
+from components.CPU import CPU, OP_CODES
+from components.Loader import load
+
+PROGRAM_START = 0x0400
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+# a workload this much slower than its baseline counts as a regression
+TOLERANCE = 0.15
+
+# image loaded at base, run from start for cycles per timed run,
+# setup(cpu) fills data and registers first
+Workload = namedtuple('Workload', ['name', 'image', 'base', 'start', 'cycles', 'setup'])
+
+
+def fill(cpu, start, end, value):
+    cpu.memory.load(bytes([value]) * (end - start), start)
+
+
+def jump_back():
+    return [OP_CODES['JMP_ABS'], PROGRAM_START & 0xFF, PROGRAM_START >> 8]
+
+
+def tight_load_store():
+    # LDA $10, STA $11, JMP back
+    image = [OP_CODES['LDA_ZPG'], 0x10, OP_CODES['STA_ZPG'], 0x11] + jump_back()
+    return Workload('tight_load_store', bytes(image), PROGRAM_START, PROGRAM_START, 300000, None)
+
+
+def indexed_sweep():
+    # copy 0x2000-0x20FF to 0x3000-0x30FF, over and over
+    image = [
+        OP_CODES['LDX_IMM'], 0x00,
+        OP_CODES['LDA_ABX'], 0x00, 0x20,
+        OP_CODES['STA_ABX'], 0x00, 0x30,
+        OP_CODES['INX_IMP'],
+        OP_CODES['BNE_REL'], 0xF7,
+    ] + jump_back()
+
+    def setup(cpu):
+        cpu.memory.load(bytes(range(256)), 0x2000)
+
+    return Workload('indexed_sweep', bytes(image), PROGRAM_START, PROGRAM_START, 300000, setup)
+
+
+def page_crossing():
+    # every indexed read carries into the next page
+    image = [
+        OP_CODES['LDA_ABX'], 0x01, 0x20,
+        OP_CODES['ADC_ABY'], 0x01, 0x21,
+        OP_CODES['LDA_INY'], 0x40,
+        OP_CODES['CMP_ABX'], 0x01, 0x22,
+        OP_CODES['ORA_INY'], 0x40,
+    ] + jump_back()
+
+    def setup(cpu):
+        cpu.x, cpu.y = 0xFF, 0xFF
+        cpu.memory.load(bytes([0x01, 0x20]), 0x40)
+
+    return Workload('page_crossing', bytes(image), PROGRAM_START, PROGRAM_START, 300000, setup)
+
+
+def load_store_set():
+    # one of every load/store opcode, as in benchmarks.dispatch
+    image = []
+    for _ in range(16):
+        for name, operands in LOAD_STORE_SET:
+            image += [OP_CODES[name]] + operands
+    image += jump_back()
+
+    def setup(cpu):
+        cpu.a, cpu.x, cpu.y = DATA_VALUE, DATA_VALUE, DATA_VALUE
+        fill(cpu, 0x0000, 0x0200, DATA_VALUE)
+        fill(cpu, 0x3000, 0x3200, DATA_VALUE)
+
+    return Workload('load_store_set', bytes(image), PROGRAM_START, PROGRAM_START, 300000, setup)
+
+
+def subroutine_calls():
+    # LDX #$10, JSR sub, DEX, BNE -6, JMP back; sub: CLC, ADC #$01, RTS
+    sub = PROGRAM_START + 0x20
+    image = [
+        OP_CODES['LDX_IMM'], 0x10,
+        OP_CODES['JSR_ABS'], sub & 0xFF, sub >> 8,
+        OP_CODES['DEX_IMP'],
+        OP_CODES['BNE_REL'], 0xFA,
+    ] + jump_back()
+    image += [0] * (sub - PROGRAM_START - len(image))
+    image += [OP_CODES['CLC_IMP'], OP_CODES['ADC_IMM'], 0x01, OP_CODES['RTS_IMP']]
+    return Workload('subroutine_calls', bytes(image), PROGRAM_START, PROGRAM_START, 300000, None)
+
+
+WORKLOADS = [tight_load_store, indexed_sweep, page_crossing, load_store_set, subroutine_calls]
+
+
+def rom_workload(path, cycles=1000000):
+    # a ROM image started from its own reset vector
+    def setup(cpu):
+        load(cpu.memory, path)
+        cpu.reset(use_vector=True)
+
+    return Workload(os.path.basename(path), b'', 0, None, cycles, setup)
+
+
+def prepare(workload):
+    cpu = CPU()
+    cpu.reset()
+    cpu.memory.load(workload.image, workload.base)
+    if workload.setup is not None:
+        workload.setup(cpu)
+    if workload.start is not None:
+        cpu.pc = workload.start
+    return cpu
+
+
+def measure(workload, repeat=5):
+    cpu = prepare(workload)
+    snapshot = cpu.snapshot()
+
+    # instruction count for exactly the cycles the timed runs execute
+    result = cpu.run_until(cycles=workload.cycles)
+    cycles, instructions = result.cycles, result.instructions
+
+    # best of repeat, from the same state each time
+    best = None
+    for _ in range(repeat):
+        cpu.restore(snapshot)
+        start = time.perf_counter()
+        cpu.execute(workload.cycles)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return {
+        'cycles': cycles,
+        'instructions': instructions,
+        'seconds': best,
+        'cps': cycles / best,
+        'ips': instructions / best,
+    }
+
+
+def run(workloads, repeat=5):
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'workloads': {workload.name: measure(workload, repeat) for workload in workloads},
+    }
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    # name -> (current / baseline ips, regressed) for workloads in both
+    rows = {}
+    for name, result in results['workloads'].items():
+        base = baseline.get('workloads', {}).get(name)
+        if base is None:
+            continue
+        ratio = result['ips'] / base['ips']
+        rows[name] = (ratio, ratio < 1 - tolerance)
+    return rows
+
+
+def report(results, comparison):
+    lines = [f"{'workload':20s} {'cycles/s':>14s} {'instructions/s':>16s} {'vs baseline':>12s}"]
+    for name, result in results['workloads'].items():
+        line = f"{name:20s} {result['cps']:>14,.0f} {result['ips']:>16,.0f}"
+        if name in comparison:
+            ratio, regressed = comparison[name]
+            line += f' {ratio:>11.2f}x' + ('  REGRESSION' if regressed else '')
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='6502 emulator throughput suite')
+    parser.add_argument('--only', action='append', metavar='NAME', help='run only these workloads')
+    parser.add_argument('--rom', action='append', default=[], metavar='PATH',
+                        help='also run a ROM image from its reset vector')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per workload, best is kept')
+    parser.add_argument('--output', metavar='PATH', help='write the results as JSON')
+    parser.add_argument('--baseline', default=BASELINE, metavar='PATH', help='baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='slowdown fraction that fails the run')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    workloads = [make() for make in WORKLOADS] + [rom_workload(path) for path in args.rom]
+    if args.only:
+        workloads = [workload for workload in workloads if workload.name in args.only]
+
+    results = run(workloads, args.repeat)
+
+    comparison = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            comparison = compare(results, json.load(f), args.tolerance)
+
+    print(report(results, comparison))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    # non-zero so scripts and CI notice a slowdown
+    return 1 if any(regressed for _, regressed in comparison.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,29 @@
+import time
+
+from benchmarks.dispatch import PROGRAM_START, build_cpu, calibrate
+from components.Trace import TraceBuffer
+
+
+def run(passes=200, repeats=64, trace=None):
+    cpu, program_end = build_cpu(repeats)
+    cycles, instructions = calibrate(cpu, program_end)
+    cpu.trace = trace
+
+    start = time.perf_counter()
+    for _ in range(passes):
+        cpu.pc = PROGRAM_START
+        cpu.execute(cycles)
+    elapsed = time.perf_counter() - start
+
+    return instructions * passes / elapsed
+
+
+def main():
+    plain = run()
+    traced = run(trace=TraceBuffer(1 << 16))
+    print(f'untraced: {plain:>14,.0f} instructions/s')
+    print(f'traced:   {traced:>14,.0f} instructions/s ({(plain - traced) / plain:.0%} slower)')
+
+
+if __name__ == '__main__':
+    main()
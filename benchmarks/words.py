@@ -0,0 +1,71 @@
+import time
+
+from components.CPU import CPU, OP_CODES
+from components.Memory import Memory
+
+PROGRAM_START = 0x0400
+
+
+def loop_word(mem, pc):
+    # the old fetch_bytes(2) loop
+    val = 0
+    for _ in range(2):
+        val |= mem[pc] << (8 * _)
+        pc += 1
+    return val
+
+
+def indexed_word(mem, pc):
+    return mem[pc] | (mem[(pc + 1) & 0xFFFF] << 8)
+
+
+def from_bytes_word(view, pc):
+    # no wrap at 0xFFFF, shown for comparison only
+    return int.from_bytes(view[pc:pc + 2], 'little')
+
+
+def time_fetches(count=300000):
+    memory = Memory()
+    mem, view = memory.data, memory.view
+    results = {}
+
+    for label, fetch, source in (('loop', loop_word, mem), ('indexed', indexed_word, mem),
+                                 ('from_bytes', from_bytes_word, view)):
+        start = time.perf_counter()
+        for pc in range(count):
+            fetch(source, pc & 0xFFFE)
+        results[label] = count / (time.perf_counter() - start)
+
+    # what the generated handlers do, no call at all
+    start = time.perf_counter()
+    for pc in range(count):
+        pc &= 0xFFFE
+        mem[pc] | (mem[(pc + 1) & 0xFFFF] << 8)
+    results['inline'] = count / (time.perf_counter() - start)
+    return results
+
+
+def time_absolute(passes=200, pairs=1024):
+    # LDA $2000 / STA $2001 through the real core
+    cpu = CPU()
+    addr = PROGRAM_START
+    for _ in range(pairs):
+        cpu.memory.load(bytes([OP_CODES['LDA_ABS'], 0x00, 0x20, OP_CODES['STA_ABS'], 0x01, 0x20]), addr)
+        addr += 6
+    cycles = pairs * 8
+
+    start = time.perf_counter()
+    for _ in range(passes):
+        cpu.pc = PROGRAM_START
+        cpu.execute(cycles)
+    return passes * pairs * 2 / (time.perf_counter() - start)
+
+
+def main():
+    for label, rate in time_fetches().items():
+        print(f'{label + " word fetch:":22s} {rate:>14,.0f} words/s')
+    print(f"{'CPU LDA/STA abs loop:':22s} {time_absolute():>14,.0f} instructions/s")
+
+
+if __name__ == '__main__':
+    main()
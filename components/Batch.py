@@ -0,0 +1,186 @@
+import numpy as np
+
+from components.CPU import CPU, CYCLES, OP_CODES, PAGE_PENALTY
+from components.Memory import MAX_MEMORY
+
+# addressing modes
+IMM, ZPG, ZPX, ZPY, ABS, ABX, ABY, INX, INY, NONE = range(10)
+MODES = {
+    'IMM': IMM, 'ZPG': ZPG, 'ZPX': ZPX, 'ZPY': ZPY, 'ABS': ABS,
+    'ABX': ABX, 'ABY': ABY, 'INX': INX, 'INY': INY,
+}
+
+# what the opcode does
+UNKNOWN, LOAD, STORE = range(3)
+
+# register read or written: a, x, y
+REG_A, REG_X, REG_Y = range(3)
+REGISTERS = {'A': REG_A, 'X': REG_X, 'Y': REG_Y}
+
+LENGTHS = {IMM: 2, ZPG: 2, ZPX: 2, ZPY: 2, ABS: 3, ABX: 3, ABY: 3, INX: 2, INY: 2}
+
+
+def build_tables():
+    # per-opcode columns so a whole batch decodes with a few gathers
+    kind = np.full(256, UNKNOWN, np.int64)
+    mode = np.full(256, NONE, np.int64)
+    reg = np.zeros(256, np.int64)
+    cycles = np.ones(256, np.int64)
+    length = np.ones(256, np.int64)
+    penalty = np.zeros(256, np.int64)
+
+    for name, code in OP_CODES.items():
+        mnemonic, addressing = name.split('_')
+        if mnemonic[:2] not in ('LD', 'ST'):
+            # only the load/store families are vectorized, the rest stay UNKNOWN
+            continue
+        m = MODES[addressing]
+        mode[code] = m
+        reg[code] = REGISTERS[mnemonic[2]]
+        length[code] = LENGTHS[m]
+        kind[code] = LOAD if mnemonic.startswith('LD') else STORE
+        cycles[code] = CYCLES[name]
+        penalty[code] = 1 if name in PAGE_PENALTY else 0
+
+    return kind, mode, reg, cycles, length, penalty
+
+
+KIND, MODE, REG, CYCLE, LENGTH, PENALTY = build_tables()
+
+
+class BatchCPU():
+
+    def __init__(self, count):
+        self.count = count
+
+        # registers, one lane per CPU
+        self.pc = np.zeros(count, np.int64)
+        self.sp = np.zeros(count, np.int64)
+
+        self.a = np.zeros(count, np.int64)
+        self.x = np.zeros(count, np.int64)
+        self.y = np.zeros(count, np.int64)
+
+        # processor status registers
+        self.c = np.zeros(count, np.uint8)
+        self.z = np.zeros(count, np.uint8)
+        self.i = np.zeros(count, np.uint8)
+        self.d = np.zeros(count, np.uint8)
+        self.b = np.zeros(count, np.uint8)
+        self.v = np.zeros(count, np.uint8)
+        self.n = np.zeros(count, np.uint8)
+
+        # every CPU's 64kB address space, one row each
+        self.memory = np.zeros((count, MAX_MEMORY), np.uint8)
+
+        self.taken_cycles = np.zeros(count, np.int64)
+
+    def reset(self):
+        self.pc[:] = 0xFFFC
+        self.sp[:] = 0x0100
+
+        self.a[:], self.x[:], self.y[:] = 0, 0, 0
+
+        for flag in (self.c, self.z, self.i, self.d, self.b, self.v, self.n):
+            flag[:] = 0
+
+        self.taken_cycles[:] = 0
+
+    def load(self, image, base=0, lanes=slice(None)):
+        # the same image into every selected row in one broadcast copy
+        image = np.frombuffer(image, np.uint8)
+        end = base + len(image)
+        if base < 0 or end > MAX_MEMORY:
+            raise ValueError(f'image of {len(image)} bytes does not fit at {base:#06x}')
+        self.memory[lanes, base:end] = image
+        return len(image)
+
+    @classmethod
+    def from_cpus(cls, cpus):
+        batch = cls(len(cpus))
+        for lane, cpu in enumerate(cpus):
+            batch.set_lane(lane, cpu)
+        return batch
+
+    def set_lane(self, lane, cpu):
+        self.memory[lane] = np.frombuffer(cpu.memory.data, np.uint8)
+        for name in ('pc', 'sp', 'a', 'x', 'y', 'c', 'z', 'i', 'd', 'b', 'v', 'n', 'taken_cycles'):
+            getattr(self, name)[lane] = getattr(cpu, name)
+
+    def get_lane(self, lane):
+        cpu = CPU()
+        cpu.memory.load(self.memory[lane].tobytes())
+        for name in ('pc', 'sp', 'a', 'x', 'y', 'c', 'z', 'i', 'd', 'b', 'v', 'n', 'taken_cycles'):
+            setattr(cpu, name, int(getattr(self, name)[lane]))
+        return cpu
+
+    def execute(self, expected_cycles):
+        # each lane runs its own budget down, like CPU.execute
+        remaining = np.broadcast_to(np.asarray(expected_cycles, np.int64), (self.count,)).copy()
+
+        lanes = np.flatnonzero(remaining > 0)
+        while lanes.size:
+            remaining[lanes] -= self.step(lanes)
+            lanes = lanes[remaining[lanes] > 0]
+
+    def step(self, lanes):
+        # run one instruction on every lane in `lanes`, return cycles used per lane
+        mem = self.memory
+        pc = self.pc[lanes]
+
+        # decode
+        op = mem[lanes, pc]
+        lo = mem[lanes, (pc + 1) & 0xFFFF].astype(np.int64)
+        hi = mem[lanes, (pc + 2) & 0xFFFF].astype(np.int64)
+
+        kind = KIND[op]
+        mode = MODE[op]
+        reg = REG[op]
+
+        x = self.x[lanes]
+        y = self.y[lanes]
+
+        # effective address for every mode, then pick per lane
+        zp_index = np.where(mode == ZPX, x, np.where(mode == ZPY, y, 0))
+        zero_page = (lo + zp_index) & 0xFF
+
+        absolute = lo | (hi << 8)
+        abs_index = np.where(mode == ABX, x, np.where(mode == ABY, y, 0))
+        indexed = (absolute + abs_index) & 0xFFFF
+
+        ptr = np.where(mode == INX, (lo + x) & 0xFF, lo)
+        pointer = mem[lanes, ptr].astype(np.int64) | (mem[lanes, (ptr + 1) & 0xFF].astype(np.int64) << 8)
+        post_indexed = (pointer + np.where(mode == INY, y, 0)) & 0xFFFF
+
+        addr = np.select(
+            [mode <= ZPY, mode <= ABY, mode <= INY],
+            [zero_page, indexed, post_indexed],
+            0,
+        )
+
+        crossed = np.where(mode == INY, pointer ^ post_indexed, absolute ^ indexed) & 0xFF00
+        cycles = CYCLE[op] + (PENALTY[op] & (crossed != 0))
+
+        # execute loads
+        is_load = kind == LOAD
+        value = np.where(mode == IMM, lo, mem[lanes, addr])
+
+        for register, code in ((self.a, REG_A), (self.x, REG_X), (self.y, REG_Y)):
+            hit = is_load & (reg == code)
+            register[lanes[hit]] = value[hit]
+
+        self.z[lanes[is_load]] = value[is_load] == 0
+        self.n[lanes[is_load]] = (value[is_load] & 0x80) != 0
+
+        # execute stores, each lane only touches its own row
+        is_store = kind == STORE
+        if is_store.any():
+            source = np.choose(reg, (self.a[lanes], self.x[lanes], self.y[lanes]))
+            mem[lanes[is_store], addr[is_store]] = source[is_store]
+
+        # unknown codes only take the fetch cycle
+        self.b[lanes[kind == UNKNOWN]] = 1
+
+        self.pc[lanes] = (pc + LENGTH[op]) & 0xFFFF
+        self.taken_cycles[lanes] += cycles
+        return cycles
@@ -0,0 +1,86 @@
+from components.Memory import MAX_MEMORY, PAGES
+
+
+class Device():
+    # read(address) -> byte and write(address, value) callbacks,
+    # None leaves that direction as plain RAM
+
+    def __init__(self, read=None, write=None):
+        self.read = read
+        self.write = write
+
+
+class ROM(Device):
+
+    def __init__(self):
+        # reads come straight from RAM, writes are dropped
+        super().__init__(write=self.ignore)
+
+    def ignore(self, address, value):
+        pass
+
+
+class Mirror(Device):
+
+    def __init__(self, bus, base, size):
+        # repeats base .. base + size - 1 across the mapped pages
+        self.bus = bus
+        self.base = base
+        self.size = size
+        super().__init__(read=self.read_mirror, write=self.write_mirror)
+
+    def target(self, address):
+        return self.base + (address - self.base) % self.size
+
+    def read_mirror(self, address):
+        return self.bus[self.target(address)]
+
+    def write_mirror(self, address, value):
+        self.bus[self.target(address)] = value
+
+
+class Bus():
+
+    __slots__ = ('ram', 'dirty', 'readers', 'writers')
+
+    def __init__(self, memory):
+        self.ram = memory.data
+        self.dirty = memory.dirty
+        # page -> callback, None for plain RAM
+        self.readers = [None] * PAGES
+        self.writers = [None] * PAGES
+
+    def __len__(self):
+        return MAX_MEMORY
+
+    def __getitem__(self, address):
+        read = self.readers[address >> 8]
+        if read is None:
+            return self.ram[address]
+        return read(address) & 0xFF
+
+    def __setitem__(self, address, value):
+        write = self.writers[address >> 8]
+        if write is None:
+            self.ram[address] = value
+            self.dirty[address >> 8] = 1
+        else:
+            write(address, value)
+
+    def pages(self, start, end):
+        if start & 0xFF or (end & 0xFF) != 0xFF or not 0 <= start <= end < MAX_MEMORY:
+            raise ValueError(f'{start:#06x}-{end:#06x} is not a whole range of pages')
+        return range(start >> 8, (end >> 8) + 1)
+
+    def map(self, start, end, device):
+        for page in self.pages(start, end):
+            self.readers[page] = device.read
+            self.writers[page] = device.write
+
+    def unmap(self, start, end):
+        for page in self.pages(start, end):
+            self.readers[page] = None
+            self.writers[page] = None
+
+    def mapped(self):
+        return any(self.readers) or any(self.writers)
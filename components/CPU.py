@@ -1,54 +1,135 @@
-from components.Memory import Memory
-
-OP_CODES = {
-    'TEST': 'X',
-    # LDA
-    'LDA_IMM': 0xA9,
-    'LDA_ZPG': 0xA5,
-    'LDA_ZPX': 0xB5,
-    'LDA_ABS': 0xAD,
-    'LDA_ABX': 0xBD,
-    'LDA_ABY': 0xB9,
-    'LDA_INX': 0xA1,
-    'LDA_INY': 0xB1,
-    # LDX
-    'LDX_IMM': 0xA2,
-    'LDX_ZPG': 0xA6,
-    'LDX_ZPY': 0xB6,
-    'LDX_ABS': 0xAE,
-    'LDX_ABY': 0xBE,
-    # LDY
-    'LDY_IMM': 0xA0,
-    'LDY_ZPG': 0xA4,
-    'LDY_ZPX': 0xB4,
-    'LDY_ABS': 0xAC,
-    'LDY_ABX': 0xBC,
-    # STA
-    'STA_ZPG': 0x85,
-    'STA_ZPX': 0x95,
-    'STA_ABS': 0x8D,
-    'STA_ABX': 0x9D,
-    'STA_ABY': 0x99,
-    'STA_INX': 0x81,
-    'STA_INY': 0x91,
-    # STX
-    'STX_ZPG': 0x86,
-    'STX_ZPY': 0x96,
-    'STX_ABS': 0x8E,
-    # STY
-    'STY_ZPG': 0x84,
-    'STY_ZPX': 0x94,
-    'STY_ABS': 0x8C,
-
-}
+from collections import namedtuple
+
+from components.Bus import Bus
+from components.Instructions import (branches, build_handlers, cycles, lengths, op_codes, page_penalty, poll_reads,
+                                     register_only)
+from components.Memory import MAX_MEMORY, Memory
+from components.Scheduler import NEVER
+
+# name -> opcode, base cycles (opcode fetch included) and the indexed reads that
+# take one more cycle when the index crosses a page, all from the INSTRUCTIONS table
+OP_CODES = op_codes()
+CYCLES = cycles()
+PAGE_PENALTY = page_penalty()
+
+# taken branches cost one more cycle, two if the target is on another page
+BRANCHES = branches()
+LENGTHS = lengths()
+REGISTER_ONLY = register_only()
+POLL_READS = poll_reads()
+
+# why run_until stopped, and where, cycles and instructions include the skipped
+# rounds of idle loops, which were never run
+RunResult = namedtuple('RunResult', ['reason', 'pc', 'cycles', 'instructions', 'skipped_cycles',
+                                     'skipped_instructions'], defaults=[0, 0])
+STOP_PC = 'pc'
+STOP_CYCLES = 'cycles'
+STOP_INSTRUCTIONS = 'instructions'
+STOP_PREDICATE = 'predicate'
+STOP_TRAP = 'trap'
+NO_LIMIT = 1 << 62
+
+# the stack lives in page 1, BRK jumps through the IRQ vector
+STACK = 0x0100
+NMI_VECTOR = 0xFFFA
+IRQ_VECTOR = 0xFFFE
+# pushing PC and P and reading the vector
+INTERRUPT_CYCLES = 7
+
+# jumps back of at most this many bytes are checked for closing an idle loop
+IDLE_LOOP_BYTES = 16
+SHORT_LOOP = 0x100 - IDLE_LOOP_BYTES
+# CPU.loops, keyed by the address a loop's jump back ends at
+LOOP_UNKNOWN = 0
+LOOP_IDLE = 1
+LOOP_BUSY = 2
+LOOP_POLL = 3
+# LOOP_TABLE, per opcode
+IN_BODY = 1
+CLOSES_LOOP = 2
+READS_ONE = 3
+
+Snapshot = namedtuple('Snapshot', ['pc', 'sp', 'a', 'x', 'y', 'p', 'taken_cycles', 'pages'])
+
+# status register bits
+C_FLAG = 0x01  # carry flag
+Z_FLAG = 0x02  # zero flag
+I_FLAG = 0x04  # interrupt disable
+D_FLAG = 0x08  # decimal mode
+B_FLAG = 0x10  # break command
+V_FLAG = 0x40  # overflow command
+N_FLAG = 0x80  # negative number
+UNUSED_FLAG = 0x20  # always set when P is pushed
+NZ_CLEAR = ~(N_FLAG | Z_FLAG) & 0xFF
+CMP_CLEAR = ~(N_FLAG | Z_FLAG | C_FLAG) & 0xFF
+ADC_CLEAR = ~(N_FLAG | V_FLAG | Z_FLAG | C_FLAG) & 0xFF
+BIT_CLEAR = ~(N_FLAG | V_FLAG | Z_FLAG) & 0xFF
+# bits PLP and RTI can load, B and bit 5 only exist on the stack
+STATUS_MASK = ~(B_FLAG | UNUSED_FLAG) & 0xFF
+
+# N and Z for every byte value, so loads set both with one mask
+NZ = [(Z_FLAG if value == 0 else 0) | (value & N_FLAG) for value in range(256)]
 
 """
 0x0000 - 0x00FF = zero page
 """
 
 
+class Trap(Exception):
+    # raised out of a handler when the program is stuck in a loop nothing can end,
+    # pc is the top of the loop and extra the penalty cycles of the jump back
+
+    def __init__(self, pc, extra):
+        super().__init__(pc)
+        self.pc = pc
+        self.extra = extra
+
+
+class Idle(Exception):
+    # raised out of a handler when a loop at pc..end will keep coming round
+    # unchanged until the next device event, every round taking cycles and
+    # instructions, so the run loop can skip the rounds that fit its budget
+
+    def __init__(self, pc, end, extra, cycles, instructions):
+        super().__init__(pc)
+        self.pc = pc
+        self.end = end
+        self.extra = extra
+        self.cycles = cycles
+        self.instructions = instructions
+
+
+# the breakpoint map of a run_until without pc, shared and never written
+NO_BREAKPOINTS = bytes(MAX_MEMORY)
+
+
+def breakpoint_map(pcs):
+    # one byte per address, so a breakpoint check is one index
+    if isinstance(pcs, int):
+        pcs = (pcs,)
+    bitmap = bytearray(MAX_MEMORY)
+    for pc in pcs:
+        bitmap[pc & 0xFFFF] = 1
+    return bitmap
+
+
+def flag(mask):
+    # one bit of P exposed as a 0/1 attribute
+    def get(self):
+        return 1 if self.p & mask else 0
+
+    def set(self, value):
+        self.p = (self.p | mask) if value else (self.p & ~mask)
+
+    return property(get, set)
+
+
 class CPU():
 
+    # fixed register file, no per-instance __dict__
+    __slots__ = ('pc', 'sp', 'a', 'x', 'y', 'p', 'memory', 'mem', 'dirty', 'bus', 'taken_cycles', 'trace', 'profiler',
+                 'irq', 'nmi', 'pending', 'scheduler', 'loops', 'loop_state', 'stop_on_trap', 'trapped')
+
     def __init__(self):
         # registers
         self.pc = 0  # program counter
@@ -58,433 +139,624 @@ class CPU():
         self.x = 0   # index register X
         self.y = 0   # index register Y
 
-        # processor status registers
-        self.c = 0  # carry flag
-        self.z = 0  # zero flag
-        self.i = 0  # interrupt disable
-        self.d = 0  # decimal mode
-        self.b = 0  # break command
-        self.v = 0  # overflow command
-        self.n = 0  # negative number
+        # processor status register, NV-BDIZC
+        self.p = 0
 
         self.memory = Memory()
-
-        # test use
+        # the backing bytearray, one hop instead of self.memory.data,
+        # or the bus once mapped regions are attached
+        self.mem = self.memory.data
+        self.bus = None
+        # pages stores have touched since the last snapshot or restore
+        self.dirty = self.memory.dirty
+
+        # cycles run since the last reset
         self.taken_cycles = 0
 
+        # optional TraceBuffer / TraceFile sink, see components.Trace
+        self.trace = None
+        # optional Profiler, see components.Profiler
+        self.profiler = None
+
+        # interrupt lines: irq has one bit per asserting source, nmi is a latched edge,
+        # pending is nonzero while either needs looking at between instructions
+        self.irq = 0
+        self.nmi = 0
+        self.pending = 0
+
+        # optional Scheduler of device events, see components.Scheduler
+        self.scheduler = None
+
+        # idle loop detection: what is known about each short loop, the registers
+        # the last one came round with, and the loop top the last run stopped
+        # in, None if it did not
+        self.loops = {}
+        self.loop_state = None
+        self.stop_on_trap = True
+        self.trapped = None
+
+    c = flag(C_FLAG)
+    z = flag(Z_FLAG)
+    i = flag(I_FLAG)
+    d = flag(D_FLAG)
+    b = flag(B_FLAG)
+    v = flag(V_FLAG)
+    n = flag(N_FLAG)
+
     def fetch_byte(self):
-        val = self.memory.data[self.pc]
-        self.pc += 1
+        val = self.mem[self.pc]
+        self.pc = (self.pc + 1) & 0xFFFF
         return val
 
+    def fetch_word(self):
+        # little-endian 16-bit operand, two indexed reads instead of a loop
+        pc = self.pc
+        mem = self.mem
+        self.pc = (pc + 2) & 0xFFFF
+        return mem[pc] | (mem[(pc + 1) & 0xFFFF] << 8)
+
+    def read_word(self, address):
+        mem = self.mem
+        return mem[address] | (mem[(address + 1) & 0xFFFF] << 8)
+
     def fetch_bytes(self, bytes):
+        if bytes == 2:
+            return self.fetch_word()
         val = 0
         for _ in range(bytes):
-            val |= self.memory.data[self.pc] << (8 * _)
-            self.pc += 1
+            val |= self.mem[self.pc] << (8 * _)
+            self.pc = (self.pc + 1) & 0xFFFF
         return val
 
     def fetch_bytes_from_location(self, loc, bytes):
+        if bytes == 2:
+            return self.read_word(loc)
         val = 0
         for _ in range(bytes):
-            val |= self.memory.data[loc] << (8 * _)
-            loc += 1
+            val |= self.mem[loc] << (8 * _)
+            loc = (loc + 1) & 0xFFFF
         return val
 
     def read(self, address):
-        instruction = self.memory.data[address]
-        return instruction
-
-    def reset(self):
-        self.pc = 0xFFFC
+        return self.mem[address]
+
+    def attach_bus(self, bus=None):
+        # every access goes through the bus page table from now on
+        if bus is None:
+            bus = Bus(self.memory)
+        self.bus = bus
+        self.mem = bus
+        return bus
+
+    def detach_bus(self):
+        # back to indexing RAM directly
+        self.bus = None
+        self.mem = self.memory.data
+
+    def reset(self, use_vector=False):
+        # programs start at 0xFFFC, or wherever the vector stored there points
+        self.pc = self.read_word(0xFFFC) if use_vector else 0xFFFC
         self.sp = 0x0100
 
         self.a, self.x, self.y = 0, 0, 0
 
-        self.c, self.z, self.i, self.d, self.b, self.v, self.n = 0, 0, 0, 0, 0, 0, 0
+        self.p = 0
 
-    def execute(self, expected_cycles):
+        self.taken_cycles = 0
 
-        def consume_cycles(self, cycles):
-            nonlocal expected_cycles
-            self.taken_cycles += cycles
-            expected_cycles -= cycles
+        # a latched NMI does not survive reset, devices keep holding IRQ
+        self.nmi = 0
+        self.pending = self.irq
+
+        self.forget_loops()
+        self.trapped = None
+
+    def assert_irq(self, source=1):
+        # level triggered, stays asserted until every source deasserts it
+        self.irq |= source
+        self.pending = self.irq | self.nmi
+
+    def deassert_irq(self, source=1):
+        self.irq &= ~source
+        self.pending = self.irq | self.nmi
+
+    def trigger_nmi(self):
+        # edge triggered, serviced once
+        self.nmi = 1
+        self.pending = 1
+
+    def interrupt(self):
+        # called at an instruction boundary while pending is set,
+        # returns the cycles interrupt entry took, 0 if IRQ is masked
+        if self.nmi:
+            self.nmi = 0
+            self.pending = self.irq
+            vector = NMI_VECTOR
+        elif not self.p & I_FLAG:
+            vector = IRQ_VECTOR
+        else:
+            return 0
+
+        self.enter_interrupt(vector, self.pc, self.p & ~B_FLAG)
+        return INTERRUPT_CYCLES
+
+    def enter_interrupt(self, vector, ret, status):
+        self.push(ret >> 8)
+        self.push(ret & 0xFF)
+        self.push(status | UNUSED_FLAG)
+        self.p |= I_FLAG
+        self.pc = self.read_word(vector)
+
+    def forget_loops(self):
+        # what the loops were classified as only holds for the code that was there
+        self.loops.clear()
+        self.loop_state = None
+
+    def loop_back(self, start, end, extra):
+        # a jump back to start by the instruction ending at end, returns its
+        # penalty cycles, or raises Trap once the loop can never be left and
+        # Idle while it only waits for a device event
+        loops = self.loops
+        kind = loops.get(end, LOOP_UNKNOWN)
+        if kind == LOOP_UNKNOWN:
+            kind = loops[end] = self.scan_loop(start, end)[0]
+        if kind == LOOP_BUSY:
+            return extra
+
+        state = (end, self.a, self.x, self.y, self.p, self.sp)
+        if state != self.loop_state:
+            self.loop_state = state
+            return extra
+
+        # round again with the same registers, only an interrupt or a device
+        # can change what the loop does from here
+        if self.nmi or (self.irq and not self.p & I_FLAG):
+            return extra
+        kind, polled = self.scan_loop(start, end)
+        if kind == LOOP_BUSY:
+            # rewritten since it was classified
+            loops[end] = LOOP_BUSY
+            return extra
+        if self.bus is not None and self.on_device(start, end, polled):
+            return extra
+        body = self.spins(start)
+        if body is None:
+            return extra
+
+        scheduler = self.scheduler
+        if self.stop_on_trap and (scheduler is None or scheduler.deadline >= NEVER):
+            raise Trap(start, extra)
+        cycles, instructions = body
+        raise Idle(start, end, extra, cycles + extra, instructions)
+
+    def scan_loop(self, start, end):
+        # (LOOP_IDLE, None) if start..end is register-only instructions closed by a
+        # jump back to start, (LOOP_POLL, address) if they also read one fixed
+        # address, (LOOP_BUSY, None) for anything else
+        mem = self.mem
+        polled = None
+        pc = start
+        while pc < end:
+            ins = mem[pc]
+            part = LOOP_TABLE[ins]
+            following = pc + LENGTH_TABLE[ins]
+            if following == end and part == CLOSES_LOOP:
+                if ins == OP_CODES['JMP_ABS']:
+                    target = self.read_word(pc + 1)
+                else:
+                    offset = mem[pc + 1]
+                    target = (end + offset - ((offset & 0x80) << 1)) & 0xFFFF
+                if target != start:
+                    break
+                return (LOOP_IDLE, None) if polled is None else (LOOP_POLL, polled)
+            if part == READS_ONE:
+                address = self.read_word(pc + 1) if following - pc == 3 else mem[pc + 1]
+                if polled is not None and address != polled:
+                    break
+                polled = address
+            elif part != IN_BODY:
+                break
+            pc = following
+        return LOOP_BUSY, None
+
+    def on_device(self, start, end, polled):
+        # whether a device answers reads of the loop's code or the address it polls
+        readers = self.bus.readers
+        pages = {start >> 8, (end - 1) >> 8}
+        if polled is not None:
+            pages.add(polled >> 8)
+        return any(readers[page] is not None for page in pages)
+
+    def spins(self, start):
+        # runs the body of a scanned loop once more from the top, returns its
+        # cycles and instructions if that left every register as it was
+        mem = self.mem
+        registers = (self.a, self.x, self.y, self.p, self.sp)
+        cycles = 0
+        instructions = 0
+        pc = start
+        ins = mem[pc]
+        while LOOP_TABLE[ins] != CLOSES_LOOP:
+            self.pc = pc + 1
+            cycles += CYCLE_TABLE[ins] + OPCODE_TABLE[ins](self)
+            instructions += 1
+            pc += LENGTH_TABLE[ins]
+            ins = mem[pc]
+        # and the jump back, less its penalty
+        cycles += CYCLE_TABLE[ins]
+        instructions += 1
+
+        spinning = (self.a, self.x, self.y, self.p, self.sp) == registers
+        self.a, self.x, self.y, self.p, self.sp = registers
+        self.pc = start
+        return (cycles, instructions) if spinning else None
+
+    def snapshot(self):
+        return Snapshot(self.pc, self.sp, self.a, self.x, self.y, self.p, self.taken_cycles,
+                        self.memory.snapshot())
+
+    def restore(self, snapshot):
+        self.pc, self.sp, self.a, self.x, self.y, self.p, self.taken_cycles = snapshot[:7]
+        self.memory.restore(snapshot.pages)
+        self.forget_loops()
+
+    def execute(self, expected_cycles):
+        # stops early, with trapped set, if the program gets stuck in an idle loop
+        self.trapped = None
+        if self.trace is not None or self.profiler is not None:
+            run = self.execute_instrumented
+        else:
+            run = self.execute_fast
+
+        scheduler = self.scheduler
+        if scheduler is None:
+            return run(expected_cycles)
+
+        # run unchecked up to the next device deadline, then let due devices catch up
+        end = self.taken_cycles + expected_cycles
+        while self.taken_cycles < end and self.trapped is None:
+            deadline = scheduler.deadline
+            run(min(end, deadline) - self.taken_cycles)
+            if self.taken_cycles >= deadline:
+                scheduler.run(self.taken_cycles)
+
+    def execute_fast(self, expected_cycles):
+        table = OPCODE_TABLE
+        cycle_table = CYCLE_TABLE
+        taken = self.taken_cycles
 
         # fetch instruction each cycle
         while expected_cycles > 0:
 
-            ins = self.fetch_byte()
-            consume_cycles(self, 1)
-
-            if ins == OP_CODES['LDA_IMM']:
-                # load
-                self.a = self.fetch_byte()
-                consume_cycles(self, 1)
-
-                self.z = 1 if self.a == 0 else 0
-                self.n = 1 if (self.a & 0x80) != 0 else 0
-
-            elif ins == OP_CODES['LDA_ZPG']:
-                addr = self.fetch_byte()
-                consume_cycles(self, 1)
-
-                # load
-                self.a = self.read(addr)
-                consume_cycles(self, 1)
-
-                self.z = 1 if self.a == 0 else 0
-                self.n = 1 if (self.a & 0x80) != 0 else 0
-
-            elif ins == OP_CODES['LDA_ZPX']:
-                zero_page_addr = self.fetch_byte()
-                consume_cycles(self, 1)
-
-                addr = zero_page_addr + self.x
-                consume_cycles(self, 1)
-
-                # load
-                self.a = self.read(addr)
-                consume_cycles(self, 1)
-
-                self.z = 1 if self.a == 0 else 0
-                self.n = 1 if (self.a & 0x80) != 0 else 0
-
-            elif ins == OP_CODES['LDA_ABS']:
-                addr = self.fetch_bytes(bytes=2)
-                consume_cycles(self, 2)
-
-                # load
-                self.a = self.read(addr)
-                consume_cycles(self, 1)
-
-                self.z = 1 if self.a == 0 else 0
-                self.n = 1 if (self.a & 0x80) != 0 else 0
-
-            elif ins == OP_CODES['LDA_ABX']:
-                addr = self.fetch_bytes(bytes=2)
-                consume_cycles(self, 2)
-
-                og_pg = addr & 0xFF00
-                new_addr = addr + self.x
-                # load
-                self.a = self.read(new_addr)
-                consume_cycles(self, 1)
-
-                new_pg = new_addr & 0xFF00
-                if og_pg != new_pg:
-                    consume_cycles(self, 1)
-
-                self.z = 1 if self.a == 0 else 0
-                self.n = 1 if (self.a & 0x80) != 0 else 0
-
-            elif ins == OP_CODES['LDA_ABY']:
-                addr = self.fetch_bytes(bytes=2)
-                consume_cycles(self, 2)
-
-                og_pg = addr & 0xFF00
-                new_addr = addr + self.y
-                # load
-                self.a = self.read(new_addr)
-                consume_cycles(self, 1)
-
-                new_pg = new_addr & 0xFF00
-                if og_pg != new_pg:
-                    consume_cycles(self, 1)
-
-                self.z = 1 if self.a == 0 else 0
-                self.n = 1 if (self.a & 0x80) != 0 else 0
-
-            elif ins == OP_CODES['LDA_INX']:
-                addr = self.fetch_byte()
-                consume_cycles(self, 1)
-
-                addr += self.x
-                consume_cycles(self, 1)
-
-                val_addr = self.fetch_bytes_from_location(loc=addr, bytes=2)
-                consume_cycles(self, 2)
-
-                # load
-                self.a = self.read(val_addr)
-                consume_cycles(self, 1)
-
-                self.z = 1 if self.a == 0 else 0
-                self.n = 1 if (self.a & 0x80) != 0 else 0
-
-            elif ins == OP_CODES['LDA_INY']:
-                zp_addr = self.fetch_byte()
-                consume_cycles(self, 1)
-
-                addr = self.fetch_bytes_from_location(loc=zp_addr, bytes=2)
-                consume_cycles(self, 2)
-
-                og_pg = addr & 0xFF00
-                new_addr = addr + self.y
-
-                # load
-                self.a = self.read(new_addr)
-                consume_cycles(self, 1)
-
-                new_pg = new_addr & 0xFF00
-                if og_pg != new_pg:
-                    consume_cycles(self, 1)
-
-                self.z = 1 if self.a == 0 else 0
-                self.n = 1 if (self.a & 0x80) != 0 else 0
-
-            elif ins == OP_CODES['LDX_IMM']:
-                # load
-                self.x = self.fetch_byte()
-                consume_cycles(self, 1)
-
-                self.z = 1 if self.a == 0 else 0
-                self.n = 1 if (self.a & 0x80) != 0 else 0
-
-            elif ins == OP_CODES['LDX_ZPG']:
-                addr = self.fetch_byte()
-                consume_cycles(self, 1)
-
-                # load
-                self.x = self.read(addr)
-                consume_cycles(self, 1)
-
-                self.z = 1 if self.a == 0 else 0
-                self.n = 1 if (self.a & 0x80) != 0 else 0
-
-            elif ins == OP_CODES['LDX_ZPY']:
-                zero_page_addr = self.fetch_byte()
-                consume_cycles(self, 1)
-
-                addr = zero_page_addr + self.y
-                consume_cycles(self, 1)
-
-                # load
-                self.x = self.read(addr)
-                consume_cycles(self, 1)
+            if self.pending:
+                cycles = self.interrupt()
+                if cycles:
+                    taken += cycles
+                    expected_cycles -= cycles
+                    continue
 
-                self.z = 1 if self.a == 0 else 0
-                self.n = 1 if (self.a & 0x80) != 0 else 0
-
-            elif ins == OP_CODES['LDX_ABS']:
-                addr = self.fetch_bytes(bytes=2)
-                consume_cycles(self, 2)
-
-                # load
-                self.x = self.read(addr)
-                consume_cycles(self, 1)
-
-                self.z = 1 if self.a == 0 else 0
-                self.n = 1 if (self.a & 0x80) != 0 else 0
-
-            elif ins == OP_CODES['LDX_ABY']:
-                addr = self.fetch_bytes(bytes=2)
-                consume_cycles(self, 2)
-
-                og_pg = addr & 0xFF00
-                new_addr = addr + self.y
-                # load
-                self.x = self.read(new_addr)
-                consume_cycles(self, 1)
-
-                new_pg = new_addr & 0xFF00
-                if og_pg != new_pg:
-                    consume_cycles(self, 1)
-
-            elif ins == OP_CODES['LDY_IMM']:
-                # load
-                self.y = self.fetch_byte()
-                consume_cycles(self, 1)
-
-                self.z = 1 if self.a == 0 else 0
-                self.n = 1 if (self.a & 0x80) != 0 else 0
-
-            elif ins == OP_CODES['LDY_ZPG']:
-                addr = self.fetch_byte()
-                consume_cycles(self, 1)
-
-                # load
-                self.y = self.read(addr)
-                consume_cycles(self, 1)
-
-                self.z = 1 if self.a == 0 else 0
-                self.n = 1 if (self.a & 0x80) != 0 else 0
-
-            elif ins == OP_CODES['LDY_ZPX']:
-                zero_page_addr = self.fetch_byte()
-                consume_cycles(self, 1)
-
-                addr = zero_page_addr + self.x
-                consume_cycles(self, 1)
-
-                # load
-                self.y = self.read(addr)
-                consume_cycles(self, 1)
-
-                self.z = 1 if self.a == 0 else 0
-                self.n = 1 if (self.a & 0x80) != 0 else 0
-
-            elif ins == OP_CODES['LDY_ABS']:
-                addr = self.fetch_bytes(bytes=2)
-                consume_cycles(self, 2)
-
-                # load
-                self.y = self.read(addr)
-                consume_cycles(self, 1)
-
-                self.z = 1 if self.a == 0 else 0
-                self.n = 1 if (self.a & 0x80) != 0 else 0
-
-            elif ins == OP_CODES['LDY_ABX']:
-                addr = self.fetch_bytes(bytes=2)
-                consume_cycles(self, 2)
-
-                og_pg = addr & 0xFF00
-                new_addr = addr + self.x
-                # load
-                self.y = self.read(new_addr)
-                consume_cycles(self, 1)
-
-                new_pg = new_addr & 0xFF00
-                if og_pg != new_pg:
-                    consume_cycles(self, 1)
-
-            elif ins == OP_CODES['STA_ZPG']:
-                addr = self.fetch_byte()
-                consume_cycles(self, 1)
-
-                # load
-                self.memory.data[addr] = self.a
-                consume_cycles(self, 1)
-
-            elif ins == OP_CODES['STA_ZPX']:
-                zero_page_addr = self.fetch_byte()
-                consume_cycles(self, 1)
-
-                addr = zero_page_addr + self.x
-                consume_cycles(self, 1)
-
-                # load
-                self.memory.data[addr] = self.a
-                consume_cycles(self, 1)
-
-            elif ins == OP_CODES['STA_ABS']:
-                addr = self.fetch_bytes(bytes=2)
-                consume_cycles(self, 2)
-
-                # load
-                self.memory.data[addr] = self.a
-                consume_cycles(self, 1)
-
-            elif ins == OP_CODES['STA_ABX']:
-                addr = self.fetch_bytes(bytes=2)
-                consume_cycles(self, 2)
-
-                new_addr = addr + self.x
-                consume_cycles(self, 1)
-
-                # load
-                self.memory.data[new_addr] = self.a
-                consume_cycles(self, 1)
-
-            elif ins == OP_CODES['STA_ABY']:
-                addr = self.fetch_bytes(bytes=2)
-                consume_cycles(self, 2)
-
-                new_addr = addr + self.y
-                consume_cycles(self, 1)
-
-                # load
-                self.memory.data[new_addr] = self.a
-                consume_cycles(self, 1)
-
-            elif ins == OP_CODES['STA_INX']:
-                addr = self.fetch_byte()
-                consume_cycles(self, 1)
-
-                addr += self.x
-                consume_cycles(self, 1)
-
-                val_addr = self.fetch_bytes_from_location(loc=addr, bytes=2)
-                consume_cycles(self, 2)
-
-                # load
-                self.memory.data[val_addr] = self.a
-                consume_cycles(self, 1)
-
-            elif ins == OP_CODES['STA_INY']:
-                zp_addr = self.fetch_byte()
-                consume_cycles(self, 1)
-
-                addr = self.fetch_bytes_from_location(loc=zp_addr, bytes=2)
-                consume_cycles(self, 2)
-
-                new_addr = addr + self.y
-                consume_cycles(self, 1)
-
-                # load
-                self.memory.data[new_addr] = self.a
-                consume_cycles(self, 1)
-
-            elif ins == OP_CODES['STX_ZPG']:
-                addr = self.fetch_byte()
-                consume_cycles(self, 1)
-
-                # load
-                self.memory.data[addr] = self.x
-                consume_cycles(self, 1)
-
-            elif ins == OP_CODES['STX_ZPY']:
-                zero_page_addr = self.fetch_byte()
-                consume_cycles(self, 1)
-
-                addr = zero_page_addr + self.y
-                consume_cycles(self, 1)
-
-                # load
-                self.memory.data[addr] = self.x
-                consume_cycles(self, 1)
-
-            elif ins == OP_CODES['STX_ABS']:
-                addr = self.fetch_bytes(bytes=2)
-                consume_cycles(self, 2)
-
-                # load
-                self.memory.data[addr] = self.x
-                consume_cycles(self, 1)
-
-            elif ins == OP_CODES['STY_ZPG']:
-                addr = self.fetch_byte()
-                consume_cycles(self, 1)
-
-                # load
-                self.memory.data[addr] = self.y
-                consume_cycles(self, 1)
-
-            elif ins == OP_CODES['STY_ZPX']:
-                zero_page_addr = self.fetch_byte()
-                consume_cycles(self, 1)
-
-                addr = zero_page_addr + self.x
-                consume_cycles(self, 1)
+            ins = self.fetch_byte()
 
-                # load
-                self.memory.data[addr] = self.y
-                consume_cycles(self, 1)
+            try:
+                # base cycles + page-crossing penalty, charged once
+                cycles = cycle_table[ins] + table[ins](self)
+            except Trap as trap:
+                taken += cycle_table[ins] + trap.extra
+                self.trapped = trap.pc
+                break
+            except Idle as idle:
+                cycles = cycle_table[ins] + idle.extra
+                # skip the rounds that end before the budget does and
+                # step through the last one as usual
+                rounds = (expected_cycles - cycles - 1) // idle.cycles
+                if rounds > 0:
+                    cycles += rounds * idle.cycles
+            taken += cycles
+            expected_cycles -= cycles
 
-            elif ins == OP_CODES['STY_ABS']:
-                addr = self.fetch_bytes(bytes=2)
-                consume_cycles(self, 2)
+        self.taken_cycles = taken
+
+    def execute_instrumented(self, expected_cycles):
+        # same loop, feeding the trace sink and/or the profiler
+        table = OPCODE_TABLE
+        cycle_table = CYCLE_TABLE
+        taken = self.taken_cycles
+        mem = self.mem
+
+        trace = self.trace
+        if trace is not None:
+            pack = trace.pack
+            buf = trace.buf
+            capacity = trace.capacity
+            size = len(buf) // capacity
+            index = trace.index
+
+        profiler = self.profiler
+        if profiler is not None:
+            op_hits = profiler.op_hits
+            op_penalty = profiler.op_penalty
+            pc_hits = profiler.pc_hits
+            pc_cycles = profiler.pc_cycles
 
-                # load
-                self.memory.data[addr] = self.y
-                consume_cycles(self, 1)
+        while expected_cycles > 0:
 
-            elif ins == OP_CODES['TEST']:
-                pass
+            if self.pending:
+                cycles = self.interrupt()
+                if cycles:
+                    taken += cycles
+                    expected_cycles -= cycles
+                    continue
+
+            pc = self.pc
+            ins = mem[pc]
+            if trace is not None:
+                pack(buf, index * size, pc, ins, mem[(pc + 1) & 0xFFFF], mem[(pc + 2) & 0xFFFF],
+                     self.a, self.x, self.y, self.sp, self.p, taken)
+                index += 1
+                if index == capacity:
+                    trace.full()
+                    index = trace.index
+            self.pc = (pc + 1) & 0xFFFF
+
+            try:
+                extra = table[ins](self)
+            except Trap as trap:
+                extra = trap.extra
+                self.trapped = trap.pc
+                # account for the jump back like any other instruction, then stop
+                expected_cycles = 0
+            except Idle as idle:
+                # every round is traced and profiled, none are skipped
+                extra = idle.extra
+            cycles = cycle_table[ins] + extra
+            taken += cycles
+            expected_cycles -= cycles
 
-            else:
-                print(f'Code not recognized: {ins}')
-                self.b = 1
+            if profiler is not None:
+                op_hits[ins] += 1
+                pc_hits[pc] += 1
+                pc_cycles[pc] += cycles
+                if extra:
+                    op_penalty[ins] += extra
+
+        if trace is not None:
+            trace.index = index
+        self.taken_cycles = taken
+
+    def run_until(self, pc=None, cycles=None, instructions=None, predicate=None):
+        # stop after the first instruction that lands on a breakpoint, uses up
+        # the cycle or instruction budget, satisfies predicate(cpu) or leaves the
+        # program stuck in an idle loop
+        if pc is None and cycles is None and instructions is None and predicate is None:
+            raise ValueError('run_until needs at least one stop condition')
+
+        if pc is None:
+            breakpoints = NO_BREAKPOINTS
+        elif isinstance(pc, (bytes, bytearray)):
+            breakpoints = pc
+        else:
+            breakpoints = breakpoint_map(pc)
+        max_cycles = NO_LIMIT if cycles is None else cycles
+        max_instructions = NO_LIMIT if instructions is None else instructions
+
+        start = self.taken_cycles
+        count = 0
+        skipped_cycles = skipped_instructions = 0
+        self.trapped = None
+
+        if predicate is not None or self.trace is not None or self.profiler is not None:
+            # one instruction at a time through execute
+            while True:
+                self.execute(1)
+                count += 1
+                if self.trapped is not None:
+                    reason = STOP_TRAP
+                elif breakpoints[self.pc]:
+                    reason = STOP_PC
+                elif self.taken_cycles - start >= max_cycles:
+                    reason = STOP_CYCLES
+                elif count >= max_instructions:
+                    reason = STOP_INSTRUCTIONS
+                elif predicate is not None and predicate(self):
+                    reason = STOP_PREDICATE
+                else:
+                    continue
+                return RunResult(reason, self.pc, self.taken_cycles - start, count)
+
+        table = OPCODE_TABLE
+        cycle_table = CYCLE_TABLE
+        taken = start
+        limit = start + max_cycles
+        scheduler = self.scheduler
+        # the loop only looks up at the budget or the next device deadline
+        stop = limit
+
+        while True:
+            if scheduler is not None:
+                if taken >= scheduler.deadline:
+                    self.taken_cycles = taken
+                    scheduler.run(taken)
+                stop = min(limit, scheduler.deadline)
+
+            while True:
+
+                if self.pending:
+                    cycles = self.interrupt()
+                    if cycles:
+                        # interrupt entry is not an instruction, but its cycles count
+                        taken += cycles
+                        if breakpoints[self.pc]:
+                            reason = STOP_PC
+                        elif taken >= stop:
+                            reason = STOP_CYCLES
+                        else:
+                            continue
+                        break
+
+                ins = self.fetch_byte()
+                count += 1
+                try:
+                    taken += cycle_table[ins] + table[ins](self)
+                except Trap as trap:
+                    taken += cycle_table[ins] + trap.extra
+                    self.trapped = trap.pc
+                    reason = STOP_TRAP
+                    break
+                except Idle as idle:
+                    taken += cycle_table[ins] + idle.extra
+                    # skip the rounds that stop nowhere, as in execute_fast
+                    if not any(breakpoints[idle.pc:idle.end]):
+                        if (max_cycles >= NO_LIMIT and max_instructions >= NO_LIMIT
+                                and (scheduler is None or scheduler.deadline >= NEVER)):
+                            # no budget to use up and no event to wait for, it never ends
+                            self.trapped = idle.pc
+                            reason = STOP_TRAP
+                            break
+                        rounds = min((stop - taken - 1) // idle.cycles,
+                                     (max_instructions - count - 1) // idle.instructions)
+                        if rounds > 0:
+                            skipped_cycles += rounds * idle.cycles
+                            skipped_instructions += rounds * idle.instructions
+                            taken += rounds * idle.cycles
+                            count += rounds * idle.instructions
+
+                if breakpoints[self.pc]:
+                    reason = STOP_PC
+                elif taken >= stop:
+                    reason = STOP_CYCLES
+                elif count >= max_instructions:
+                    reason = STOP_INSTRUCTIONS
+                else:
+                    continue
+                break
+
+            if reason != STOP_CYCLES or taken >= limit:
+                break
+            # only a device deadline, service it and carry on
+            if count >= max_instructions:
+                reason = STOP_INSTRUCTIONS
+                break
+
+        self.taken_cycles = taken
+        if scheduler is not None and taken >= scheduler.deadline:
+            scheduler.run(taken)
+        return RunResult(reason, self.pc, taken - start, count, skipped_cycles, skipped_instructions)
+
+    # stack, always in page 1
+
+    def push(self, value):
+        sp = self.sp
+        self.mem[STACK | (sp & 0xFF)] = value
+        self.dirty[1] = 1
+        self.sp = STACK | ((sp - 1) & 0xFF)
+
+    def pull(self):
+        self.sp = STACK | ((self.sp + 1) & 0xFF)
+        return self.mem[self.sp]
+
+    # the generated ADC/SBC handlers hand decimal mode to these
+
+    def adc(self, value):
+        a = self.a
+        carry = self.p & C_FLAG
+        total = a + value + carry
+        # N, V and Z come from the binary sum, even in decimal mode
+        overflow = ~(a ^ value) & (a ^ total) & 0x80
+        p = (self.p & ADC_CLEAR) | NZ[total & 0xFF] | (V_FLAG if overflow else 0)
+
+        if p & D_FLAG:
+            lo = (a & 0x0F) + (value & 0x0F) + carry
+            if lo > 0x09:
+                lo = ((lo + 0x06) & 0x0F) + 0x10
+            total = (a & 0xF0) + (value & 0xF0) + lo
+            signed = (a & 0xF0) - (a & 0x80) * 2 + (value & 0xF0) - (value & 0x80) * 2 + lo
+            p = (p & ~(N_FLAG | V_FLAG)) | (signed & N_FLAG)
+            if not -128 <= signed <= 127:
+                p |= V_FLAG
+            if total >= 0xA0:
+                total += 0x60
+
+        self.a = total & 0xFF
+        self.p = p | (C_FLAG if total > 0xFF else 0)
+
+    def sbc(self, value):
+        if not self.p & D_FLAG:
+            # binary subtraction is addition of the complement
+            self.adc(value ^ 0xFF)
+            return
+
+        a = self.a
+        borrow = 1 - (self.p & C_FLAG)
+        # flags are the binary subtraction's, only A is decimal adjusted
+        total = a - value - borrow
+        overflow = (a ^ value) & (a ^ total) & 0x80
+        self.p = ((self.p & ADC_CLEAR) | NZ[total & 0xFF] | (V_FLAG if overflow else 0)
+                  | (C_FLAG if total >= 0 else 0))
+
+        lo = (a & 0x0F) - (value & 0x0F) - borrow
+        if lo < 0:
+            lo = ((lo - 0x06) & 0x0F) - 0x10
+        total = (a & 0xF0) - (value & 0xF0) + lo
+        if total < 0:
+            total -= 0x60
+        self.a = total & 0xFF
+
+    def unknown(self):
+        print(f'Code not recognized: {self.mem[self.pc - 1]}')
+        self.p |= B_FLAG
+        return 0
+
+
+def install_handlers():
+    # one generated method per INSTRUCTIONS row, returning the penalty cycles
+    # it took on top of CYCLES
+    for name, handler in build_handlers(globals()).items():
+        setattr(CPU, name, handler)
+
+
+install_handlers()
+
+
+def build_cycle_table():
+    # unrecognized codes only take the fetch cycle
+    table = [1] * 256
+    for name, code in OP_CODES.items():
+        table[code] = CYCLES[name]
+    return table
+
+
+def build_opcode_table():
+    # opcode byte -> handler, so every opcode decodes in one index
+    table = [CPU.unknown] * 256
+    for name, code in OP_CODES.items():
+        table[code] = getattr(CPU, name.lower())
+    return table
+
+
+def build_length_table():
+    # unrecognized codes are one byte long
+    table = [1] * 256
+    for name, code in OP_CODES.items():
+        table[code] = LENGTHS[name]
+    return table
+
+
+def build_loop_table():
+    # IN_BODY, READS_ONE or CLOSES_LOOP for what an opcode can be in an idle loop, 0 neither
+    table = bytearray(256)
+    for name in REGISTER_ONLY:
+        table[OP_CODES[name]] = IN_BODY
+    for name in POLL_READS:
+        table[OP_CODES[name]] = READS_ONE
+    for name in BRANCHES + ('JMP_ABS',):
+        table[OP_CODES[name]] = CLOSES_LOOP
+    return table
+
+
+OPCODE_TABLE = build_opcode_table()
+CYCLE_TABLE = build_cycle_table()
+LENGTH_TABLE = build_length_table()
+LOOP_TABLE = build_loop_table()
 
 
 """
@@ -529,4 +801,22 @@ Indirect indexed addressing - 5+1 cycles - LDA ($20), Y
 3-4. fetch address
 5. add Y to address, load from address
 *6. if crossed pg
+
+Relative addressing - 2+1+1 cycles - BNE $0610
+1. fetch opcode
+2. fetch offset
+*3. if branch taken
+*4. if target on another pg than the next instruction
+
+Indirect addressing - 5 cycles - JMP ($10FF)
+1. fetch opcode
+2-3. fetch address of address
+4-5. fetch address, high byte from the same pg ($10FF reads $1000)
+
+Accumulator / implied addressing - 2 cycles - ASL A, TAX
+1. fetch opcode
+2. operate on register
+
+Read-modify-write - zpg 5, zpg,X 6, abs 6, abs,X 7 cycles - INC $10
+no page-crossing penalty, abs,X always takes the extra cycle
 """
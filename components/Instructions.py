@@ -0,0 +1,424 @@
+# the documented 6502 instruction set as data, and the generator that turns
+# every row into one flattened handler at import time
+
+# mnemonic, addressing mode, register it works on, opcode, base cycles
+INSTRUCTIONS = [
+    ('ADC', 'IMM', 'a', 0x69, 2),
+    ('ADC', 'ZPG', 'a', 0x65, 3),
+    ('ADC', 'ZPX', 'a', 0x75, 4),
+    ('ADC', 'ABS', 'a', 0x6D, 4),
+    ('ADC', 'ABX', 'a', 0x7D, 4),
+    ('ADC', 'ABY', 'a', 0x79, 4),
+    ('ADC', 'INX', 'a', 0x61, 6),
+    ('ADC', 'INY', 'a', 0x71, 5),
+    ('AND', 'IMM', 'a', 0x29, 2),
+    ('AND', 'ZPG', 'a', 0x25, 3),
+    ('AND', 'ZPX', 'a', 0x35, 4),
+    ('AND', 'ABS', 'a', 0x2D, 4),
+    ('AND', 'ABX', 'a', 0x3D, 4),
+    ('AND', 'ABY', 'a', 0x39, 4),
+    ('AND', 'INX', 'a', 0x21, 6),
+    ('AND', 'INY', 'a', 0x31, 5),
+    ('ASL', 'ACC', 'a', 0x0A, 2),
+    ('ASL', 'ZPG', None, 0x06, 5),
+    ('ASL', 'ZPX', None, 0x16, 6),
+    ('ASL', 'ABS', None, 0x0E, 6),
+    ('ASL', 'ABX', None, 0x1E, 7),
+    ('BCC', 'REL', None, 0x90, 2),
+    ('BCS', 'REL', None, 0xB0, 2),
+    ('BEQ', 'REL', None, 0xF0, 2),
+    ('BIT', 'ZPG', 'a', 0x24, 3),
+    ('BIT', 'ABS', 'a', 0x2C, 4),
+    ('BMI', 'REL', None, 0x30, 2),
+    ('BNE', 'REL', None, 0xD0, 2),
+    ('BPL', 'REL', None, 0x10, 2),
+    ('BRK', 'IMP', None, 0x00, 7),
+    ('BVC', 'REL', None, 0x50, 2),
+    ('BVS', 'REL', None, 0x70, 2),
+    ('CLC', 'IMP', None, 0x18, 2),
+    ('CLD', 'IMP', None, 0xD8, 2),
+    ('CLI', 'IMP', None, 0x58, 2),
+    ('CLV', 'IMP', None, 0xB8, 2),
+    ('CMP', 'IMM', 'a', 0xC9, 2),
+    ('CMP', 'ZPG', 'a', 0xC5, 3),
+    ('CMP', 'ZPX', 'a', 0xD5, 4),
+    ('CMP', 'ABS', 'a', 0xCD, 4),
+    ('CMP', 'ABX', 'a', 0xDD, 4),
+    ('CMP', 'ABY', 'a', 0xD9, 4),
+    ('CMP', 'INX', 'a', 0xC1, 6),
+    ('CMP', 'INY', 'a', 0xD1, 5),
+    ('CPX', 'IMM', 'x', 0xE0, 2),
+    ('CPX', 'ZPG', 'x', 0xE4, 3),
+    ('CPX', 'ABS', 'x', 0xEC, 4),
+    ('CPY', 'IMM', 'y', 0xC0, 2),
+    ('CPY', 'ZPG', 'y', 0xC4, 3),
+    ('CPY', 'ABS', 'y', 0xCC, 4),
+    ('DEC', 'ZPG', None, 0xC6, 5),
+    ('DEC', 'ZPX', None, 0xD6, 6),
+    ('DEC', 'ABS', None, 0xCE, 6),
+    ('DEC', 'ABX', None, 0xDE, 7),
+    ('DEX', 'IMP', 'x', 0xCA, 2),
+    ('DEY', 'IMP', 'y', 0x88, 2),
+    ('EOR', 'IMM', 'a', 0x49, 2),
+    ('EOR', 'ZPG', 'a', 0x45, 3),
+    ('EOR', 'ZPX', 'a', 0x55, 4),
+    ('EOR', 'ABS', 'a', 0x4D, 4),
+    ('EOR', 'ABX', 'a', 0x5D, 4),
+    ('EOR', 'ABY', 'a', 0x59, 4),
+    ('EOR', 'INX', 'a', 0x41, 6),
+    ('EOR', 'INY', 'a', 0x51, 5),
+    ('INC', 'ZPG', None, 0xE6, 5),
+    ('INC', 'ZPX', None, 0xF6, 6),
+    ('INC', 'ABS', None, 0xEE, 6),
+    ('INC', 'ABX', None, 0xFE, 7),
+    ('INX', 'IMP', 'x', 0xE8, 2),
+    ('INY', 'IMP', 'y', 0xC8, 2),
+    ('JMP', 'ABS', None, 0x4C, 3),
+    ('JMP', 'IND', None, 0x6C, 5),
+    ('JSR', 'ABS', None, 0x20, 6),
+    ('LDA', 'IMM', 'a', 0xA9, 2),
+    ('LDA', 'ZPG', 'a', 0xA5, 3),
+    ('LDA', 'ZPX', 'a', 0xB5, 4),
+    ('LDA', 'ABS', 'a', 0xAD, 4),
+    ('LDA', 'ABX', 'a', 0xBD, 4),
+    ('LDA', 'ABY', 'a', 0xB9, 4),
+    ('LDA', 'INX', 'a', 0xA1, 6),
+    ('LDA', 'INY', 'a', 0xB1, 5),
+    ('LDX', 'IMM', 'x', 0xA2, 2),
+    ('LDX', 'ZPG', 'x', 0xA6, 3),
+    ('LDX', 'ZPY', 'x', 0xB6, 4),
+    ('LDX', 'ABS', 'x', 0xAE, 4),
+    ('LDX', 'ABY', 'x', 0xBE, 4),
+    ('LDY', 'IMM', 'y', 0xA0, 2),
+    ('LDY', 'ZPG', 'y', 0xA4, 3),
+    ('LDY', 'ZPX', 'y', 0xB4, 4),
+    ('LDY', 'ABS', 'y', 0xAC, 4),
+    ('LDY', 'ABX', 'y', 0xBC, 4),
+    ('LSR', 'ACC', 'a', 0x4A, 2),
+    ('LSR', 'ZPG', None, 0x46, 5),
+    ('LSR', 'ZPX', None, 0x56, 6),
+    ('LSR', 'ABS', None, 0x4E, 6),
+    ('LSR', 'ABX', None, 0x5E, 7),
+    ('NOP', 'IMP', None, 0xEA, 2),
+    ('ORA', 'IMM', 'a', 0x09, 2),
+    ('ORA', 'ZPG', 'a', 0x05, 3),
+    ('ORA', 'ZPX', 'a', 0x15, 4),
+    ('ORA', 'ABS', 'a', 0x0D, 4),
+    ('ORA', 'ABX', 'a', 0x1D, 4),
+    ('ORA', 'ABY', 'a', 0x19, 4),
+    ('ORA', 'INX', 'a', 0x01, 6),
+    ('ORA', 'INY', 'a', 0x11, 5),
+    ('PHA', 'IMP', 'a', 0x48, 3),
+    ('PHP', 'IMP', None, 0x08, 3),
+    ('PLA', 'IMP', 'a', 0x68, 4),
+    ('PLP', 'IMP', None, 0x28, 4),
+    ('ROL', 'ACC', 'a', 0x2A, 2),
+    ('ROL', 'ZPG', None, 0x26, 5),
+    ('ROL', 'ZPX', None, 0x36, 6),
+    ('ROL', 'ABS', None, 0x2E, 6),
+    ('ROL', 'ABX', None, 0x3E, 7),
+    ('ROR', 'ACC', 'a', 0x6A, 2),
+    ('ROR', 'ZPG', None, 0x66, 5),
+    ('ROR', 'ZPX', None, 0x76, 6),
+    ('ROR', 'ABS', None, 0x6E, 6),
+    ('ROR', 'ABX', None, 0x7E, 7),
+    ('RTI', 'IMP', None, 0x40, 6),
+    ('RTS', 'IMP', None, 0x60, 6),
+    ('SBC', 'IMM', 'a', 0xE9, 2),
+    ('SBC', 'ZPG', 'a', 0xE5, 3),
+    ('SBC', 'ZPX', 'a', 0xF5, 4),
+    ('SBC', 'ABS', 'a', 0xED, 4),
+    ('SBC', 'ABX', 'a', 0xFD, 4),
+    ('SBC', 'ABY', 'a', 0xF9, 4),
+    ('SBC', 'INX', 'a', 0xE1, 6),
+    ('SBC', 'INY', 'a', 0xF1, 5),
+    ('SEC', 'IMP', None, 0x38, 2),
+    ('SED', 'IMP', None, 0xF8, 2),
+    ('SEI', 'IMP', None, 0x78, 2),
+    ('STA', 'ZPG', 'a', 0x85, 3),
+    ('STA', 'ZPX', 'a', 0x95, 4),
+    ('STA', 'ABS', 'a', 0x8D, 4),
+    ('STA', 'ABX', 'a', 0x9D, 5),
+    ('STA', 'ABY', 'a', 0x99, 5),
+    ('STA', 'INX', 'a', 0x81, 6),
+    ('STA', 'INY', 'a', 0x91, 6),
+    ('STX', 'ZPG', 'x', 0x86, 3),
+    ('STX', 'ZPY', 'x', 0x96, 4),
+    ('STX', 'ABS', 'x', 0x8E, 4),
+    ('STY', 'ZPG', 'y', 0x84, 3),
+    ('STY', 'ZPX', 'y', 0x94, 4),
+    ('STY', 'ABS', 'y', 0x8C, 4),
+    ('TAX', 'IMP', 'x', 0xAA, 2),
+    ('TAY', 'IMP', 'y', 0xA8, 2),
+    ('TSX', 'IMP', 'x', 0xBA, 2),
+    ('TXA', 'IMP', 'a', 0x8A, 2),
+    ('TXS', 'IMP', None, 0x9A, 2),
+    ('TYA', 'IMP', 'a', 0x98, 2),
+]
+
+# addressing mode -> lines that leave the effective address in addr (or the
+# operand in value) and step self.pc past the operand, and the index
+# register that can carry into the next page
+# CPU.read_word, inlined
+WORD = 'mem[{at}] | (mem[({at} + 1) & 0xFFFF] << 8)'
+OPERAND = WORD.format(at='pc')
+
+MODES = {
+    'IMM': (['value = mem[pc]', 'self.pc = (pc + 1) & 0xFFFF'], None),
+    'ZPG': (['addr = mem[pc]', 'self.pc = (pc + 1) & 0xFFFF'], None),
+    'ZPX': (['addr = (mem[pc] + self.x) & 0xFF', 'self.pc = (pc + 1) & 0xFFFF'], None),
+    'ZPY': (['addr = (mem[pc] + self.y) & 0xFF', 'self.pc = (pc + 1) & 0xFFFF'], None),
+    'ABS': ([f'addr = {OPERAND}', 'self.pc = (pc + 2) & 0xFFFF'], None),
+    'ABX': (['index = self.x',
+             f'addr = (({OPERAND}) + index) & 0xFFFF',
+             'self.pc = (pc + 2) & 0xFFFF'], 'index'),
+    'ABY': (['index = self.y',
+             f'addr = (({OPERAND}) + index) & 0xFFFF',
+             'self.pc = (pc + 2) & 0xFFFF'], 'index'),
+    # the pointer's high byte never carries into the next page
+    'IND': ([f'ptr = {OPERAND}',
+             'addr = mem[ptr] | (mem[(ptr & 0xFF00) | ((ptr + 1) & 0xFF)] << 8)',
+             'self.pc = (pc + 2) & 0xFFFF'], None),
+    # zero page pointers wrap within page 0
+    'INX': (['ptr = (mem[pc] + self.x) & 0xFF',
+             'addr = mem[ptr] | (mem[(ptr + 1) & 0xFF] << 8)',
+             'self.pc = (pc + 1) & 0xFFFF'], None),
+    'INY': (['ptr = mem[pc]', 'index = self.y',
+             'addr = ((mem[ptr] | (mem[(ptr + 1) & 0xFF] << 8)) + index) & 0xFFFF',
+             'self.pc = (pc + 1) & 0xFFFF'], 'index'),
+}
+
+# instruction length per addressing mode
+LENGTHS = {'IMP': 1, 'ACC': 1, 'IMM': 2, 'ZPG': 2, 'ZPX': 2, 'ZPY': 2, 'REL': 2, 'INX': 2, 'INY': 2,
+           'ABS': 3, 'ABX': 3, 'ABY': 3, 'IND': 3}
+
+SET_NZ = 'self.p = (self.p & NZ_CLEAR) | NZ[value]'
+COMPARE = ['value = self.{r} - value',
+           'self.p = (self.p & CMP_CLEAR) | NZ[value & 0xFF] | (0 if value < 0 else C_FLAG)']
+
+# instructions that read an operand into value
+READS = {
+    'LD': ['self.{r} = value', SET_NZ],
+    'AND': ['value &= self.a', 'self.a = value', SET_NZ],
+    'ORA': ['value |= self.a', 'self.a = value', SET_NZ],
+    'EOR': ['value ^= self.a', 'self.a = value', SET_NZ],
+    # decimal mode is rare enough to leave to CPU.adc / CPU.sbc
+    'ADC': ['p = self.p',
+            'if p & D_FLAG:',
+            '    self.adc(value)',
+            '    return {penalty}',
+            'a = self.a',
+            'total = a + value + (p & C_FLAG)',
+            'self.a = total & 0xFF',
+            'self.p = ((p & ADC_CLEAR) | NZ[total & 0xFF] | (total >> 8)',
+            '          | (V_FLAG if ~(a ^ value) & (a ^ total) & 0x80 else 0))'],
+    'SBC': ['p = self.p',
+            'if p & D_FLAG:',
+            '    self.sbc(value)',
+            '    return {penalty}',
+            'value ^= 0xFF',
+            'a = self.a',
+            'total = a + value + (p & C_FLAG)',
+            'self.a = total & 0xFF',
+            'self.p = ((p & ADC_CLEAR) | NZ[total & 0xFF] | (total >> 8)',
+            '          | (V_FLAG if ~(a ^ value) & (a ^ total) & 0x80 else 0))'],
+    'CMP': COMPARE,
+    'CP': COMPARE,
+    'BIT': ['self.p = ((self.p & BIT_CLEAR) | (value & (N_FLAG | V_FLAG))',
+            '          | (0 if self.a & value else Z_FLAG))'],
+}
+
+# read-modify-write instructions, value in and result out
+MODIFIES = {
+    'ASL': ['result = (value << 1) & 0xFF',
+            'self.p = (self.p & CMP_CLEAR) | NZ[result] | (value >> 7)'],
+    'LSR': ['result = value >> 1',
+            'self.p = (self.p & CMP_CLEAR) | NZ[result] | (value & C_FLAG)'],
+    'ROL': ['result = ((value << 1) | (self.p & C_FLAG)) & 0xFF',
+            'self.p = (self.p & CMP_CLEAR) | NZ[result] | (value >> 7)'],
+    'ROR': ['result = (value >> 1) | ((self.p & C_FLAG) << 7)',
+            'self.p = (self.p & CMP_CLEAR) | NZ[result] | (value & C_FLAG)'],
+    'INC': ['result = (value + 1) & 0xFF', 'self.p = (self.p & NZ_CLEAR) | NZ[result]'],
+    'DEC': ['result = (value - 1) & 0xFF', 'self.p = (self.p & NZ_CLEAR) | NZ[result]'],
+}
+
+# instructions that only use the effective address
+ADDRESSES = {
+    'ST': ['mem[addr] = self.{r}', 'self.dirty[addr >> 8] = 1'],
+    # short jumps back may close an idle loop, see CPU.loop_back
+    'JMP': ['self.pc = addr',
+            'end = (pc + 2) & 0xFFFF',
+            'if 0 < end - addr <= IDLE_LOOP_BYTES and self.loops.get(end) != LOOP_BUSY:',
+            '    return self.loop_back(addr, end, 0)'],
+    # the return address pushed is the last byte of the JSR
+    'JSR': ['ret = (pc + 1) & 0xFFFF',
+            'sp = self.sp',
+            'mem[STACK | (sp & 0xFF)] = ret >> 8',
+            'mem[STACK | ((sp - 1) & 0xFF)] = ret & 0xFF',
+            'self.dirty[1] = 1',
+            'self.sp = STACK | ((sp - 2) & 0xFF)',
+            'self.pc = addr'],
+}
+
+BRANCHES = {
+    'BCC': 'not p & C_FLAG', 'BCS': 'p & C_FLAG',
+    'BNE': 'not p & Z_FLAG', 'BEQ': 'p & Z_FLAG',
+    'BPL': 'not p & N_FLAG', 'BMI': 'p & N_FLAG',
+    'BVC': 'not p & V_FLAG', 'BVS': 'p & V_FLAG',
+}
+
+PUSH = ['sp = self.sp',
+        'self.mem[STACK | (sp & 0xFF)] = value',
+        'self.dirty[1] = 1',
+        'self.sp = STACK | ((sp - 1) & 0xFF)']
+PULL = ['sp = STACK | ((self.sp + 1) & 0xFF)',
+        'self.sp = sp',
+        'value = self.mem[sp]']
+
+# implied instructions that still use the stack or jump
+STACK_OR_FLOW = ('PHA', 'PHP', 'PLA', 'PLP', 'RTS', 'RTI', 'BRK')
+
+IMPLIED = {
+    'IN': ['value = (self.{r} + 1) & 0xFF', 'self.{r} = value', SET_NZ],
+    'DE': ['value = (self.{r} - 1) & 0xFF', 'self.{r} = value', SET_NZ],
+    'TAX': ['value = self.a', 'self.x = value', SET_NZ],
+    'TAY': ['value = self.a', 'self.y = value', SET_NZ],
+    'TXA': ['value = self.x', 'self.a = value', SET_NZ],
+    'TYA': ['value = self.y', 'self.a = value', SET_NZ],
+    'TSX': ['value = self.sp & 0xFF', 'self.x = value', SET_NZ],
+    'TXS': ['self.sp = STACK | self.x'],
+    'CLC': ['self.p &= ~C_FLAG'],
+    'SEC': ['self.p |= C_FLAG'],
+    'CLI': ['self.p &= ~I_FLAG'],
+    'SEI': ['self.p |= I_FLAG'],
+    'CLD': ['self.p &= ~D_FLAG'],
+    'SED': ['self.p |= D_FLAG'],
+    'CLV': ['self.p &= ~V_FLAG'],
+    'NOP': [],
+    'PHA': ['value = self.a'] + PUSH,
+    # B and bit 5 only exist in the pushed copy of P
+    'PHP': ['value = self.p | B_FLAG | UNUSED_FLAG'] + PUSH,
+    'PLA': PULL + ['self.a = value', SET_NZ],
+    'PLP': PULL + ['self.p = value & STATUS_MASK'],
+    'RTS': ['sp = self.sp',
+            'mem = self.mem',
+            'lo = mem[STACK | ((sp + 1) & 0xFF)]',
+            'hi = mem[STACK | ((sp + 2) & 0xFF)]',
+            'self.sp = STACK | ((sp + 2) & 0xFF)',
+            'self.pc = ((hi << 8 | lo) + 1) & 0xFFFF'],
+    'RTI': ['self.p = self.pull() & STATUS_MASK',
+            'lo = self.pull()',
+            'self.pc = self.pull() << 8 | lo'],
+    # skips the padding byte, B is only set in the pushed copy of P
+    'BRK': ['self.enter_interrupt(IRQ_VECTOR, (self.pc + 1) & 0xFFFF, self.p | B_FLAG)'],
+}
+
+
+def family(mnemonic, table):
+    # LDA/LDX/LDY share 'LD', INX/INY share 'IN' and so on
+    for key in (mnemonic, mnemonic[:2]):
+        if key in table:
+            return table[key]
+    return None
+
+
+def name(mnemonic, mode):
+    return f'{mnemonic}_{mode}'
+
+
+def op_codes():
+    return {name(mnemonic, mode): code for mnemonic, mode, _, code, _ in INSTRUCTIONS}
+
+
+def cycles():
+    return {name(mnemonic, mode): count for mnemonic, mode, _, _, count in INSTRUCTIONS}
+
+
+def page_penalty():
+    # indexed reads pay a cycle when the index carries into the next page,
+    # stores and read-modify-write always pay it in their base cycles
+    return tuple(name(mnemonic, mode) for mnemonic, mode, _, _, _ in INSTRUCTIONS
+                 if MODES.get(mode, (None, None))[1] and family(mnemonic, READS) is not None)
+
+
+def branches():
+    return tuple(name(mnemonic, mode) for mnemonic, mode, _, _, _ in INSTRUCTIONS if mode == 'REL')
+
+
+def lengths():
+    return {name(mnemonic, mode): LENGTHS[mode] for mnemonic, mode, _, _, _ in INSTRUCTIONS}
+
+
+def register_only():
+    # instructions that neither touch memory nor leave the straight line,
+    # what they do depends on the registers alone
+    return tuple(name(mnemonic, mode) for mnemonic, mode, _, _, _ in INSTRUCTIONS
+                 if mode in ('IMP', 'ACC', 'IMM') and mnemonic not in STACK_OR_FLOW)
+
+
+def poll_reads():
+    # reads of one fixed address that change nothing but registers
+    return tuple(name(mnemonic, mode) for mnemonic, mode, _, _, _ in INSTRUCTIONS
+                 if mode in ('ZPG', 'ABS') and family(mnemonic, READS) is not None)
+
+
+def body(mnemonic, mode, register):
+    # the handler's lines, ending in the return of its penalty cycles
+    if mode == 'REL':
+        return ['pc = self.pc',
+                'p = self.p',
+                'if not (%s):' % BRANCHES[mnemonic],
+                '    self.pc = (pc + 1) & 0xFFFF',
+                '    return 0',
+                'offset = self.mem[pc]',
+                'pc = (pc + 1) & 0xFFFF',
+                'target = (pc + offset - ((offset & 0x80) << 1)) & 0xFFFF',
+                'self.pc = target',
+                '# one cycle for taking it, one more if it lands on another page',
+                'extra = 1 if ((target ^ pc) & 0xFF00) == 0 else 2',
+                '# short branches back may close an idle loop, see CPU.loop_back',
+                'if offset >= SHORT_LOOP and self.loops.get(pc) != LOOP_BUSY:',
+                '    return self.loop_back(target, pc, extra)',
+                'return extra']
+
+    if mode == 'IMP':
+        lines = family(mnemonic, IMPLIED)
+        return [line.format(r=register) for line in lines] + ['return 0']
+
+    if mode == 'ACC':
+        return ['value = self.a'] + MODIFIES[mnemonic] + ['self.a = result', 'return 0']
+
+    address, index = MODES[mode]
+    lines = ['mem = self.mem', 'pc = self.pc'] + address
+
+    reads = family(mnemonic, READS)
+    if reads is not None:
+        penalty = f'1 if (addr & 0xFF) < {index} else 0' if index else '0'
+        if mode != 'IMM':
+            lines.append('value = mem[addr]')
+        lines += [line.format(r=register, penalty=penalty) for line in reads]
+        return lines + [f'return {penalty}']
+
+    if mnemonic in MODIFIES:
+        lines.append('value = mem[addr]')
+        lines += MODIFIES[mnemonic]
+        return lines + ['mem[addr] = result', 'self.dirty[addr >> 8] = 1', 'return 0']
+
+    lines += [line.format(r=register) for line in family(mnemonic, ADDRESSES)]
+    return lines + ['return 0']
+
+
+def source(mnemonic, mode, register):
+    lines = body(mnemonic, mode, register)
+    return f'def {name(mnemonic, mode).lower()}(self):\n' + ''.join(f'    {line}\n' for line in lines)
+
+
+def build_handlers(namespace):
+    # compile every row against namespace (the CPU module's flags and tables),
+    # one code object per handler so tracebacks name the opcode
+    handlers = {}
+    for mnemonic, mode, register, _, _ in INSTRUCTIONS:
+        handler = name(mnemonic, mode).lower()
+        exec(compile(source(mnemonic, mode, register), f'<{handler}>', 'exec'), namespace)
+        handlers[handler] = namespace.pop(handler)
+    return handlers
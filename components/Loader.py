@@ -0,0 +1,129 @@
+import mmap
+import os
+
+RESET_VECTOR = 0xFFFC
+
+INES_MAGIC = b'NES\x1a'
+INES_HEADER_SIZE = 16
+INES_TRAINER_SIZE = 512
+INES_PRG_BANK_SIZE = 16 * 1024
+INES_PRG_BASE = 0x8000
+
+# Intel HEX record types
+HEX_DATA = 0x00
+HEX_EOF = 0x01
+HEX_EXTENDED_SEGMENT = 0x02
+HEX_START_SEGMENT = 0x03
+HEX_EXTENDED_LINEAR = 0x04
+HEX_START_LINEAR = 0x05
+
+
+def set_reset_vector(memory, address):
+    memory.write(RESET_VECTOR, address & 0xFF)
+    memory.write(RESET_VECTOR + 1, (address >> 8) & 0xFF)
+
+
+def map_file(path):
+    # read-only mapping, so the image is copied straight from the page cache
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def load_binary(memory, path, base=0, reset=True):
+    image = map_file(path)
+    try:
+        loaded = memory.load(image, base)
+    finally:
+        if isinstance(image, mmap.mmap):
+            image.close()
+
+    # an image reaching the vector carries its own, like a ROM
+    if reset and base + loaded <= RESET_VECTOR:
+        set_reset_vector(memory, base)
+    return loaded
+
+
+def load_ines(memory, path):
+    image = map_file(path)
+    try:
+        if image[:4] != INES_MAGIC:
+            raise ValueError(f'{path} is not an iNES image')
+
+        prg_banks = image[4]
+        if prg_banks not in (1, 2):
+            raise ValueError(f'{prg_banks} PRG banks do not fit without a mapper')
+
+        start = INES_HEADER_SIZE
+        if image[6] & 0x04:
+            start += INES_TRAINER_SIZE
+
+        end = start + prg_banks * INES_PRG_BANK_SIZE
+        if end > len(image):
+            raise ValueError(f'{path} is truncated')
+
+        # with mmap this slice is a copy of the PRG ROM only
+        prg = image[start:end]
+    finally:
+        if isinstance(image, mmap.mmap):
+            image.close()
+
+    memory.load(prg, INES_PRG_BASE)
+    if prg_banks == 1:
+        # a single 16kB bank is mirrored into 0xC000 - 0xFFFF
+        memory.load(prg, INES_PRG_BASE + INES_PRG_BANK_SIZE)
+
+    # the cartridge carries its own reset vector
+    return len(prg)
+
+
+def load_hex(memory, path, reset=True):
+    offset = 0
+    start = None
+    loaded = 0
+
+    with open(path, 'r') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if line[0] != ':':
+                raise ValueError(f'{path}:{line_no}: missing record mark')
+
+            record = bytes.fromhex(line[1:])
+            if len(record) < 5 or len(record) != record[0] + 5:
+                raise ValueError(f'{path}:{line_no}: bad record length')
+            if sum(record) & 0xFF:
+                raise ValueError(f'{path}:{line_no}: bad checksum')
+
+            count = record[0]
+            address = (record[1] << 8) | record[2]
+            kind = record[3]
+            payload = record[4:4 + count]
+
+            if kind == HEX_DATA:
+                loaded += memory.load(payload, offset + address)
+            elif kind == HEX_EOF:
+                break
+            elif kind == HEX_EXTENDED_SEGMENT:
+                offset = int.from_bytes(payload, 'big') << 4
+            elif kind == HEX_EXTENDED_LINEAR:
+                offset = int.from_bytes(payload, 'big') << 16
+            elif kind in (HEX_START_SEGMENT, HEX_START_LINEAR):
+                start = int.from_bytes(payload, 'big') & 0xFFFF
+            else:
+                raise ValueError(f'{path}:{line_no}: unknown record type {kind:#04x}')
+
+    if reset and start is not None:
+        set_reset_vector(memory, start)
+    return loaded
+
+
+def load(memory, path, base=0, reset=True):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.nes':
+        return load_ines(memory, path)
+    if ext in ('.hex', '.ihx'):
+        return load_hex(memory, path, reset=reset)
+    return load_binary(memory, path, base=base, reset=reset)
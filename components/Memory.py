@@ -1,5 +1,97 @@
+MAX_MEMORY = 1024 * 64  # 64kB memory
+PAGE_SIZE = 0x100
+PAGES = MAX_MEMORY // PAGE_SIZE
+
+
 class Memory():
 
+    __slots__ = ('data', 'view', 'dirty', 'pages')
+
     def __init__(self):
-        MAX_MEMORY = 1024 * 64  # 64kB memory
-        self.data = [0] * MAX_MEMORY
+        # one byte per address, 64kB instead of 64k list slots,
+        # never rebound since CPUs hold on to it directly
+        self.data = bytearray(MAX_MEMORY)
+        # zero-copy window for bulk slice copies in and out
+        self.view = memoryview(self.data)
+
+        # pages written since memory last matched `pages`, the latest
+        # snapshot or restore; pages are immutable and shared between
+        # snapshots until they are written. Only writes through write(),
+        # load(), clear() and the CPU are tracked, not pokes into data.
+        self.dirty = bytearray(PAGES)
+        self.pages = None
+
+    def __len__(self):
+        return MAX_MEMORY
+
+    def __getitem__(self, address):
+        return self.data[address]
+
+    def __setitem__(self, address, value):
+        self.write(address, value)
+
+    def write(self, address, value):
+        # wrap to a byte on store
+        address &= 0xFFFF
+        self.data[address] = value & 0xFF
+        self.dirty[address >> 8] = 1
+
+    def load(self, image, base=0):
+        # one slice copy for the whole image
+        end = base + len(image)
+        if base < 0 or end > MAX_MEMORY:
+            raise ValueError(f'image of {len(image)} bytes does not fit at {base:#06x}')
+        self.view[base:end] = image
+        if end > base:
+            first, last = base >> 8, (end - 1) >> 8
+            self.dirty[first:last + 1] = b'\x01' * (last - first + 1)
+        return len(image)
+
+    def dump(self, start=0, end=MAX_MEMORY):
+        return bytes(self.view[start:end])
+
+    def clear(self):
+        self.view[:] = bytes(MAX_MEMORY)
+        self.dirty[:] = b'\x01' * PAGES
+
+    def dirty_pages(self):
+        dirty = self.dirty
+        page = dirty.find(1)
+        while page != -1:
+            yield page
+            page = dirty.find(1, page + 1)
+
+    def snapshot(self):
+        view = self.view
+        if self.pages is None:
+            pages = [bytes(view[start:start + PAGE_SIZE]) for start in range(0, MAX_MEMORY, PAGE_SIZE)]
+        else:
+            # copy on write, untouched pages stay shared with the last snapshot
+            pages = list(self.pages)
+            for page in self.dirty_pages():
+                start = page * PAGE_SIZE
+                pages[page] = bytes(view[start:start + PAGE_SIZE])
+
+        self.pages = tuple(pages)
+        self.dirty[:] = bytes(PAGES)
+        return self.pages
+
+    def restore(self, pages):
+        view = self.view
+        current = self.pages
+        if current is pages:
+            # back to the same snapshot, only written pages changed
+            changed = self.dirty_pages()
+        elif current is None:
+            changed = range(PAGES)
+        else:
+            # pages shared by both snapshots only differ if written since
+            dirty = self.dirty
+            changed = [page for page in range(PAGES) if dirty[page] or current[page] is not pages[page]]
+
+        for page in changed:
+            start = page * PAGE_SIZE
+            view[start:start + PAGE_SIZE] = pages[page]
+
+        self.pages = pages
+        self.dirty[:] = bytes(PAGES)
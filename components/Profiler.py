@@ -0,0 +1,88 @@
+import heapq
+import json
+from array import array
+
+from components.CPU import CYCLE_TABLE, OP_CODES, PAGE_PENALTY
+from components.Memory import MAX_MEMORY
+
+NAMES = {code: name for name, code in OP_CODES.items()}
+
+# addressing modes whose page crossing costs a cycle
+PENALTY_MODES = sorted({name.split('_')[1] for name in PAGE_PENALTY})
+
+
+def counters(size):
+    return array('Q', bytes(8 * size))
+
+
+class Profiler():
+
+    def __init__(self):
+        # filled in by CPU.execute_instrumented
+        self.op_hits = counters(256)
+        self.op_penalty = counters(256)
+        self.pc_hits = counters(MAX_MEMORY)
+        self.pc_cycles = counters(MAX_MEMORY)
+
+    def clear(self):
+        for counter in (self.op_hits, self.op_penalty, self.pc_hits, self.pc_cycles):
+            counter[:] = counters(len(counter))
+
+    def op_cycles(self, opcode):
+        return self.op_hits[opcode] * CYCLE_TABLE[opcode] + self.op_penalty[opcode]
+
+    def report(self, top=10):
+        opcodes = [code for code in range(256) if self.op_hits[code]]
+        addresses = [pc for pc in range(MAX_MEMORY) if self.pc_hits[pc]]
+
+        penalties = dict.fromkeys(PENALTY_MODES, 0)
+        for name in PAGE_PENALTY:
+            penalties[name.split('_')[1]] += self.op_penalty[OP_CODES[name]]
+
+        return {
+            'instructions': sum(self.op_hits),
+            'cycles': sum(self.op_cycles(code) for code in opcodes),
+            'opcodes': [
+                {
+                    'opcode': code,
+                    'name': NAMES.get(code, '???'),
+                    'hits': self.op_hits[code],
+                    'cycles': self.op_cycles(code),
+                    'penalty_cycles': self.op_penalty[code],
+                }
+                for code in heapq.nlargest(top, opcodes, key=self.op_cycles)
+            ],
+            'addresses': [
+                {
+                    'pc': pc,
+                    'hits': self.pc_hits[pc],
+                    'cycles': self.pc_cycles[pc],
+                }
+                for pc in heapq.nlargest(top, addresses, key=self.pc_cycles.__getitem__)
+            ],
+            'page_crossing': penalties,
+        }
+
+    def to_json(self, top=10):
+        return json.dumps(self.report(top), indent=2)
+
+    def to_text(self, top=10):
+        report = self.report(top)
+        lines = [f"instructions {report['instructions']}  cycles {report['cycles']}", '']
+
+        lines.append(f"{'opcode':8s} {'name':8s} {'hits':>10s} {'cycles':>12s} {'penalty':>10s}")
+        for row in report['opcodes']:
+            lines.append(f"{row['opcode']:#04x}     {row['name']:8s} {row['hits']:>10d} "
+                         f"{row['cycles']:>12d} {row['penalty_cycles']:>10d}")
+        lines.append('')
+
+        lines.append(f"{'pc':8s} {'hits':>10s} {'cycles':>12s}")
+        for row in report['addresses']:
+            lines.append(f"{row['pc']:#06x}   {row['hits']:>10d} {row['cycles']:>12d}")
+        lines.append('')
+
+        lines.append(f"{'mode':8s} {'penalty':>10s}")
+        for mode, cycles in report['page_crossing'].items():
+            lines.append(f'{mode:8s} {cycles:>10d}')
+
+        return '\n'.join(lines)
@@ -0,0 +1,115 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from components.CPU import CPU
+from components.Memory import MAX_MEMORY
+
+REGISTERS = ('pc', 'sp', 'a', 'x', 'y', 'c', 'z', 'i', 'd', 'b', 'v', 'n', 'taken_cycles')
+# what comes back from a job, trapped is the top of the idle loop it stopped in or None
+STATE = REGISTERS + ('trapped',)
+
+Job = namedtuple('Job', ['image', 'registers', 'cycles', 'base'], defaults=[0])
+Result = namedtuple('Result', ['registers', 'memory'])
+
+# per-worker state, set up once by init_worker and reused between jobs
+_worker_cpu = None
+# the (images, results) blocks of the batch the worker last ran, by their names
+_worker_blocks = {}
+
+
+def init_worker():
+    global _worker_cpu
+    _worker_cpu = CPU()
+
+
+def attach(images_name, results_name):
+    names = (images_name, results_name)
+    blocks = _worker_blocks.get(names)
+    if blocks is None:
+        # a new batch, drop the blocks of the last one
+        for old in _worker_blocks.values():
+            for block in old:
+                block.close()
+        _worker_blocks.clear()
+
+        # the parent owns the blocks and unlinks them once the batch is done
+        blocks = tuple(shared_memory.SharedMemory(name=name) for name in names)
+        _worker_blocks[names] = blocks
+    return blocks
+
+
+def run_job(task):
+    index, images_name, offset, length, base, registers, cycles, results_name = task
+
+    cpu = _worker_cpu
+    cpu.reset()
+    for name, value in registers.items():
+        setattr(cpu, name, value)
+
+    cpu.memory.clear()
+    images, results = attach(images_name, results_name)
+    cpu.memory.load(images.buf[offset:offset + length], base)
+
+    cpu.execute(cycles)
+
+    # memory goes back through shared memory, only registers are pickled
+    start = index * MAX_MEMORY
+    results.buf[start:start + MAX_MEMORY] = cpu.memory.view
+    return {name: getattr(cpu, name) for name in STATE}
+
+
+class Runner():
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown()
+
+    def run(self, jobs, chunksize=None):
+        jobs = [job if isinstance(job, Job) else Job(*job) for job in jobs]
+        if not jobs:
+            return []
+
+        # all images packed into one block, results laid out 64kB per job
+        total = sum(len(job.image) for job in jobs)
+        images = shared_memory.SharedMemory(create=True, size=max(total, 1))
+        results = shared_memory.SharedMemory(create=True, size=len(jobs) * MAX_MEMORY)
+        try:
+            tasks = []
+            offset = 0
+            for index, job in enumerate(jobs):
+                length = len(job.image)
+                images.buf[offset:offset + length] = job.image
+                tasks.append((index, images.name, offset, length, job.base, dict(job.registers),
+                              job.cycles, results.name))
+                offset += length
+
+            if chunksize is None:
+                chunksize = max(1, len(jobs) // (self.workers * 4))
+
+            final = list(self.executor.map(run_job, tasks, chunksize=chunksize))
+
+            return [
+                Result(registers, bytes(results.buf[i * MAX_MEMORY:(i + 1) * MAX_MEMORY]))
+                for i, registers in enumerate(final)
+            ]
+        finally:
+            images.close()
+            images.unlink()
+            results.close()
+            results.unlink()
+
+
+def run_jobs(jobs, workers=None, chunksize=None):
+    with Runner(workers) as runner:
+        return runner.run(jobs, chunksize=chunksize)
@@ -0,0 +1,77 @@
+import heapq
+
+# deadline of an empty scheduler, never reached
+NEVER = 1 << 62
+
+
+class Event():
+
+    __slots__ = ('callback', 'period', 'deadline', 'active')
+
+    def __init__(self, callback, period, deadline):
+        self.callback = callback
+        # 0 for one-shot events
+        self.period = period
+        self.deadline = deadline
+        self.active = True
+
+
+class Scheduler():
+    # min-heap of device events keyed on taken_cycles, the CPU only looks at
+    # it once the cycle count reaches deadline
+
+    def __init__(self):
+        self.heap = []
+        self.count = 0
+        self.deadline = NEVER
+
+    def __len__(self):
+        return sum(1 for _, _, event in self.heap if event.active)
+
+    def every(self, period, callback, start=0):
+        # callback(cycle) every period cycles, the first at start + period
+        if period <= 0:
+            raise ValueError(f'event period must be positive, got {period}')
+        return self.push(Event(callback, period, start + period))
+
+    def at(self, cycle, callback):
+        # callback(cycle) once, at the first instruction boundary on or after cycle
+        return self.push(Event(callback, 0, cycle))
+
+    def push(self, event):
+        # the counter breaks ties in registration order
+        heapq.heappush(self.heap, (event.deadline, self.count, event))
+        self.count += 1
+        self.deadline = self.heap[0][0]
+        return event
+
+    def cancel(self, event):
+        # dropped lazily when it reaches the top of the heap
+        event.active = False
+        self.settle()
+
+    def settle(self):
+        heap = self.heap
+        while heap and not heap[0][2].active:
+            heapq.heappop(heap)
+        self.deadline = heap[0][0] if heap else NEVER
+
+    def run(self, now):
+        # fire everything due by now, periodic events catch up one period at a time
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            deadline, _, event = heapq.heappop(heap)
+            if not event.active:
+                continue
+            event.callback(deadline)
+            if event.period and event.active:
+                event.deadline = deadline + event.period
+                heapq.heappush(heap, (event.deadline, self.count, event))
+                self.count += 1
+            else:
+                event.active = False
+        self.settle()
+
+    def clear(self):
+        self.heap.clear()
+        self.deadline = NEVER
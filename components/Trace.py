@@ -0,0 +1,135 @@
+import struct
+from collections import namedtuple
+
+from components.CPU import OP_CODES
+
+# pc, opcode, 2 operand bytes, a, x, y, sp, p, cycles before the instruction
+RECORD = struct.Struct('<HBBBBBBHBQ')
+
+Record = namedtuple('Record', ['pc', 'opcode', 'lo', 'hi', 'a', 'x', 'y', 'sp', 'p', 'cycle'])
+
+NAMES = {code: name for name, code in OP_CODES.items()}
+
+# mode: (instruction length, operand format)
+FORMATS = {
+    'IMM': (2, '#${lo:02X}'),
+    'ZPG': (2, '${lo:02X}'),
+    'ZPX': (2, '${lo:02X},X'),
+    'ZPY': (2, '${lo:02X},Y'),
+    'ABS': (3, '${word:04X}'),
+    'ABX': (3, '${word:04X},X'),
+    'ABY': (3, '${word:04X},Y'),
+    'INX': (2, '(${lo:02X},X)'),
+    'INY': (2, '(${lo:02X}),Y'),
+    'IND': (3, '(${word:04X})'),
+    'REL': (2, '${target:04X}'),
+    'ACC': (1, 'A'),
+    'IMP': (1, ''),
+}
+
+
+def disassemble(record):
+    name = NAMES.get(record.opcode)
+    if name is None:
+        length, text = 1, f'.byte ${record.opcode:02X}'
+    else:
+        mnemonic, mode = name.split('_')
+        length, operand = FORMATS[mode]
+        # branch offsets are relative to the next instruction
+        target = (record.pc + 2 + record.lo - ((record.lo & 0x80) << 1)) & 0xFFFF
+        text = (mnemonic + ' ' + operand.format(lo=record.lo, word=record.lo | (record.hi << 8),
+                                                target=target)).rstrip()
+
+    code = ' '.join(f'{byte:02X}' for byte in (record.opcode, record.lo, record.hi)[:length])
+    return (f'{record.pc:04X}  {code:8s}  {text:13s} '
+            f'A:{record.a:02X} X:{record.x:02X} Y:{record.y:02X} P:{record.p:02X} '
+            f'SP:{record.sp:04X} CYC:{record.cycle}')
+
+
+def unpack(data):
+    return map(Record._make, RECORD.iter_unpack(data))
+
+
+class TraceBuffer():
+    # fixed-size ring of packed records, oldest overwritten first
+
+    def __init__(self, capacity=1 << 16):
+        self.capacity = capacity
+        self.buf = bytearray(capacity * RECORD.size)
+        self.pack = RECORD.pack_into
+        self.index = 0
+        self.wrapped = False
+
+    def __len__(self):
+        return self.capacity if self.wrapped else self.index
+
+    def full(self):
+        # called by the CPU when it fills the last slot
+        self.index = 0
+        self.wrapped = True
+
+    def clear(self):
+        self.index = 0
+        self.wrapped = False
+
+    def records(self):
+        # decoded lazily, oldest first
+        view = memoryview(self.buf)
+        end = self.index * RECORD.size
+        if self.wrapped:
+            yield from unpack(view[end:])
+        yield from unpack(view[:end])
+
+    def __iter__(self):
+        return self.records()
+
+    def disassemble(self):
+        return map(disassemble, self.records())
+
+
+class TraceFile():
+    # streams packed records to a file, one chunk at a time
+
+    def __init__(self, path, chunk=4096):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.capacity = chunk
+        self.buf = bytearray(chunk * RECORD.size)
+        self.pack = RECORD.pack_into
+        self.index = 0
+        self.written = 0
+
+    def __len__(self):
+        return self.written + self.index
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def full(self):
+        self.file.write(self.buf)
+        self.written += self.capacity
+        self.index = 0
+
+    def flush(self):
+        self.file.write(memoryview(self.buf)[:self.index * RECORD.size])
+        self.written += self.index
+        self.index = 0
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+def read_trace(path, chunk=4096):
+    # records from a TraceFile, decoded as they are read
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(chunk * RECORD.size)
+            if not data:
+                break
+            yield from unpack(data)
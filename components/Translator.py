@@ -0,0 +1,257 @@
+from collections import namedtuple
+
+from components.CPU import CYCLE_TABLE, CYCLES, NZ, NZ_CLEAR, OP_CODES, OPCODE_TABLE, PAGE_PENALTY, Idle, Trap
+from components.Instructions import LENGTHS
+from components.Memory import MAX_MEMORY
+
+MAX_BLOCK_INSTRUCTIONS = 64
+# entries into a PC before it is worth compiling a block there
+HOT_THRESHOLD = 2
+
+# only the load/store families are translated, any other opcode ends a block
+NAMES = {code: name for name, code in OP_CODES.items() if name[:2] in ('LD', 'ST')}
+
+# mnemonics whose handlers store to memory, the read-modify-write ones
+# only when they do not work on A
+STORES = ('STA', 'STX', 'STY', 'PHA', 'PHP', 'JSR', 'BRK')
+READ_MODIFY_WRITE = ('ASL', 'LSR', 'ROL', 'ROR', 'INC', 'DEC')
+
+Block = namedtuple('Block', ['run', 'start', 'end', 'max_cycles', 'instructions'])
+
+
+def build_write_table():
+    # 1 for every opcode whose interpreted handler can write memory
+    table = bytearray(256)
+    for name, code in OP_CODES.items():
+        mnemonic, mode = name.split('_')
+        if mnemonic in STORES or (mnemonic in READ_MODIFY_WRITE and mode != 'ACC'):
+            table[code] = 1
+    return table
+
+
+WRITES = build_write_table()
+
+
+def address(mode, lo, hi):
+    # source for the effective address, and the page-crossing check
+    if mode == 'ZPG':
+        return [], f'{lo:#04x}', None
+    if mode == 'ZPX':
+        return [], f'({lo:#04x} + x) & 0xff', None
+    if mode == 'ZPY':
+        return [], f'({lo:#04x} + y) & 0xff', None
+
+    absolute = lo | (hi << 8)
+    if mode == 'ABS':
+        return [], f'{absolute:#06x}', None
+    if mode == 'ABX':
+        # crossing a page is known up front from the low byte
+        return [], f'({absolute:#06x} + x) & 0xffff', f'x > {0xFF - lo:#04x}'
+    if mode == 'ABY':
+        return [], f'({absolute:#06x} + y) & 0xffff', f'y > {0xFF - lo:#04x}'
+    # zero page pointers wrap within page 0
+    if mode == 'INX':
+        return ['p = (%#04x + x) & 0xff' % lo], 'mem[p] | mem[(p + 1) & 0xff] << 8', None
+    if mode == 'INY':
+        return (['p = mem[%#04x] | mem[%#04x] << 8' % (lo, (lo + 1) & 0xFF)], '(p + y) & 0xffff',
+                '(p & 0xff) + y > 0xff')
+    raise ValueError(mode)
+
+
+class WriteWatch():
+    # stands in for cpu.mem while an interpreted instruction runs,
+    # so its stores invalidate blocks just like translated ones
+
+    __slots__ = ('mem', 'code', 'invalidate')
+
+    def __init__(self, mem, code, invalidate):
+        self.mem = mem
+        self.code = code
+        self.invalidate = invalidate
+
+    def __len__(self):
+        return MAX_MEMORY
+
+    def __getitem__(self, address):
+        return self.mem[address]
+
+    def __setitem__(self, address, value):
+        self.mem[address] = value
+        if self.code[address]:
+            self.invalidate(address)
+
+
+class BlockCache():
+
+    def __init__(self, cpu, max_instructions=MAX_BLOCK_INSTRUCTIONS, threshold=HOT_THRESHOLD):
+        self.cpu = cpu
+        self.max_instructions = max_instructions
+        self.threshold = threshold
+        self.blocks = {}
+        self.visits = {}
+        # 1 for every address some cached block was decoded from
+        self.code = bytearray(MAX_MEMORY)
+
+    def execute(self, expected_cycles):
+        cpu = self.cpu
+        cpu.trapped = None
+        scheduler = cpu.scheduler
+        if scheduler is None:
+            return self.execute_blocks(expected_cycles)
+
+        # same deadline chunking as CPU.execute
+        end = cpu.taken_cycles + expected_cycles
+        while cpu.taken_cycles < end and cpu.trapped is None:
+            deadline = scheduler.deadline
+            self.execute_blocks(min(end, deadline) - cpu.taken_cycles)
+            if cpu.taken_cycles >= deadline:
+                scheduler.run(cpu.taken_cycles)
+
+    def execute_blocks(self, expected_cycles):
+        cpu = self.cpu
+        blocks = self.blocks
+        visits = self.visits
+        table = OPCODE_TABLE
+        cycle_table = CYCLE_TABLE
+        writes = WRITES
+        mem = cpu.mem
+        watch = WriteWatch(mem, self.code, self.invalidate)
+
+        while expected_cycles > 0:
+            # interrupts are sampled between blocks, not inside them
+            if cpu.pending:
+                cycles = cpu.interrupt()
+                if cycles:
+                    cpu.taken_cycles += cycles
+                    expected_cycles -= cycles
+                    continue
+
+            block = blocks.get(cpu.pc)
+            if block is None:
+                # run-once code is cheaper to interpret than to compile
+                seen = visits.get(cpu.pc, 0) + 1
+                visits[cpu.pc] = seen
+                if seen >= self.threshold:
+                    block = self.translate(cpu.pc)
+
+            # a block only runs when the interpreter would have run all of it
+            if block is not None and block.max_cycles <= expected_cycles:
+                cycles = block.run(cpu)
+            else:
+                ins = cpu.fetch_byte()
+                if writes[ins]:
+                    cpu.mem = watch
+                    try:
+                        cycles = cycle_table[ins] + table[ins](cpu)
+                    finally:
+                        cpu.mem = mem
+                else:
+                    try:
+                        cycles = cycle_table[ins] + table[ins](cpu)
+                    except Trap as trap:
+                        # stuck in an idle loop, see CPU.loop_back
+                        cpu.taken_cycles += cycle_table[ins] + trap.extra
+                        cpu.trapped = trap.pc
+                        break
+                    except Idle as idle:
+                        # waiting for a device, skip as in CPU.execute_fast
+                        cycles = cycle_table[ins] + idle.extra
+                        rounds = (expected_cycles - cycles - 1) // idle.cycles
+                        if rounds > 0:
+                            cycles += rounds * idle.cycles
+
+            cpu.taken_cycles += cycles
+            expected_cycles -= cycles
+
+    def translate(self, start):
+        mem = self.cpu.mem
+        lines = []
+        pc = start
+        base = 0
+        penalties = 0
+        flags = False
+
+        def exit_lines(next_pc, cycles):
+            out = ['cpu.a = a', 'cpu.x = x', 'cpu.y = y', f'cpu.pc = {next_pc:#06x}']
+            if flags:
+                out.append(f'cpu.p = (cpu.p & {NZ_CLEAR:#04x}) | NZ[nz]')
+            out.append(f'return {cycles} + extra')
+            return out
+
+        count = 0
+        while count < self.max_instructions:
+            name = NAMES.get(mem[pc])
+            if name is None:
+                break
+            mnemonic, mode = name.split('_')
+            length = LENGTHS[mode]
+            if pc + length > MAX_MEMORY:
+                break
+
+            lo = mem[pc + 1]
+            hi = mem[pc + 2] if length == 3 else 0
+            register = mnemonic[2].lower()
+            next_pc = pc + length
+
+            lines.append(f'# {pc:#06x} {name}')
+            base += CYCLES[name]
+            if mnemonic.startswith('LD'):
+                if mode == 'IMM':
+                    lines.append(f'{register} = {lo:#04x}')
+                else:
+                    setup, addr, penalty = address(mode, lo, hi)
+                    lines += setup
+                    lines.append(f'{register} = mem[{addr}]')
+                    if name in PAGE_PENALTY:
+                        lines += [f'if {penalty}:', '    extra += 1']
+                        penalties += 1
+                # N/Z only need to be right when the block exits
+                lines.append(f'nz = {register}')
+                flags = True
+            else:
+                setup, addr, _ = address(mode, lo, hi)
+                lines += setup
+                lines += [f'addr = {addr}', f'mem[addr] = {register}', 'dirty[addr >> 8] = 1']
+                # a write into decoded code ends the block right after it
+                lines += ['if code[addr]:', '    invalidate(addr)']
+                lines += ['    ' + line for line in exit_lines(next_pc, base)]
+
+            pc = next_pc
+            count += 1
+
+        if count == 0:
+            return None
+
+        lines += exit_lines(pc, base)
+        body = ['a = cpu.a', 'x = cpu.x', 'y = cpu.y', 'extra = 0'] + lines
+        source = (
+            'def make(mem, dirty, code, invalidate):\n'
+            '    def run(cpu):\n'
+            + ''.join(f'        {line}\n' for line in body)
+            + '    return run\n'
+        )
+
+        namespace = {'NZ': NZ}
+        exec(compile(source, f'<block {start:#06x}>', 'exec'), namespace)
+        run = namespace['make'](mem, self.cpu.dirty, self.code, self.invalidate)
+
+        block = Block(run, start, pc, base + penalties, count)
+        self.blocks[start] = block
+        self.code[start:pc] = b'\x01' * (pc - start)
+        return block
+
+    def invalidate(self, addr):
+        stale = [block for block in self.blocks.values() if block.start <= addr < block.end]
+        for block in stale:
+            del self.blocks[block.start]
+            self.code[block.start:block.end] = bytes(block.end - block.start)
+
+        # blocks overlapping the cleared ranges still need their marks
+        for block in self.blocks.values():
+            if any(block.start < old.end and old.start < block.end for old in stale):
+                self.code[block.start:block.end] = b'\x01' * (block.end - block.start)
+
+    def clear(self):
+        self.blocks.clear()
+        self.visits.clear()
+        self.code[:] = bytes(MAX_MEMORY)
@@ -0,0 +1,153 @@
+import json
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from components.CPU import CPU, OP_CODES, STACK, STATUS_MASK
+
+# per-opcode test vector files, one JSON array of cases each, named after the
+# opcode (a9.json), in the SingleStepTests / ProcessorTests layout:
+# {"name": ..., "initial": state, "final": state, "cycles": [[address, value, "read"], ...]}
+# where a state is {"pc", "s", "a", "x", "y", "p", "ram": [[address, value], ...]}
+
+# failures kept per file, the rest are only counted
+MAX_FAILURES = 10
+
+FileResult = namedtuple('FileResult', ['path', 'passed', 'failed', 'failures'])
+
+DOCUMENTED = set(OP_CODES.values())
+SEPARATORS = re.compile(r'[\s,]*')
+
+# per-worker Harness, set up once by init_worker
+_worker_harness = None
+
+
+def read_cases(path, chunk=1 << 20):
+    # one case at a time out of the file's JSON array, never the whole file at once
+    decoder = json.JSONDecoder()
+    with open(path) as f:
+        text = f.read(chunk).lstrip()
+        if not text.startswith('['):
+            raise ValueError(f'{path} is not a JSON array')
+        pos = 1
+        while True:
+            pos = SEPARATORS.match(text, pos).end()
+            if pos < len(text):
+                if text[pos] == ']':
+                    return
+                try:
+                    case, pos = decoder.raw_decode(text, pos)
+                except json.JSONDecodeError:
+                    # cut off at the end of the chunk, read on
+                    pass
+                else:
+                    yield case
+                    continue
+
+            more = f.read(chunk)
+            if not more:
+                raise ValueError(f'{path} ends inside the case list')
+            text = text[pos:] + more
+            pos = 0
+
+
+def opcode(path):
+    # a9.json -> 0xA9, None for files not named after an opcode
+    stem = os.path.splitext(os.path.basename(path))[0]
+    try:
+        return int(stem, 16)
+    except ValueError:
+        return None
+
+
+def vector_files(directory, opcodes=None):
+    # the files of the documented opcodes, or of those among `opcodes`
+    wanted = DOCUMENTED if opcodes is None else DOCUMENTED & set(opcodes)
+    names = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+    return [os.path.join(directory, name) for name in names if opcode(name) in wanted]
+
+
+class Harness():
+    # one CPU reused for every case, memory set up and put back a page at a time
+
+    def __init__(self):
+        self.cpu = CPU()
+        self.cpu.memory.clear()
+        # the empty memory every case starts from, restore only copies back dirty pages
+        self.blank = self.cpu.memory.snapshot()
+
+    def setup(self, initial):
+        cpu = self.cpu
+        cpu.reset()
+        cpu.pc = initial['pc']
+        cpu.sp = STACK | initial['s']
+        cpu.a, cpu.x, cpu.y = initial['a'], initial['x'], initial['y']
+        # B and bit 5 only exist on the stack
+        cpu.p = initial['p'] & STATUS_MASK
+
+        data = cpu.memory.data
+        dirty = cpu.memory.dirty
+        for address, value in initial['ram']:
+            data[address] = value
+            dirty[address >> 8] = 1
+
+    def check(self, final, cycles, expected_cycles):
+        # what differs from the final state, empty if nothing
+        cpu = self.cpu
+        errors = []
+        for name, actual, expected in (('pc', cpu.pc, final['pc']), ('s', cpu.sp & 0xFF, final['s']),
+                                       ('a', cpu.a, final['a']), ('x', cpu.x, final['x']),
+                                       ('y', cpu.y, final['y']), ('p', cpu.p, final['p'] & STATUS_MASK)):
+            if actual != expected:
+                errors.append(f'{name} {actual:#04x}, expected {expected:#04x}')
+
+        data = cpu.memory.data
+        for address, value in final['ram']:
+            if data[address] != value:
+                errors.append(f'${address:04X} {data[address]:#04x}, expected {value:#04x}')
+
+        if cycles != expected_cycles:
+            errors.append(f'{cycles} cycles, expected {expected_cycles}')
+        return errors
+
+    def run(self, case):
+        # runs the case's one instruction, returns the differences from its final state
+        self.setup(case['initial'])
+        try:
+            cycles = self.cpu.run_until(instructions=1).cycles
+            return self.check(case['final'], cycles, len(case['cycles']))
+        finally:
+            self.cpu.memory.restore(self.blank)
+
+    def run_file(self, path):
+        passed = failed = 0
+        failures = []
+        for case in read_cases(path):
+            errors = self.run(case)
+            if not errors:
+                passed += 1
+                continue
+            failed += 1
+            if len(failures) < MAX_FAILURES:
+                failures.append((case['name'], errors))
+        return FileResult(path, passed, failed, failures)
+
+
+def init_worker():
+    global _worker_harness
+    _worker_harness = Harness()
+
+
+def run_worker_file(path):
+    return _worker_harness.run_file(path)
+
+
+def run_files(paths, workers=None):
+    # one file per task, each worker streams its files through its own Harness
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        harness = Harness()
+        return [harness.run_file(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        return list(executor.map(run_worker_file, paths))
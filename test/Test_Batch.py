@@ -0,0 +1,129 @@
+import unittest
+from components.CPU import CPU
+
+try:
+    import numpy
+    from components.Batch import BatchCPU
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, 'numpy not installed')
+class Test_Batch(unittest.TestCase):
+
+    def setUp(self):
+        self.batch = BatchCPU(4)
+        self.batch.reset()
+
+    def test_reset(self):
+        self.assertTrue((self.batch.pc == 0xFFFC).all())
+        self.assertTrue((self.batch.sp == 0x0100).all())
+        self.assertTrue((self.batch.a == 0).all())
+
+    def test_load_image_into_all_lanes(self):
+        self.batch.load(bytes([0xA9, 0x42]), 0xFFFC)
+
+        self.assertTrue((self.batch.memory[:, 0xFFFC] == 0xA9).all())
+        self.assertTrue((self.batch.memory[:, 0xFFFD] == 0x42).all())
+
+    def test_load_a_immediate(self):
+        self.batch.load(bytes([0xA9, 0x42]), 0xFFFC)
+
+        self.batch.execute(2)
+
+        self.assertTrue((self.batch.a == 0x42).all())
+        self.assertTrue((self.batch.taken_cycles == 2).all())
+
+    def test_load_a_immediate_flags_per_lane(self):
+        self.batch.load(bytes([0xA9, 0x00]), 0xFFFC)
+        self.batch.memory[1, 0xFFFD] = 0xFB
+
+        self.batch.execute(2)
+
+        self.assertEqual(list(self.batch.z), [1, 0, 1, 1])
+        self.assertEqual(list(self.batch.n), [0, 1, 0, 0])
+
+    def test_load_a_absolute_x_page_boundary_crossed_per_lane(self):
+        self.batch.load(bytes([0xBD, 0x02, 0x44]), 0xFFFC)
+        self.batch.x[:] = [0x01, 0xFF, 0x01, 0xFF]
+        self.batch.memory[:, 0x4403] = 0x24
+        self.batch.memory[:, 0x4501] = 0x42
+
+        self.batch.execute(4)
+
+        self.assertEqual(list(self.batch.a), [0x24, 0x42, 0x24, 0x42])
+        self.assertEqual(list(self.batch.taken_cycles), [4, 5, 4, 5])
+
+    def test_load_a_indirect_y(self):
+        self.batch.load(bytes([0xB1, 0x20]), 0xFFFC)
+        self.batch.load(bytes([0x30, 0x40]), 0x0020)
+        self.batch.y[:] = 0x04
+        self.batch.memory[:, 0x4034] = 0x42
+
+        self.batch.execute(5)
+
+        self.assertTrue((self.batch.a == 0x42).all())
+        self.assertTrue((self.batch.taken_cycles == 5).all())
+
+    def test_store_a_indirect_x(self):
+        self.batch.load(bytes([0x81, 0x20]), 0xFFFC)
+        self.batch.a[:] = [1, 2, 3, 4]
+        self.batch.x[:] = 0x04
+        self.batch.memory[:, 0x24] = 0x88
+
+        self.batch.execute(6)
+
+        self.assertEqual(list(self.batch.memory[:, 0x88]), [1, 2, 3, 4])
+
+    def test_unknown_code_sets_break(self):
+        self.batch.load(bytes([0x02]), 0xFFFC)
+
+        self.batch.execute(1)
+
+        self.assertTrue((self.batch.b == 1).all())
+        self.assertTrue((self.batch.taken_cycles == 1).all())
+
+    def test_lanes_run_their_own_budget(self):
+        self.batch.load(bytes([0xA9, 0x01, 0xA9, 0x02, 0xA9, 0x03]), 0x0600)
+        self.batch.pc[:] = 0x0600
+
+        self.batch.execute(numpy.array([2, 4, 6, 2]))
+
+        self.assertEqual(list(self.batch.a), [1, 2, 3, 1])
+        self.assertEqual(list(self.batch.pc), [0x0602, 0x0604, 0x0606, 0x0602])
+
+    def test_matches_cpu(self):
+        program = bytes([
+            0xA9, 0x42,        # LDA #$42
+            0x85, 0x10,        # STA $10
+            0xA2, 0x04,        # LDX #$04
+            0x95, 0x20,        # STA $20,X
+            0xA0, 0x10,        # LDY #$10
+            0xB9, 0xF8, 0x25,  # LDA $25F8,Y
+            0x91, 0x30,        # STA ($30),Y
+            0xB4, 0x20,        # LDY $20,X
+            0x8C, 0x00, 0x30,  # STY $3000
+            0xA5, 0x10,        # LDA $10
+        ])
+
+        cpus = []
+        for lane in range(4):
+            cpu = CPU()
+            cpu.reset()
+            cpu.pc = 0x0600
+            cpu.memory.load(program, 0x0600)
+            cpu.memory.data[0x2608] = lane
+            cpu.memory.data[0x30] = 0x80
+            cpu.memory.data[0x31] = 0x40
+            cpus.append(cpu)
+
+        batch = BatchCPU.from_cpus(cpus)
+        batch.execute(35)
+        for cpu in cpus:
+            cpu.execute(35)
+
+        for lane, cpu in enumerate(cpus):
+            result = batch.get_lane(lane)
+            self.assertEqual((result.pc, result.a, result.x, result.y), (cpu.pc, cpu.a, cpu.x, cpu.y))
+            self.assertEqual((result.z, result.n, result.taken_cycles), (cpu.z, cpu.n, cpu.taken_cycles))
+            self.assertEqual(result.memory.data, cpu.memory.data)
@@ -0,0 +1,107 @@
+import unittest
+from components.Bus import Bus, Device, Mirror, ROM
+from components.CPU import CPU
+
+
+class Test_Bus(unittest.TestCase):
+
+    def setUp(self):
+        self.cpu = CPU()
+        self.cpu.reset()
+
+    def test_no_bus_indexes_ram_directly(self):
+        self.assertIsNone(self.cpu.bus)
+        self.assertIs(self.cpu.mem, self.cpu.memory.data)
+
+    def test_attach_and_detach(self):
+        bus = self.cpu.attach_bus()
+
+        self.assertIs(self.cpu.mem, bus)
+        self.assertEqual(len(bus.readers), 256)
+
+        self.cpu.detach_bus()
+
+        self.assertIs(self.cpu.mem, self.cpu.memory.data)
+
+    def test_unmapped_pages_are_ram(self):
+        self.cpu.attach_bus()
+        self.cpu.a = 0x42
+        self.cpu.memory.data[0xFFFC] = 0x8D
+        self.cpu.memory.data[0xFFFD] = 0x80
+        self.cpu.memory.data[0xFFFE] = 0x25
+
+        self.cpu.execute(4)
+
+        self.assertEqual(self.cpu.memory.data[0x2580], 0x42)
+
+    def test_rom_ignores_stores(self):
+        bus = self.cpu.attach_bus()
+        bus.map(0x8000, 0xFFFF, ROM())
+        self.cpu.memory.data[0x8000] = 0x24
+        self.cpu.a = 0x42
+        self.cpu.memory.data[0xFFFC] = 0x8D
+        self.cpu.memory.data[0xFFFD] = 0x00
+        self.cpu.memory.data[0xFFFE] = 0x80
+
+        self.cpu.execute(4)
+
+        self.assertEqual(self.cpu.memory.data[0x8000], 0x24)
+
+    def test_device_read_callback(self):
+        bus = self.cpu.attach_bus()
+        reads = []
+
+        def read(address):
+            reads.append(address)
+            return 0x42
+
+        bus.map(0x4000, 0x40FF, Device(read=read))
+        self.cpu.memory.data[0xFFFC] = 0xAD
+        self.cpu.memory.data[0xFFFD] = 0x16
+        self.cpu.memory.data[0xFFFE] = 0x40
+
+        self.cpu.execute(4)
+
+        self.assertEqual(self.cpu.a, 0x42)
+        self.assertEqual(reads, [0x4016])
+
+    def test_device_write_callback(self):
+        bus = self.cpu.attach_bus()
+        writes = []
+        bus.map(0x4000, 0x40FF, Device(write=lambda address, value: writes.append((address, value))))
+        self.cpu.a = 0x42
+        self.cpu.memory.data[0xFFFC] = 0x8D
+        self.cpu.memory.data[0xFFFD] = 0x14
+        self.cpu.memory.data[0xFFFE] = 0x40
+
+        self.cpu.execute(4)
+
+        self.assertEqual(writes, [(0x4014, 0x42)])
+        self.assertEqual(self.cpu.memory.data[0x4014], 0)
+
+    def test_mirror(self):
+        bus = self.cpu.attach_bus()
+        bus.map(0x0800, 0x1FFF, Mirror(bus, 0x0000, 0x0800))
+
+        bus[0x0812] = 0x42
+
+        self.assertEqual(self.cpu.memory.data[0x0012], 0x42)
+        self.assertEqual(bus[0x1012], 0x42)
+        self.assertEqual(bus[0x1812], 0x42)
+
+    def test_unmap(self):
+        bus = Bus(self.cpu.memory)
+        bus.map(0x8000, 0x80FF, ROM())
+        self.assertTrue(bus.mapped())
+
+        bus.unmap(0x8000, 0x80FF)
+
+        self.assertFalse(bus.mapped())
+
+    def test_map_needs_whole_pages(self):
+        bus = Bus(self.cpu.memory)
+
+        with self.assertRaises(ValueError):
+            bus.map(0x8010, 0x80FF, ROM())
+        with self.assertRaises(ValueError):
+            bus.map(0x8000, 0x8010, ROM())
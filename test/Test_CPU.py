@@ -1,5 +1,6 @@
 import unittest
-from components.CPU import CPU
+from components.CPU import CPU, LOOP_BUSY, breakpoint_map
+from components.Scheduler import Scheduler
 
 
 class Test_CPU(unittest.TestCase):
@@ -35,10 +36,35 @@ class Test_CPU(unittest.TestCase):
         self.assertEquals(self.cpu.v, 1)
         self.assertEquals(self.cpu.n, 1)
 
+    def test_flags_packed_in_status_register(self):
+        self.set_all_flags_on()
+
+        self.assertEquals(self.cpu.p, 0xDF)
+
+        self.cpu.z = 0
+        self.cpu.i = 0
+
+        self.assertEquals(self.cpu.p, 0xD9)
+
+    def test_flags_read_from_status_register(self):
+        self.cpu.p = 0x81
+
+        self.assertEquals((self.cpu.c, self.cpu.z, self.cpu.n), (1, 0, 1))
+
+    def test_register_file_is_slotted(self):
+        self.assertFalse(hasattr(self.cpu, '__dict__'))
+        self.assertIs(self.cpu.mem, self.cpu.memory.data)
+
+    def test_memory_load_keeps_direct_buffer(self):
+        self.cpu.memory.load(bytes([0x42]), 0x10)
+        self.cpu.memory.clear()
+
+        self.assertIs(self.cpu.mem, self.cpu.memory.data)
+
     def test_break_flag(self):
         self.cpu.reset()
 
-        self.cpu.memory.data[0xFFFC] = 'break'
+        self.cpu.memory.data[0xFFFC] = 0x02  # not an opcode
 
         self.cpu.execute(1)
 
@@ -65,17 +91,139 @@ class Test_CPU(unittest.TestCase):
 
         self.test_all_cpu_flags_off()
 
+    def test_cpu_reset_from_vector(self):
+        self.cpu.memory.data[0xFFFC] = 0x00
+        self.cpu.memory.data[0xFFFD] = 0x06
+
+        self.cpu.reset(use_vector=True)
+
+        self.assertEquals(self.cpu.pc, 0x0600)
+        self.assertEquals(self.cpu.sp, 0x0100)
+
     def test_taken_cycles_correct(self):
         self.cpu.reset()
 
-        self.cpu.memory.data[0xFFFC] = 'X'
-        self.cpu.memory.data[0xFFFD] = 'X'
-        self.cpu.memory.data[0xFFFE] = 'X'
+        # unrecognized codes only take the fetch cycle
+        self.cpu.memory.data[0xFFFC] = 0x02
+        self.cpu.memory.data[0xFFFD] = 0x02
+        self.cpu.memory.data[0xFFFE] = 0x02
 
         self.cpu.execute(3)
 
         self.assertEquals(self.cpu.taken_cycles, 3)
 
+    def test_cpu_reset_clears_taken_cycles(self):
+        self.cpu.reset()
+        self.cpu.memory.data[0xFFFC] = 0xA9
+        self.cpu.execute(2)
+
+        self.cpu.reset()
+
+        self.assertEquals(self.cpu.taken_cycles, 0)
+
+    def test_taken_cycles_accumulate(self):
+        self.cpu.reset()
+
+        self.cpu.memory.data[0xFFFC] = 0xA9
+        self.cpu.memory.data[0xFFFE] = 0xA5
+
+        self.cpu.execute(2)
+        self.cpu.execute(3)
+
+        self.assertEquals(self.cpu.taken_cycles, 5)
+
+    def test_snapshot_and_restore(self):
+        self.cpu.reset()
+        self.cpu.memory.load(bytes([0xA9, 0x42, 0x85, 0x10]), 0x0600)
+        self.cpu.pc = 0x0600
+        snapshot = self.cpu.snapshot()
+
+        self.cpu.execute(5)
+        self.assertEquals(self.cpu.memory.data[0x10], 0x42)
+
+        self.cpu.restore(snapshot)
+
+        self.assertEquals(self.cpu.pc, 0x0600)
+        self.assertEquals(self.cpu.a, 0)
+        self.assertEquals(self.cpu.taken_cycles, 0)
+        self.assertEquals(self.cpu.memory.data[0x10], 0)
+
+    def test_restore_and_rerun(self):
+        self.cpu.reset()
+        self.cpu.memory.load(bytes([0xA9, 0xFB, 0x85, 0x10]), 0x0600)
+        self.cpu.pc = 0x0600
+        snapshot = self.cpu.snapshot()
+
+        for _ in range(3):
+            self.cpu.restore(snapshot)
+            self.cpu.execute(5)
+
+            self.assertEquals(self.cpu.a, 0xFB)
+            self.assertEquals(self.cpu.n, 1)
+            self.assertEquals(self.cpu.taken_cycles, 5)
+            self.assertEquals(list(self.cpu.memory.dirty_pages()), [0x00])
+
+    def load_run_program(self):
+        self.cpu.reset()
+        self.cpu.memory.load(bytes([
+            0xA9, 0x42,        # LDA #$42
+            0x85, 0x10,        # STA $10
+            0xBD, 0x02, 0x44,  # LDA $4402,X
+            0xA2, 0x24,        # LDX #$24
+        ]), 0x0600)
+        self.cpu.pc = 0x0600
+        self.cpu.x = 0xFF
+
+    def test_run_until_pc(self):
+        self.load_run_program()
+
+        result = self.cpu.run_until(pc=0x0607)
+
+        self.assertEquals(result, ('pc', 0x0607, 10, 3, 0, 0))
+        self.assertEquals(self.cpu.pc, 0x0607)
+        self.assertEquals(self.cpu.taken_cycles, 10)
+
+    def test_run_until_any_of_several_pcs(self):
+        self.load_run_program()
+
+        result = self.cpu.run_until(pc=[0x0609, 0x0604])
+
+        self.assertEquals(result.reason, 'pc')
+        self.assertEquals(result.pc, 0x0604)
+
+    def test_run_until_breakpoint_map(self):
+        self.load_run_program()
+        breakpoints = breakpoint_map([0x0602])
+
+        self.assertEquals(self.cpu.run_until(pc=breakpoints).instructions, 1)
+        self.assertEquals(self.cpu.run_until(pc=breakpoints, instructions=2).reason, 'instructions')
+
+    def test_run_until_cycles(self):
+        self.load_run_program()
+
+        result = self.cpu.run_until(cycles=4)
+
+        self.assertEquals(result, ('cycles', 0x0604, 5, 2, 0, 0))
+
+    def test_run_until_instructions(self):
+        self.load_run_program()
+
+        result = self.cpu.run_until(instructions=3)
+
+        self.assertEquals(result, ('instructions', 0x0607, 10, 3, 0, 0))
+        self.assertEquals(self.cpu.memory.data[0x10], 0x42)
+
+    def test_run_until_predicate(self):
+        self.load_run_program()
+
+        result = self.cpu.run_until(predicate=lambda cpu: cpu.memory.data[0x10] == 0x42)
+
+        self.assertEquals(result, ('predicate', 0x0604, 5, 2, 0, 0))
+
+    def test_run_until_needs_a_condition(self):
+        with self.assertRaises(ValueError):
+            self.cpu.run_until()
+
     def test_load_a_immediate(self):
         self.cpu.reset()
 
@@ -266,6 +414,18 @@ class Test_CPU(unittest.TestCase):
 
         self.assertEquals(self.cpu.x, 0x42)
 
+    def test_load_x_immediate_flags_from_x(self):
+        self.cpu.reset()
+
+        self.cpu.a = 0x42
+        self.cpu.memory.data[0xFFFC] = 0xA2
+        self.cpu.memory.data[0xFFFD] = 0
+
+        self.cpu.execute(2)
+
+        self.assertEquals(self.cpu.z, 1)
+        self.assertEquals(self.cpu.n, 0)
+
     def test_load_x_zero_page(self):
         self.cpu.reset()
 
@@ -324,6 +484,20 @@ class Test_CPU(unittest.TestCase):
         self.assertEquals(self.cpu.x, 0x42)
         self.assertEquals(self.cpu.taken_cycles, 5)
 
+    def test_load_x_absolute_y_negative_flag(self):
+        self.cpu.reset()
+
+        self.cpu.memory.data[0xFFFC] = 0xBE
+        self.cpu.memory.data[0xFFFD] = 0x80
+        self.cpu.memory.data[0xFFFE] = 0x25
+        self.cpu.y = 0x01
+        self.cpu.memory.data[0x2581] = 0xFB
+
+        self.cpu.execute(4)
+        self.assertEquals(self.cpu.x, 0xFB)
+        self.assertEquals(self.cpu.n, 1)
+        self.assertEquals(self.cpu.z, 0)
+
     def test_load_y_immediate(self):
         self.cpu.reset()
 
@@ -334,6 +508,17 @@ class Test_CPU(unittest.TestCase):
 
         self.assertEquals(self.cpu.y, 0x42)
 
+    def test_load_y_immediate_flags_from_y(self):
+        self.cpu.reset()
+
+        self.cpu.memory.data[0xFFFC] = 0xA0
+        self.cpu.memory.data[0xFFFD] = 0x80
+
+        self.cpu.execute(2)
+
+        self.assertEquals(self.cpu.z, 0)
+        self.assertEquals(self.cpu.n, 1)
+
     def test_load_y_zero_page(self):
         self.cpu.reset()
 
@@ -536,3 +721,522 @@ class Test_CPU(unittest.TestCase):
 
         self.cpu.execute(4)
         self.assertEquals(self.cpu.memory.data[0x2580], 0x42)
+
+    def run_program(self, program, cycles, start=0x0600):
+        self.cpu.reset()
+        self.cpu.memory.load(bytes(program), start)
+        self.cpu.pc = start
+        self.cpu.execute(cycles)
+
+    def test_add_with_carry(self):
+        # SEC, LDA #$7F, ADC #$01
+        self.run_program([0x38, 0xA9, 0x7F, 0x69, 0x01], 6)
+
+        self.assertEquals(self.cpu.a, 0x81)
+        self.assertEquals((self.cpu.c, self.cpu.v, self.cpu.n, self.cpu.z), (0, 1, 1, 0))
+
+    def test_add_with_carry_out(self):
+        self.run_program([0xA9, 0xFF, 0x69, 0x01], 4)
+
+        self.assertEquals(self.cpu.a, 0x00)
+        self.assertEquals((self.cpu.c, self.cpu.v, self.cpu.z), (1, 0, 1))
+
+    def test_add_decimal(self):
+        # 58 + 46 + 1 = 105
+        self.run_program([0xF8, 0x38, 0xA9, 0x58, 0x69, 0x46], 8)
+
+        self.assertEquals(self.cpu.a, 0x05)
+        self.assertEquals(self.cpu.c, 1)
+
+    def test_subtract_with_borrow(self):
+        self.run_program([0x38, 0xA9, 0x50, 0xE9, 0xB0], 6)
+
+        self.assertEquals(self.cpu.a, 0xA0)
+        self.assertEquals((self.cpu.c, self.cpu.v, self.cpu.n), (0, 1, 1))
+
+    def test_subtract_decimal(self):
+        # 46 - 12 - 1 = 33
+        self.run_program([0xF8, 0x18, 0xA9, 0x46, 0xE9, 0x12], 8)
+
+        self.assertEquals(self.cpu.a, 0x33)
+        self.assertEquals(self.cpu.c, 1)
+
+    def test_logical_operations(self):
+        self.run_program([0xA9, 0xF0, 0x29, 0x3C, 0x09, 0x01, 0x49, 0xFF], 8)
+
+        self.assertEquals(self.cpu.a, 0xCE)
+        self.assertEquals(self.cpu.n, 1)
+
+    def test_compare(self):
+        self.run_program([0xA9, 0x40, 0xC9, 0x40], 4)
+        self.assertEquals((self.cpu.c, self.cpu.z, self.cpu.n), (1, 1, 0))
+
+        self.run_program([0xA2, 0x10, 0xE0, 0x20], 4)
+        self.assertEquals((self.cpu.c, self.cpu.z, self.cpu.n), (0, 0, 1))
+
+    def test_bit(self):
+        self.cpu.memory.data[0x10] = 0xC0
+        self.run_program([0xA9, 0x01, 0x24, 0x10], 5)
+
+        self.assertEquals((self.cpu.n, self.cpu.v, self.cpu.z), (1, 1, 1))
+        self.assertEquals(self.cpu.a, 0x01)
+
+    def test_shifts(self):
+        self.cpu.memory.data[0x10] = 0x01
+        # LDA #$81, ASL A, ROR $10
+        self.run_program([0xA9, 0x81, 0x0A, 0x66, 0x10], 9)
+
+        self.assertEquals(self.cpu.a, 0x02)
+        self.assertEquals(self.cpu.memory.data[0x10], 0x80)
+        self.assertEquals(self.cpu.c, 1)
+        self.assertEquals(self.cpu.n, 1)
+        self.assertEquals(self.cpu.memory.dirty[0x00], 1)
+
+    def test_increment_and_decrement(self):
+        self.cpu.memory.data[0x10] = 0xFF
+        # INC $10, LDX #$00, DEX, INY
+        self.run_program([0xE6, 0x10, 0xA2, 0x00, 0xCA, 0xC8], 11)
+
+        self.assertEquals(self.cpu.memory.data[0x10], 0x00)
+        self.assertEquals(self.cpu.x, 0xFF)
+        self.assertEquals(self.cpu.y, 0x01)
+        self.assertEquals(self.cpu.taken_cycles, 11)
+
+    def test_branch_cycles(self):
+        # not taken, taken, taken across a page
+        self.run_program([0xB0, 0x10], 2)
+        self.assertEquals((self.cpu.pc, self.cpu.taken_cycles), (0x0602, 2))
+
+        self.run_program([0x90, 0x10], 3)
+        self.assertEquals((self.cpu.pc, self.cpu.taken_cycles), (0x0612, 3))
+
+        self.run_program([0x90, 0xFC], 4)
+        self.assertEquals((self.cpu.pc, self.cpu.taken_cycles), (0x05FE, 4))
+
+    def test_counting_loop(self):
+        # LDX #$05, DEX, BNE -3
+        self.run_program([0xA2, 0x05, 0xCA, 0xD0, 0xFD], 26)
+
+        self.assertEquals(self.cpu.x, 0)
+        self.assertEquals(self.cpu.pc, 0x0605)
+        self.assertEquals(self.cpu.taken_cycles, 2 + 5 * 2 + 4 * 3 + 2)
+
+    def test_absolute_x_page_crossing_penalty(self):
+        # LDX #$01, ADC $20FF,X
+        self.run_program([0xA2, 0x01, 0x7D, 0xFF, 0x20], 7)
+
+        self.assertEquals(self.cpu.taken_cycles, 7)
+
+    def test_jump_indirect_wraps_in_page(self):
+        self.cpu.memory.data[0x10FF] = 0x34
+        self.cpu.memory.data[0x1000] = 0x12
+        self.run_program([0x6C, 0xFF, 0x10], 5)
+
+        self.assertEquals(self.cpu.pc, 0x1234)
+
+    def test_subroutine(self):
+        # JSR $0610 ... $0610: RTS
+        self.cpu.memory.data[0x0610] = 0x60
+        self.run_program([0x20, 0x10, 0x06], 6)
+
+        self.assertEquals(self.cpu.pc, 0x0610)
+        self.assertEquals(self.cpu.memory.data[0x0100], 0x06)
+        self.assertEquals(self.cpu.memory.data[0x01FF], 0x02)
+
+        self.cpu.execute(6)
+        self.assertEquals(self.cpu.pc, 0x0603)
+        self.assertEquals(self.cpu.sp, 0x0100)
+
+    def test_stack_push_and_pull(self):
+        # LDA #$80, PHA, PHP, LDA #$00, PLP, PLA
+        self.run_program([0xA9, 0x80, 0x48, 0x08, 0xA9, 0x00, 0x28, 0x68], 18)
+
+        self.assertEquals(self.cpu.a, 0x80)
+        self.assertEquals(self.cpu.n, 1)
+        self.assertEquals(self.cpu.b, 0)
+        self.assertEquals(self.cpu.sp, 0x0100)
+        self.assertEquals(self.cpu.memory.data[0x01FF], 0x80 | 0x30)
+
+    def test_transfers(self):
+        # LDA #$FF, TAX, TXS, LDY #$00, TYA, TSX
+        self.run_program([0xA9, 0xFF, 0xAA, 0x9A, 0xA0, 0x00, 0x98, 0xBA], 12)
+
+        self.assertEquals(self.cpu.a, 0x00)
+        self.assertEquals(self.cpu.sp, 0x01FF)
+        self.assertEquals(self.cpu.x, 0xFF)
+        self.assertEquals(self.cpu.n, 1)
+
+    def test_flag_instructions(self):
+        # SEC, SED, SEI, CLC, CLD
+        self.run_program([0x38, 0xF8, 0x78, 0x18, 0xD8], 10)
+
+        self.assertEquals((self.cpu.c, self.cpu.d, self.cpu.i), (0, 0, 1))
+
+    def test_break_and_return(self):
+        self.cpu.memory.data[0xFFFE] = 0x00
+        self.cpu.memory.data[0xFFFF] = 0x07
+        self.cpu.memory.data[0x0700] = 0x40  # RTI
+        self.run_program([0x00, 0xEA, 0xEA], 7)
+
+        self.assertEquals(self.cpu.pc, 0x0700)
+        self.assertEquals(self.cpu.i, 1)
+        self.assertEquals(self.cpu.b, 0)
+        self.assertEquals(self.cpu.memory.data[0x01FE] & 0x10, 0x10)
+
+        self.cpu.execute(6)
+        self.assertEquals(self.cpu.pc, 0x0602)
+        self.assertEquals(self.cpu.i, 0)
+        self.assertEquals(self.cpu.taken_cycles, 13)
+
+    def test_zero_page_x_wraps(self):
+        self.cpu.memory.data[0x7F] = 0x42
+        # LDX #$FF, LDA $80,X
+        self.run_program([0xA2, 0xFF, 0xB5, 0x80], 6)
+
+        self.assertEquals(self.cpu.a, 0x42)
+
+    def test_zero_page_y_store_wraps(self):
+        # LDY #$02, LDX #$42, STX $FF,Y
+        self.run_program([0xA0, 0x02, 0xA2, 0x42, 0x96, 0xFF], 8)
+
+        self.assertEquals(self.cpu.memory.data[0x01], 0x42)
+        self.assertEquals(self.cpu.memory.data[0x0101], 0x00)
+
+    def test_indirect_x_pointer_wraps(self):
+        self.cpu.memory.data[0xFF] = 0x00
+        self.cpu.memory.data[0x00] = 0x20
+        self.cpu.memory.data[0x2000] = 0x42
+        # LDX #$01, LDA ($FE,X)
+        self.run_program([0xA2, 0x01, 0xA1, 0xFE], 8)
+
+        self.assertEquals(self.cpu.a, 0x42)
+
+    def test_indirect_y_wraps_at_top_of_memory(self):
+        self.cpu.memory.data[0x10] = 0xFF
+        self.cpu.memory.data[0x11] = 0xFF
+        self.cpu.memory.data[0x0001] = 0x42
+        # LDY #$02, LDA ($10),Y
+        self.run_program([0xA0, 0x02, 0xB1, 0x10], 8)
+
+        self.assertEquals(self.cpu.a, 0x42)
+        self.assertEquals(self.cpu.taken_cycles, 8)
+
+    def test_absolute_x_wraps_at_top_of_memory(self):
+        self.cpu.memory.data[0x0000] = 0x42
+        # LDX #$01, LDA $FFFF,X, STA $FFFF,X
+        self.run_program([0xA2, 0x01, 0xBD, 0xFF, 0xFF, 0x9D, 0xFF, 0xFF], 12)
+
+        self.assertEquals(self.cpu.a, 0x42)
+        self.assertEquals(self.cpu.taken_cycles, 12)
+
+    def test_program_counter_wraps(self):
+        self.cpu.reset()
+        self.cpu.memory.data[0xFFFF] = 0xA9
+        self.cpu.memory.data[0x0000] = 0x42
+        self.cpu.pc = 0xFFFF
+        self.cpu.execute(2)
+
+        self.assertEquals(self.cpu.a, 0x42)
+        self.assertEquals(self.cpu.pc, 0x0001)
+
+    def load_interrupt_program(self):
+        # main loop of NOPs at 0x0600, handlers at 0x0700 (IRQ) and 0x0800 (NMI)
+        self.cpu.reset()
+        self.cpu.memory.load(bytes([0xEA] * 16), 0x0600)
+        self.cpu.memory.load(bytes([0x00, 0x07]), 0xFFFE)
+        self.cpu.memory.load(bytes([0x00, 0x08]), 0xFFFA)
+        self.cpu.memory.data[0x0700] = 0x40  # RTI
+        self.cpu.memory.data[0x0800] = 0x40  # RTI
+        self.cpu.pc = 0x0600
+
+    def test_irq_entry(self):
+        self.load_interrupt_program()
+        self.cpu.execute(2)
+        self.cpu.assert_irq()
+
+        self.cpu.execute(7)
+
+        self.assertEquals(self.cpu.pc, 0x0700)
+        self.assertEquals(self.cpu.i, 1)
+        self.assertEquals(self.cpu.taken_cycles, 9)
+        self.assertEquals(self.cpu.memory.data[0x0100], 0x06)
+        self.assertEquals(self.cpu.memory.data[0x01FF], 0x01)
+        self.assertEquals(self.cpu.memory.data[0x01FE] & 0x30, 0x20)
+
+    def test_irq_masked(self):
+        self.load_interrupt_program()
+        self.cpu.i = 1
+        self.cpu.assert_irq()
+
+        self.cpu.execute(4)
+
+        self.assertEquals(self.cpu.pc, 0x0602)
+
+    def test_irq_is_level_triggered(self):
+        self.load_interrupt_program()
+        self.cpu.assert_irq(0x01)
+        self.cpu.assert_irq(0x02)
+        self.cpu.execute(7 + 6)
+
+        # back from RTI with the line still held, so straight back in
+        self.cpu.deassert_irq(0x01)
+        self.cpu.execute(7)
+        self.assertEquals(self.cpu.pc, 0x0700)
+
+        self.cpu.deassert_irq(0x02)
+        self.cpu.execute(6 + 2)
+        self.assertEquals(self.cpu.pc, 0x0601)
+        self.assertEquals(self.cpu.pending, 0)
+
+    def test_nmi_is_edge_triggered(self):
+        self.load_interrupt_program()
+        self.cpu.i = 1
+        self.cpu.trigger_nmi()
+
+        self.cpu.execute(7)
+        self.assertEquals(self.cpu.pc, 0x0800)
+
+        self.cpu.execute(6 + 2)
+        self.assertEquals(self.cpu.pc, 0x0601)
+        self.assertEquals(self.cpu.pending, 0)
+
+    def test_nmi_before_irq(self):
+        self.load_interrupt_program()
+        self.cpu.assert_irq()
+        self.cpu.trigger_nmi()
+
+        self.cpu.execute(7)
+
+        self.assertEquals(self.cpu.pc, 0x0800)
+
+    def test_run_until_interrupt_handler(self):
+        self.load_interrupt_program()
+        self.cpu.trigger_nmi()
+
+        result = self.cpu.run_until(pc=0x0800)
+
+        self.assertEquals(result, ('pc', 0x0800, 7, 0, 0, 0))
+
+    def test_read_word(self):
+        self.cpu.memory.data[0xFFFF] = 0x34
+        self.cpu.memory.data[0x0000] = 0x12
+
+        self.assertEquals(self.cpu.read_word(0xFFFF), 0x1234)
+        self.assertEquals(self.cpu.fetch_bytes_from_location(0xFFFF, 2), 0x1234)
+
+    def test_fetch_word(self):
+        self.cpu.memory.load(bytes([0x80, 0x25]), 0x0600)
+        self.cpu.pc = 0x0600
+
+        self.assertEquals(self.cpu.fetch_word(), 0x2580)
+        self.assertEquals(self.cpu.pc, 0x0602)
+
+    def test_jump_to_itself_stops_early(self):
+        # LDA #$01, JMP $0602
+        self.run_program([0xA9, 0x01, 0x4C, 0x02, 0x06], 1000)
+
+        self.assertEquals(self.cpu.trapped, 0x0602)
+        self.assertEquals(self.cpu.pc, 0x0602)
+        self.assertEquals(self.cpu.taken_cycles, 2 + 3 * 2)
+        self.assertEquals(self.cpu.a, 0x01)
+
+    def test_branch_to_itself_stops_early(self):
+        # LDX #$01, BNE *
+        self.run_program([0xA2, 0x01, 0xD0, 0xFE], 1000)
+
+        self.assertEquals(self.cpu.trapped, 0x0602)
+        self.assertEquals(self.cpu.taken_cycles, 2 + 3 * 2)
+
+    def test_idle_loop_stops_early(self):
+        # CLC, NOP, BCC $0600
+        self.run_program([0x18, 0xEA, 0x90, 0xFC], 1000)
+
+        self.assertEquals(self.cpu.trapped, 0x0600)
+        self.assertEquals(self.cpu.taken_cycles, 7 * 2)
+
+    def test_delay_loop_is_not_a_trap(self):
+        # LDX #$03, DEX, BNE $0602, JMP $0605
+        self.run_program([0xA2, 0x03, 0xCA, 0xD0, 0xFD, 0x4C, 0x05, 0x06], 1000)
+
+        self.assertEquals(self.cpu.trapped, 0x0605)
+        self.assertEquals(self.cpu.x, 0x00)
+        self.assertEquals(self.cpu.taken_cycles, 2 + 5 * 2 + 4 + 3 * 2)
+
+    def test_reset_forgets_loops(self):
+        # INC $10, JMP $0600 is busy, NOP, NOP, JMP $0600 in its place is not
+        self.run_program([0xE6, 0x10, 0x4C, 0x00, 0x06], 800)
+        self.run_program([0xEA, 0xEA, 0x4C, 0x00, 0x06], 100000)
+
+        self.assertEqual(self.cpu.trapped, 0x0600)
+        self.assertEqual(self.cpu.taken_cycles, 7 * 2)
+
+    def test_only_loops_run_are_classified(self):
+        # INC $10, JMP $0600
+        self.run_program([0xE6, 0x10, 0x4C, 0x00, 0x06], 800)
+
+        self.assertEqual(self.cpu.loops, {0x0605: LOOP_BUSY})
+
+    def test_restore_forgets_loops(self):
+        self.cpu.reset()
+        self.cpu.pc = 0x0600
+        snapshot = self.cpu.snapshot()
+        self.cpu.memory.load(bytes([0xE6, 0x10, 0x4C, 0x00, 0x06]), 0x0600)
+        self.cpu.execute(800)
+
+        self.cpu.restore(snapshot)
+        self.cpu.memory.load(bytes([0xEA, 0xEA, 0x4C, 0x00, 0x06]), 0x0600)
+        self.cpu.execute(100000)
+
+        self.assertEqual(self.cpu.trapped, 0x0600)
+        self.assertEqual(self.cpu.taken_cycles, 7 * 2)
+
+    def test_reentered_loop_is_not_a_trap(self):
+        # LDX #$02, DEX, BNE $0602, JMP $0600 comes round with X = 1 every time
+        self.run_program([0xA2, 0x02, 0xCA, 0xD0, 0xFD, 0x4C, 0x00, 0x06], 1000)
+
+        self.assertIsNone(self.cpu.trapped)
+        self.assertGreaterEqual(self.cpu.taken_cycles, 1000)
+
+    def test_loop_that_writes_is_not_a_trap(self):
+        # INC $10, JMP $0600
+        self.run_program([0xE6, 0x10, 0x4C, 0x00, 0x06], 800)
+
+        self.assertIsNone(self.cpu.trapped)
+        self.assertEquals(self.cpu.taken_cycles, 800)
+        self.assertEquals(self.cpu.memory.data[0x10], 100 % 256)
+
+    def test_idle_loop_waits_for_scheduled_event(self):
+        self.cpu.scheduler = Scheduler()
+        self.cpu.scheduler.at(400, lambda cycle: self.cpu.trigger_nmi())
+
+        # JMP $0600
+        self.run_program([0x4C, 0x00, 0x06], 300)
+
+        self.assertIsNone(self.cpu.trapped)
+        self.assertEquals(self.cpu.taken_cycles, 300)
+
+    def test_masked_irq_does_not_end_idle_loop(self):
+        self.cpu.reset()
+        self.cpu.memory.load(bytes([0x4C, 0x00, 0x06]), 0x0600)
+        self.cpu.pc = 0x0600
+        self.cpu.i = 1
+        self.cpu.assert_irq()
+
+        self.cpu.execute(300)
+
+        self.assertEquals(self.cpu.trapped, 0x0600)
+        self.assertEquals(self.cpu.taken_cycles, 6)
+
+    def test_stop_on_trap_off(self):
+        self.cpu.stop_on_trap = False
+
+        self.run_program([0x4C, 0x00, 0x06], 300)
+
+        self.assertIsNone(self.cpu.trapped)
+        self.assertEquals(self.cpu.taken_cycles, 300)
+
+    def test_run_until_trap(self):
+        self.cpu.reset()
+        self.cpu.memory.load(bytes([0xA9, 0x01, 0x4C, 0x02, 0x06]), 0x0600)
+        self.cpu.pc = 0x0600
+
+        result = self.cpu.run_until(cycles=1000)
+
+        self.assertEquals(result, ('trap', 0x0602, 8, 3, 0, 0))
+        self.assertEquals(self.cpu.trapped, 0x0602)
+
+    def test_run_until_trap_with_predicate(self):
+        self.cpu.reset()
+        self.cpu.memory.load(bytes([0xA9, 0x01, 0x4C, 0x02, 0x06]), 0x0600)
+        self.cpu.pc = 0x0600
+
+        result = self.cpu.run_until(cycles=1000, predicate=lambda cpu: False)
+
+        self.assertEquals(result, ('trap', 0x0602, 8, 3, 0, 0))
+
+    def load_poll_program(self, cpu, ready):
+        # LDA $10, BEQ $0600, LDX #$01, JMP $0606, with $10 set at cycle ready
+        cpu.reset()
+        cpu.memory.load(bytes([0xA5, 0x10, 0xF0, 0xFC, 0xA2, 0x01, 0x4C, 0x06, 0x06]), 0x0600)
+        cpu.memory.data[0x10] = 0
+        cpu.pc = 0x0600
+        cpu.scheduler = Scheduler()
+        cpu.scheduler.at(ready, lambda cycle: cpu.memory.data.__setitem__(0x10, 1))
+
+    def test_poll_loop_matches_stepping(self):
+        for budget in (100, 3001, 3002, 3003, 3004, 3005, 3006, 5000):
+            stepped = CPU()
+            self.load_poll_program(stepped, 3001)
+            expected = stepped.run_until(cycles=budget, predicate=lambda cpu: False)
+
+            self.load_poll_program(self.cpu, 3001)
+            self.cpu.execute(budget)
+            self.assertEqual((self.cpu.pc, self.cpu.a, self.cpu.x, self.cpu.taken_cycles),
+                             (stepped.pc, stepped.a, stepped.x, stepped.taken_cycles))
+
+            # the same stop, though some of the rounds were skipped rather than stepped
+            self.load_poll_program(self.cpu, 3001)
+            result = self.cpu.run_until(cycles=budget)
+            self.assertEqual(result[:4], expected[:4])
+            self.assertEqual(result.skipped_cycles, 3 * result.skipped_instructions)
+
+    def test_poll_loop_instruction_limit_matches_stepping(self):
+        for count in (10, 999, 1000, 1001):
+            stepped = CPU()
+            self.load_poll_program(stepped, 3001)
+            expected = stepped.run_until(instructions=count, predicate=lambda cpu: False)
+
+            self.load_poll_program(self.cpu, 3001)
+            result = self.cpu.run_until(instructions=count)
+            self.assertEqual(result[:4], expected[:4])
+            self.assertEqual(result.skipped_cycles, 3 * result.skipped_instructions)
+
+    def test_poll_loop_skips_to_event(self):
+        # far more rounds than could be stepped through
+        self.load_poll_program(self.cpu, 10 ** 12)
+
+        self.cpu.execute(2 * 10 ** 12)
+
+        self.assertEqual(self.cpu.trapped, 0x0606)
+        self.assertEqual(self.cpu.x, 0x01)
+        self.assertGreater(self.cpu.taken_cycles, 10 ** 12)
+
+    def test_poll_loop_breakpoint_is_not_skipped(self):
+        self.load_poll_program(self.cpu, 10 ** 12)
+
+        result = self.cpu.run_until(pc=0x0602, cycles=10 ** 6)
+
+        self.assertEqual(result, ('pc', 0x0602, 3, 1, 0, 0))
+
+    def test_poll_loop_on_device_is_stepped(self):
+        reads = []
+        self.load_poll_program(self.cpu, 10 ** 12)
+        bus = self.cpu.attach_bus()
+        bus.readers[0] = lambda address: reads.append(address) or 0
+
+        self.cpu.execute(600)
+
+        self.assertEqual(len(reads), 100)
+
+    def test_run_until_without_budget_traps_with_stop_on_trap_off(self):
+        self.cpu.reset()
+        self.cpu.stop_on_trap = False
+        self.cpu.memory.load(bytes([0x4C, 0x00, 0x06]), 0x0600)
+        self.cpu.pc = 0x0600
+
+        result = self.cpu.run_until(pc=0x9999)
+
+        self.assertEqual(result, ('trap', 0x0600, 6, 2, 0, 0))
+        self.assertEqual(self.cpu.trapped, 0x0600)
+
+    def test_run_until_instruction_limit_skips_with_stop_on_trap_off(self):
+        self.cpu.reset()
+        self.cpu.stop_on_trap = False
+        self.cpu.memory.load(bytes([0x4C, 0x00, 0x06]), 0x0600)
+        self.cpu.pc = 0x0600
+
+        result = self.cpu.run_until(instructions=10 ** 9)
+
+        # everything but the first two rounds and the last one skipped
+        self.assertEqual(result, ('instructions', 0x0600, 3 * 10 ** 9, 10 ** 9, 3 * (10 ** 9 - 3), 10 ** 9 - 3))
+        self.assertIsNone(self.cpu.trapped)
@@ -0,0 +1,54 @@
+import unittest
+from components.CPU import CPU, CYCLE_TABLE, OP_CODES, OPCODE_TABLE, PAGE_PENALTY
+from components.Instructions import INSTRUCTIONS, source
+
+
+class Test_Instructions(unittest.TestCase):
+
+    def test_documented_set_is_complete(self):
+        codes = [code for _, _, _, code, _ in INSTRUCTIONS]
+
+        self.assertEqual(len(codes), 151)
+        self.assertEqual(len(set(codes)), 151)
+
+    def test_every_row_has_a_handler(self):
+        for name, code in OP_CODES.items():
+            self.assertIs(OPCODE_TABLE[code], getattr(CPU, name.lower()))
+            self.assertIsNot(OPCODE_TABLE[code], CPU.unknown)
+
+    def test_cycle_table_from_rows(self):
+        for _, _, _, code, cycles in INSTRUCTIONS:
+            self.assertEqual(CYCLE_TABLE[code], cycles)
+        self.assertEqual(CYCLE_TABLE[0x02], 1)
+
+    def test_page_penalty_only_on_indexed_reads(self):
+        self.assertIn('LDA_ABX', PAGE_PENALTY)
+        self.assertIn('CMP_INY', PAGE_PENALTY)
+        self.assertNotIn('STA_ABX', PAGE_PENALTY)
+        self.assertNotIn('INC_ABX', PAGE_PENALTY)
+        self.assertEqual(len(PAGE_PENALTY), 23)
+
+    def test_handlers_are_flattened(self):
+        # no helper calls left on the common paths
+        for mnemonic, mode, register, _, _ in INSTRUCTIONS:
+            text = source(mnemonic, mode, register)
+            self.assertNotIn('fetch_byte', text)
+            self.assertNotIn('self.addr_', text)
+
+    def test_every_load_sets_flags_from_its_register(self):
+        cpu = CPU()
+        for name in ('LDA', 'LDX', 'LDY'):
+            for mnemonic, mode, register, code, cycles in INSTRUCTIONS:
+                if mnemonic != name:
+                    continue
+                cpu.reset()
+                cpu.memory.clear()
+                # every mode resolves to 0x80, which holds 0x80
+                cpu.memory.load(bytes([code, 0x80, 0x00]), 0x0600)
+                cpu.memory.data[0x80] = 0x80
+                cpu.pc = 0x0600
+                cpu.a = 0x01
+                cpu.execute(cycles)
+
+                self.assertEqual(getattr(cpu, register), 0x80, mode)
+                self.assertEqual((cpu.n, cpu.z), (1, 0), (mnemonic, mode))
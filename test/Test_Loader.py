@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+from components import Loader
+from components.CPU import CPU
+
+
+class Test_Loader(unittest.TestCase):
+
+    def setUp(self):
+        self.cpu = CPU()
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write_file(self, name, content):
+        path = os.path.join(self.dir.name, name)
+        mode = 'w' if isinstance(content, str) else 'wb'
+        with open(path, mode) as f:
+            f.write(content)
+        return path
+
+    def test_load_binary(self):
+        path = self.write_file('prog.bin', bytes([0xA9, 0x42, 0x85, 0x10]))
+
+        loaded = Loader.load_binary(self.cpu.memory, path, base=0x0600)
+
+        self.assertEqual(loaded, 4)
+        self.assertEqual(self.cpu.memory.dump(0x0600, 0x0604), bytes([0xA9, 0x42, 0x85, 0x10]))
+        self.assertEqual(self.cpu.memory.data[0xFFFC], 0x00)
+        self.assertEqual(self.cpu.memory.data[0xFFFD], 0x06)
+
+    def test_load_binary_and_run(self):
+        path = self.write_file('prog.bin', bytes([0xA9, 0x42, 0x85, 0x10]))
+
+        Loader.load(self.cpu.memory, path, base=0x0600)
+        self.cpu.reset(use_vector=True)
+        self.cpu.execute(5)
+
+        self.assertEqual(self.cpu.a, 0x42)
+        self.assertEqual(self.cpu.memory.data[0x10], 0x42)
+
+    def test_load_binary_without_reset(self):
+        path = self.write_file('prog.bin', bytes([0xEA]))
+
+        Loader.load_binary(self.cpu.memory, path, base=0x0600, reset=False)
+
+        self.assertEqual(self.cpu.memory.data[0xFFFC], 0)
+        self.assertEqual(self.cpu.memory.data[0xFFFD], 0)
+
+    def test_load_binary_keeps_own_reset_vector(self):
+        rom = bytearray(0x8000)
+        rom[0x7FFC] = 0x00
+        rom[0x7FFD] = 0x90
+        path = self.write_file('rom.bin', bytes(rom))
+
+        Loader.load(self.cpu.memory, path, base=0x8000)
+
+        self.assertEqual(self.cpu.memory.data[0xFFFC], 0x00)
+        self.assertEqual(self.cpu.memory.data[0xFFFD], 0x90)
+
+    def test_load_empty_binary(self):
+        path = self.write_file('empty.bin', b'')
+
+        self.assertEqual(Loader.load_binary(self.cpu.memory, path, base=0x0600), 0)
+
+    def test_load_binary_too_large(self):
+        path = self.write_file('big.bin', bytes(0x200))
+
+        with self.assertRaises(ValueError):
+            Loader.load_binary(self.cpu.memory, path, base=0xFF00)
+
+    def test_load_ines_single_bank_mirrored(self):
+        prg = bytearray(0x4000)
+        prg[0] = 0xA9
+        prg[0x3FFC] = 0x00
+        prg[0x3FFD] = 0xC0
+        header = b'NES\x1a' + bytes([1, 0, 0, 0]) + bytes(8)
+        path = self.write_file('game.nes', header + bytes(prg))
+
+        loaded = Loader.load(self.cpu.memory, path)
+
+        self.assertEqual(loaded, 0x4000)
+        self.assertEqual(self.cpu.memory.data[0x8000], 0xA9)
+        self.assertEqual(self.cpu.memory.data[0xC000], 0xA9)
+        self.assertEqual(self.cpu.memory.data[0xFFFC], 0x00)
+        self.assertEqual(self.cpu.memory.data[0xFFFD], 0xC0)
+
+    def test_load_ines_skips_trainer(self):
+        prg = bytes([0x42]) * 0x8000
+        header = b'NES\x1a' + bytes([2, 0, 0x04, 0]) + bytes(8)
+        path = self.write_file('game.nes', header + bytes(512) + prg)
+
+        Loader.load_ines(self.cpu.memory, path)
+
+        self.assertEqual(self.cpu.memory.data[0x8000], 0x42)
+        self.assertEqual(self.cpu.memory.data[0xFFFF], 0x42)
+
+    def test_load_ines_bad_magic(self):
+        path = self.write_file('bad.nes', bytes(32))
+
+        with self.assertRaises(ValueError):
+            Loader.load_ines(self.cpu.memory, path)
+
+    def test_load_hex(self):
+        path = self.write_file('prog.hex', '\n'.join([
+            ':04060000A942851076',
+            ':0400000500000600F1',
+            ':00000001FF',
+        ]))
+
+        loaded = Loader.load(self.cpu.memory, path)
+
+        self.assertEqual(loaded, 4)
+        self.assertEqual(self.cpu.memory.dump(0x0600, 0x0604), bytes([0xA9, 0x42, 0x85, 0x10]))
+        self.assertEqual(self.cpu.memory.data[0xFFFC], 0x00)
+        self.assertEqual(self.cpu.memory.data[0xFFFD], 0x06)
+
+    def test_load_hex_bad_checksum(self):
+        path = self.write_file('prog.hex', ':04060000A942851077\n:00000001FF\n')
+
+        with self.assertRaises(ValueError):
+            Loader.load_hex(self.cpu.memory, path)
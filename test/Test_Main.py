@@ -0,0 +1,120 @@
+import argparse
+import contextlib
+import importlib.util
+import io
+import os
+import tempfile
+import unittest
+
+# the CLI lives in the package's __main__.py, loaded under another name
+spec = importlib.util.spec_from_file_location('cli', os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                                                                  '__main__.py'))
+cli = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(cli)
+
+
+class Test_Main(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, image):
+        path = os.path.join(self.dir.name, 'program.bin')
+        with open(path, 'wb') as f:
+            f.write(bytes(image))
+        return path
+
+    def run_cli(self, *argv):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            cli.main(list(argv))
+        return out.getvalue()
+
+    def test_address(self):
+        self.assertEqual(cli.address('$1234'), 0x1234)
+        self.assertEqual(cli.address('0x0600'), 0x0600)
+        self.assertEqual(cli.address('256'), 0x0100)
+
+    def test_address_out_of_range(self):
+        with self.assertRaises(argparse.ArgumentTypeError):
+            cli.address('$10000')
+
+    def test_memory_range(self):
+        self.assertEqual(cli.memory_range('$10:$1F'), (0x10, 0x1F))
+        self.assertEqual(cli.memory_range('$0200'), (0x0200, 0x02FF))
+        self.assertEqual(cli.memory_range('$FFF0'), (0xFFF0, 0xFFFF))
+
+    def test_memory_range_backwards(self):
+        with self.assertRaises(argparse.ArgumentTypeError):
+            cli.memory_range('$20:$10')
+
+    def test_run_until_pc(self):
+        # LDA #$42, STA $10, JMP $0604
+        path = self.write([0xA9, 0x42, 0x85, 0x10, 0x4C, 0x04, 0x06])
+
+        out = self.run_cli('run', path, '--base', '$0600', '--start', '$0600', '--until', '$0604',
+                           '--registers', '--dump', '$10:$10')
+
+        self.assertIn('stopped on pc at 0604', out)
+        self.assertIn('PC:0604 A:42', out)
+        self.assertIn('0010  42', out)
+
+    def test_run_stops_in_idle_loop_without_budget(self):
+        path = self.write([0xA9, 0x42, 0x85, 0x10, 0x4C, 0x04, 0x06])
+
+        out = self.run_cli('run', path, '--base', '$0600', '--start', '$0600', '--until', '$9999')
+
+        self.assertIn('stopped on trap at 0604', out)
+        self.assertIn('4 instructions, 11 cycles', out)
+
+    def test_run_spends_cycle_budget(self):
+        path = self.write([0x4C, 0x00, 0x06])
+
+        out = self.run_cli('run', path, '--base', '$0600', '--start', '$0600', '--cycles', '300')
+
+        self.assertIn('stopped on cycles at 0600', out)
+        self.assertIn('100 instructions, 300 cycles', out)
+        # the first two rounds and the last one are run, the rest only counted
+        self.assertIn('97 instructions, 291 cycles skipped in idle loops', out)
+
+    def test_run_trap_with_cycle_budget(self):
+        path = self.write([0x4C, 0x00, 0x06])
+
+        out = self.run_cli('run', path, '--base', '$0600', '--start', '$0600', '--cycles', '300', '--trap')
+
+        self.assertIn('stopped on trap at 0600', out)
+
+    def test_run_rom_from_its_own_reset_vector(self):
+        # LDA #$42, JMP $9002 at $9000, reached through the ROM's vector
+        rom = bytearray(0x8000)
+        rom[0x1000:0x1005] = [0xA9, 0x42, 0x4C, 0x02, 0x90]
+        rom[0x7FFC:0x7FFE] = [0x00, 0x90]
+        path = self.write(rom)
+
+        out = self.run_cli('run', path, '--base', '$8000', '--trap', '--registers')
+
+        self.assertIn('stopped on trap at 9002', out)
+        self.assertIn('PC:9002 A:42', out)
+
+    def test_run_missing_file(self):
+        with self.assertRaises(SystemExit) as raised:
+            self.run_cli('run', os.path.join(self.dir.name, 'missing.bin'), '--cycles', '10')
+
+        self.assertIn('cannot load', str(raised.exception))
+
+    def test_run_image_does_not_fit(self):
+        path = self.write(bytes(10))
+
+        with self.assertRaises(SystemExit) as raised:
+            self.run_cli('run', path, '--base', '$FFF8', '--start', '$0600', '--cycles', '10')
+
+        self.assertIn('does not fit', str(raised.exception))
+
+    def test_run_needs_a_stop_condition(self):
+        path = self.write([0xEA])
+
+        with self.assertRaises(SystemExit):
+            self.run_cli('run', path)
@@ -0,0 +1,120 @@
+import unittest
+from components.Memory import Memory, MAX_MEMORY
+
+
+class Test_Memory(unittest.TestCase):
+
+    def setUp(self):
+        self.memory = Memory()
+
+    def test_memory_size(self):
+        self.assertEqual(len(self.memory), MAX_MEMORY)
+        self.assertEqual(len(self.memory.data), 0x10000)
+
+    def test_memory_starts_cleared(self):
+        self.assertEqual(self.memory.data.count(0), MAX_MEMORY)
+
+    def test_store_wraps_value_to_byte(self):
+        self.memory[0x10] = 0x142
+
+        self.assertEqual(self.memory[0x10], 0x42)
+
+    def test_store_wraps_address(self):
+        self.memory.write(0x10010, 0x42)
+
+        self.assertEqual(self.memory.data[0x0010], 0x42)
+
+    def test_data_rejects_non_bytes(self):
+        with self.assertRaises(TypeError):
+            self.memory.data[0x10] = 'X'
+
+    def test_view_slice_copy(self):
+        self.memory.view[0x2000:0x2003] = bytes([0xA9, 0x42, 0xEA])
+
+        self.assertEqual(self.memory.data[0x2000], 0xA9)
+        self.assertEqual(self.memory.data[0x2001], 0x42)
+        self.assertEqual(self.memory.data[0x2002], 0xEA)
+
+    def test_dump(self):
+        self.memory.data[0x80] = 0x42
+        self.memory.data[0x81] = 0x24
+
+        self.assertEqual(self.memory.dump(0x80, 0x82), b'\x42\x24')
+
+    def test_clear(self):
+        self.memory.data[0x80] = 0x42
+        self.memory.clear()
+
+        self.assertEqual(self.memory.data[0x80], 0)
+        self.assertEqual(len(self.memory.data), MAX_MEMORY)
+
+    def test_load(self):
+        loaded = self.memory.load(bytes([0xA9, 0x42]), 0x0600)
+
+        self.assertEqual(loaded, 2)
+        self.assertEqual(self.memory.data[0x0600], 0xA9)
+        self.assertEqual(self.memory.data[0x0601], 0x42)
+
+    def test_load_up_to_end_of_memory(self):
+        self.memory.load(bytes([0x34, 0x12]), 0xFFFE)
+
+        self.assertEqual(self.memory.data[0xFFFF], 0x12)
+
+    def test_load_past_end_of_memory(self):
+        with self.assertRaises(ValueError):
+            self.memory.load(bytes(3), 0xFFFE)
+
+    def test_write_marks_page_dirty(self):
+        self.memory.write(0x2580, 0x42)
+
+        self.assertEqual(list(self.memory.dirty_pages()), [0x25])
+
+    def test_load_marks_pages_dirty(self):
+        self.memory.load(bytes(0x102), 0x20FF)
+
+        self.assertEqual(list(self.memory.dirty_pages()), [0x20, 0x21, 0x22])
+
+    def test_snapshot_and_restore(self):
+        self.memory.write(0x10, 0x42)
+        pages = self.memory.snapshot()
+
+        self.memory.write(0x10, 0x24)
+        self.memory.write(0x2580, 0x24)
+        self.memory.restore(pages)
+
+        self.assertEqual(self.memory.data[0x10], 0x42)
+        self.assertEqual(self.memory.data[0x2580], 0)
+        self.assertEqual(list(self.memory.dirty_pages()), [])
+
+    def test_snapshot_shares_clean_pages(self):
+        first = self.memory.snapshot()
+        self.memory.write(0x2580, 0x42)
+        second = self.memory.snapshot()
+
+        self.assertIsNot(first[0x25], second[0x25])
+        self.assertIs(first[0x24], second[0x24])
+        self.assertEqual(second[0x25][0x80], 0x42)
+
+    def test_restore_copies_only_dirty_pages(self):
+        pages = self.memory.snapshot()
+        # an untracked poke into a clean page survives the restore
+        self.memory.data[0x3000] = 0x99
+        self.memory.write(0x2580, 0x42)
+
+        self.memory.restore(pages)
+
+        self.assertEqual(self.memory.data[0x2580], 0)
+        self.assertEqual(self.memory.data[0x3000], 0x99)
+
+    def test_restore_older_snapshot(self):
+        self.memory.write(0x10, 0x01)
+        first = self.memory.snapshot()
+        self.memory.write(0x2580, 0x02)
+        self.memory.snapshot()
+        self.memory.write(0x4000, 0x03)
+
+        self.memory.restore(first)
+
+        self.assertEqual(self.memory.data[0x10], 0x01)
+        self.assertEqual(self.memory.data[0x2580], 0)
+        self.assertEqual(self.memory.data[0x4000], 0)
@@ -0,0 +1,72 @@
+import json
+import unittest
+from components.CPU import CPU
+from components.Profiler import Profiler
+from components.Trace import TraceBuffer
+
+PROGRAM = bytes([
+    0xA9, 0x42,        # LDA #$42
+    0x85, 0x10,        # STA $10
+    0xBD, 0x02, 0x44,  # LDA $4402,X
+    0xB1, 0x20,        # LDA ($20),Y
+    0xA9, 0x24,        # LDA #$24
+])
+
+
+class Test_Profiler(unittest.TestCase):
+
+    def setUp(self):
+        self.cpu = CPU()
+        self.cpu.reset()
+        self.cpu.memory.load(PROGRAM, 0x0600)
+        self.cpu.memory.load(bytes([0x80, 0x25]), 0x0020)
+        self.cpu.pc = 0x0600
+        self.cpu.x = 0xFF
+        self.cpu.y = 0xFF
+        self.cpu.profiler = Profiler()
+
+    def test_counts(self):
+        self.cpu.execute(18)
+
+        profiler = self.cpu.profiler
+        self.assertEqual(profiler.op_hits[0xA9], 2)
+        self.assertEqual(profiler.op_cycles(0xA9), 4)
+        self.assertEqual(profiler.op_cycles(0xBD), 5)
+        self.assertEqual(profiler.op_penalty[0xBD], 1)
+        self.assertEqual(profiler.op_penalty[0xB1], 1)
+        self.assertEqual(profiler.pc_hits[0x0604], 1)
+        self.assertEqual(profiler.pc_cycles[0x0607], 6)
+
+    def test_report(self):
+        self.cpu.execute(18)
+
+        report = self.cpu.profiler.report(top=2)
+
+        self.assertEqual(report['instructions'], 5)
+        self.assertEqual(report['cycles'], self.cpu.taken_cycles)
+        self.assertEqual([row['name'] for row in report['opcodes']], ['LDA_INY', 'LDA_ABX'])
+        self.assertEqual([row['pc'] for row in report['addresses']], [0x0607, 0x0604])
+        self.assertEqual(report['page_crossing'], {'ABX': 1, 'ABY': 0, 'INY': 1})
+
+    def test_json_and_text(self):
+        self.cpu.execute(18)
+
+        self.assertEqual(json.loads(self.cpu.profiler.to_json())['instructions'], 5)
+        text = self.cpu.profiler.to_text()
+        self.assertIn('LDA_INY', text)
+        self.assertIn('0x0607', text)
+
+    def test_clear(self):
+        self.cpu.execute(18)
+
+        self.cpu.profiler.clear()
+
+        self.assertEqual(self.cpu.profiler.report()['instructions'], 0)
+
+    def test_profile_and_trace_together(self):
+        self.cpu.trace = TraceBuffer(16)
+
+        self.cpu.execute(18)
+
+        self.assertEqual(len(self.cpu.trace), 5)
+        self.assertEqual(self.cpu.profiler.report()['instructions'], 5)
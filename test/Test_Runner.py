@@ -0,0 +1,82 @@
+import unittest
+from multiprocessing import shared_memory
+from components import Runner as runner_module
+from components.Runner import Job, Runner, attach, run_jobs
+
+
+def program(value, address):
+    # LDA #value, STA address
+    return bytes([0xA9, value, 0x8D, address & 0xFF, address >> 8])
+
+
+class Test_Runner(unittest.TestCase):
+
+    def test_run_jobs(self):
+        jobs = [Job(program(value, 0x2000 + value), {'pc': 0x0600}, 6, base=0x0600) for value in range(1, 9)]
+
+        results = run_jobs(jobs, workers=2)
+
+        self.assertEqual(len(results), 8)
+        for value, result in enumerate(results, 1):
+            self.assertEqual(result.registers['a'], value)
+            self.assertEqual(result.registers['pc'], 0x0605)
+            self.assertEqual(result.registers['taken_cycles'], 6)
+            self.assertEqual(result.memory[0x2000 + value], value)
+
+    def test_jobs_do_not_share_memory(self):
+        jobs = [Job(program(value, 0x2000 + value), {'pc': 0x0600}, 6, base=0x0600) for value in range(1, 9)]
+
+        results = run_jobs(jobs, workers=2, chunksize=4)
+
+        for value, result in enumerate(results, 1):
+            written = [addr for addr in range(0x2000, 0x2010) if result.memory[addr]]
+            self.assertEqual(written, [0x2000 + value])
+
+    def test_register_state_is_applied(self):
+        # STX $10 with X from the job's register state
+        jobs = [(bytes([0x86, 0x10]), {'pc': 0x0600, 'x': 0x42}, 3, 0x0600)]
+
+        result = run_jobs(jobs, workers=1)[0]
+
+        self.assertEqual(result.memory[0x10], 0x42)
+        self.assertEqual(result.registers['x'], 0x42)
+
+    def test_runner_reused_between_runs(self):
+        with Runner(workers=2) as runner:
+            first = runner.run([Job(program(1, 0x2000), {'pc': 0x0600}, 6, base=0x0600)])
+            second = runner.run([Job(program(2, 0x2000), {'pc': 0x0600}, 6, base=0x0600)])
+
+        self.assertEqual(first[0].memory[0x2000], 1)
+        self.assertEqual(second[0].memory[0x2000], 2)
+        self.assertEqual(second[0].registers['taken_cycles'], 6)
+
+    def test_no_jobs(self):
+        self.assertEqual(run_jobs([], workers=1), [])
+
+    def test_trap_status_returned(self):
+        # LDA #$01, JMP $0602, then a job that never traps on the same worker
+        jobs = [(bytes([0xA9, 0x01, 0x4C, 0x02, 0x06]), {'pc': 0x0600}, 1000, 0x0600),
+                (program(1, 0x2000), {'pc': 0x0600}, 6, 0x0600)]
+
+        results = run_jobs(jobs, workers=1)
+
+        self.assertEqual(results[0].registers['trapped'], 0x0602)
+        self.assertEqual(results[0].registers['taken_cycles'], 8)
+        self.assertIsNone(results[1].registers['trapped'])
+
+    def test_batch_blocks_attached_once(self):
+        images = shared_memory.SharedMemory(create=True, size=16)
+        results = shared_memory.SharedMemory(create=True, size=16)
+        try:
+            first = attach(images.name, results.name)
+            second = attach(images.name, results.name)
+
+            self.assertIs(first, second)
+            self.assertEqual(list(runner_module._worker_blocks), [(images.name, results.name)])
+        finally:
+            for block in runner_module._worker_blocks.pop((images.name, results.name), ()):
+                block.close()
+            images.close()
+            images.unlink()
+            results.close()
+            results.unlink()
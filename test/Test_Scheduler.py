@@ -0,0 +1,121 @@
+import unittest
+from components.CPU import CPU
+from components.Scheduler import NEVER, Scheduler
+from components.Translator import BlockCache
+
+
+class Test_Scheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = Scheduler()
+        self.fired = []
+
+    def record(self, name):
+        return lambda cycle: self.fired.append((name, cycle))
+
+    def test_empty_scheduler_never_due(self):
+        self.assertEqual(self.scheduler.deadline, NEVER)
+        self.scheduler.run(1000)
+        self.assertEqual(self.fired, [])
+
+    def test_events_fire_in_deadline_order(self):
+        self.scheduler.every(30, self.record('slow'))
+        self.scheduler.every(20, self.record('fast'))
+
+        self.assertEqual(self.scheduler.deadline, 20)
+        self.scheduler.run(60)
+
+        self.assertEqual(self.fired, [('fast', 20), ('slow', 30), ('fast', 40), ('slow', 60), ('fast', 60)])
+        self.assertEqual(self.scheduler.deadline, 80)
+
+    def test_one_shot_event(self):
+        self.scheduler.at(50, self.record('once'))
+        self.scheduler.run(49)
+        self.scheduler.run(120)
+
+        self.assertEqual(self.fired, [('once', 50)])
+        self.assertEqual(self.scheduler.deadline, NEVER)
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_cancel(self):
+        event = self.scheduler.every(10, self.record('tick'))
+        self.scheduler.at(25, self.record('once'))
+        self.scheduler.cancel(event)
+
+        self.assertEqual(self.scheduler.deadline, 25)
+        self.scheduler.run(100)
+        self.assertEqual(self.fired, [('once', 25)])
+
+    def test_period_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            self.scheduler.every(0, self.record('tick'))
+
+    def load_nops(self, cpu):
+        cpu.reset()
+        cpu.memory.load(bytes([0xEA] * 0x100), 0x0600)
+        cpu.pc = 0x0600
+        cpu.scheduler = self.scheduler
+
+    def test_execute_services_deadlines(self):
+        cpu = CPU()
+        self.load_nops(cpu)
+        self.scheduler.every(7, lambda cycle: self.fired.append(cpu.taken_cycles))
+
+        cpu.execute(20)
+
+        # NOPs take 2 cycles, so each deadline is seen at the next even count
+        self.assertEqual(self.fired, [8, 14])
+        self.assertEqual(cpu.taken_cycles, 20)
+
+    def test_execute_stops_where_it_would_without_events(self):
+        cpu = CPU()
+        self.load_nops(cpu)
+        self.scheduler.every(3, self.record('tick'))
+
+        cpu.execute(9)
+
+        self.assertEqual(cpu.taken_cycles, 10)
+        self.assertEqual(cpu.pc, 0x0605)
+
+    def test_timer_interrupt(self):
+        cpu = CPU()
+        self.load_nops(cpu)
+        cpu.memory.load(bytes([0x00, 0x07]), 0xFFFE)
+        self.scheduler.at(10, lambda cycle: cpu.assert_irq())
+
+        cpu.execute(17)
+
+        self.assertEqual(cpu.pc, 0x0700)
+        self.assertEqual(cpu.taken_cycles, 17)
+
+    def test_run_until_services_deadlines(self):
+        cpu = CPU()
+        self.load_nops(cpu)
+        self.scheduler.every(10, self.record('tick'))
+
+        result = cpu.run_until(cycles=30)
+
+        self.assertEqual(result.reason, 'cycles')
+        self.assertEqual(self.fired, [('tick', 10), ('tick', 20), ('tick', 30)])
+        self.assertEqual(result.instructions, 15)
+
+    def test_run_until_instruction_limit_on_deadline(self):
+        cpu = CPU()
+        self.load_nops(cpu)
+        self.scheduler.every(4, self.record('tick'))
+
+        result = cpu.run_until(instructions=2)
+
+        self.assertEqual(result, ('instructions', 0x0602, 4, 2, 0, 0))
+        self.assertEqual(self.fired, [('tick', 4)])
+
+    def test_block_cache_services_deadlines(self):
+        cpu = CPU()
+        self.load_nops(cpu)
+        cpu.memory.load(bytes([0xA9, 0x01] * 8), 0x0600)
+        self.scheduler.every(8, self.record('tick'))
+
+        BlockCache(cpu, threshold=1).execute(32)
+
+        self.assertEqual([cycle for _, cycle in self.fired], [8, 16, 24, 32])
+        self.assertEqual(cpu.taken_cycles, 32)
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from components.CPU import CPU
+from components.Trace import RECORD, TraceBuffer, TraceFile, read_trace
+
+PROGRAM = bytes([
+    0xA9, 0x42,        # LDA #$42
+    0x85, 0x10,        # STA $10
+    0xBD, 0x02, 0x44,  # LDA $4402,X
+    0x91, 0x20,        # STA ($20),Y
+])
+
+
+class Test_Trace(unittest.TestCase):
+
+    def setUp(self):
+        self.cpu = CPU()
+        self.cpu.reset()
+        self.cpu.memory.load(PROGRAM, 0x0600)
+        self.cpu.pc = 0x0600
+
+    def test_records(self):
+        self.cpu.trace = TraceBuffer(16)
+
+        self.cpu.execute(15)
+
+        records = list(self.cpu.trace)
+        self.assertEqual(len(records), 4)
+        self.assertEqual([r.pc for r in records], [0x0600, 0x0602, 0x0604, 0x0607])
+        self.assertEqual([r.cycle for r in records], [0, 2, 5, 9])
+        self.assertEqual(records[1].a, 0x42)
+        self.assertEqual((records[2].opcode, records[2].lo, records[2].hi), (0xBD, 0x02, 0x44))
+
+    def test_trace_does_not_change_execution(self):
+        plain = CPU()
+        plain.reset()
+        plain.memory.load(PROGRAM, 0x0600)
+        plain.pc = 0x0600
+        plain.execute(15)
+
+        self.cpu.trace = TraceBuffer(16)
+        self.cpu.execute(15)
+
+        self.assertEqual((self.cpu.pc, self.cpu.a, self.cpu.p, self.cpu.taken_cycles),
+                         (plain.pc, plain.a, plain.p, plain.taken_cycles))
+        self.assertEqual(self.cpu.memory.data, plain.memory.data)
+
+    def test_ring_keeps_newest(self):
+        self.cpu.trace = TraceBuffer(3)
+
+        self.cpu.execute(15)
+
+        records = list(self.cpu.trace)
+        self.assertEqual(len(self.cpu.trace), 3)
+        self.assertEqual([r.pc for r in records], [0x0602, 0x0604, 0x0607])
+
+    def test_disassemble(self):
+        self.cpu.trace = TraceBuffer(16)
+
+        self.cpu.execute(15)
+
+        lines = list(self.cpu.trace.disassemble())
+        self.assertTrue(lines[0].startswith('0600  A9 42     LDA #$42'))
+        self.assertIn('LDA $4402,X', lines[2])
+        self.assertIn('STA ($20),Y', lines[3])
+        self.assertIn('A:42', lines[1])
+        self.assertTrue(lines[3].endswith('CYC:9'))
+
+    def test_disassemble_unknown_code(self):
+        self.cpu.memory.load(bytes([0x02]), 0x0600)
+        self.cpu.trace = TraceBuffer(16)
+
+        self.cpu.execute(1)
+
+        self.assertIn('.byte $02', next(self.cpu.trace.disassemble()))
+
+    def test_trace_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'run.trace')
+            with TraceFile(path, chunk=3) as sink:
+                self.cpu.trace = sink
+                self.cpu.execute(15)
+                self.assertEqual(len(sink), 4)
+
+            self.assertEqual(os.path.getsize(path), 4 * RECORD.size)
+            records = list(read_trace(path))
+
+        self.assertEqual([r.pc for r in records], [0x0600, 0x0602, 0x0604, 0x0607])
@@ -0,0 +1,221 @@
+import unittest
+from components.CPU import CPU
+from components.Scheduler import Scheduler
+from components.Translator import BlockCache
+
+PROGRAM = bytes([
+    0xA9, 0x42,        # LDA #$42
+    0x85, 0x10,        # STA $10
+    0xA2, 0x04,        # LDX #$04
+    0x95, 0x20,        # STA $20,X
+    0xA0, 0x10,        # LDY #$10
+    0xB9, 0xF8, 0x25,  # LDA $25F8,Y
+    0x91, 0x30,        # STA ($30),Y
+    0xA1, 0x2C,        # LDA ($2C,X)
+    0xB4, 0x20,        # LDY $20,X
+    0x8C, 0x00, 0x30,  # STY $3000
+])
+
+
+class Test_Translator(unittest.TestCase):
+
+    def setUp(self):
+        self.cpu = CPU()
+        self.cache = BlockCache(self.cpu, threshold=1)
+
+    def make_cpu(self):
+        cpu = CPU()
+        cpu.reset()
+        cpu.pc = 0x0600
+        cpu.memory.load(PROGRAM, 0x0600)
+        cpu.memory.data[0x2608] = 0x80
+        cpu.memory.data[0x30] = 0x80
+        cpu.memory.data[0x31] = 0x40
+        return cpu
+
+    def assert_same_state(self, cpu, expected):
+        self.assertEqual((cpu.pc, cpu.a, cpu.x, cpu.y), (expected.pc, expected.a, expected.x, expected.y))
+        self.assertEqual((cpu.z, cpu.n, cpu.taken_cycles), (expected.z, expected.n, expected.taken_cycles))
+        self.assertEqual(cpu.memory.data, expected.memory.data)
+
+    def test_block_matches_interpreter(self):
+        expected = self.make_cpu()
+        expected.execute(38)
+
+        cpu = self.make_cpu()
+        cache = BlockCache(cpu, threshold=1)
+        cache.execute(38)
+
+        self.assert_same_state(cpu, expected)
+        self.assertEqual(list(cache.blocks), [0x0600])
+        self.assertEqual(cache.blocks[0x0600].instructions, 10)
+
+    def test_block_reused_from_cache(self):
+        cpu = self.make_cpu()
+        cache = BlockCache(cpu, threshold=1)
+        cache.execute(38)
+        block = cache.blocks[0x0600]
+
+        cpu.pc = 0x0600
+        cache.execute(38)
+
+        self.assertIs(cache.blocks[0x0600], block)
+        self.assertEqual(cpu.taken_cycles, 76)
+
+    def test_small_budget_falls_back_to_interpreter(self):
+        expected = self.make_cpu()
+        expected.execute(5)
+
+        cpu = self.make_cpu()
+        BlockCache(cpu, threshold=1).execute(5)
+
+        self.assert_same_state(cpu, expected)
+
+    def test_page_crossing_penalty(self):
+        self.cpu.reset()
+        self.cpu.memory.load(bytes([0xBD, 0x02, 0x44]), 0x0600)
+        self.cpu.memory.data[0x4501] = 0x42
+        self.cpu.pc = 0x0600
+        self.cpu.x = 0xFF
+
+        self.cache.execute(5)
+
+        self.assertEqual(self.cpu.a, 0x42)
+        self.assertEqual(self.cpu.taken_cycles, 5)
+
+    def test_store_into_block_invalidates_it(self):
+        # STA $0604 rewrites the operand of the LDA #$01 that follows it
+        self.cpu.reset()
+        self.cpu.memory.load(bytes([0x8D, 0x04, 0x06, 0xA9, 0x01]), 0x0600)
+        self.cpu.pc = 0x0600
+        self.cpu.a = 0x42
+
+        self.cache.execute(6)
+
+        self.assertEqual(self.cpu.a, 0x42)
+        self.assertEqual(self.cpu.pc, 0x0605)
+        self.assertEqual(self.cpu.taken_cycles, 6)
+        self.assertNotIn(0x0600, self.cache.blocks)
+
+    def test_store_outside_block_keeps_it(self):
+        self.cpu.reset()
+        self.cpu.memory.load(bytes([0x8D, 0x00, 0x20]), 0x0600)
+        self.cpu.pc = 0x0600
+
+        self.cache.execute(4)
+
+        self.assertIn(0x0600, self.cache.blocks)
+        self.assertEqual(self.cache.code[0x0600], 1)
+        self.assertEqual(self.cache.code[0x2000], 0)
+
+    def test_unknown_code_ends_block(self):
+        self.cpu.reset()
+        self.cpu.memory.load(bytes([0xA9, 0x42, 0x02]), 0x0600)
+        self.cpu.pc = 0x0600
+
+        self.cache.execute(3)
+
+        self.assertEqual(self.cache.blocks[0x0600].end, 0x0602)
+        self.assertEqual(self.cpu.b, 1)
+        self.assertEqual(self.cpu.taken_cycles, 3)
+
+    def test_clear(self):
+        self.cpu.reset()
+        self.cpu.memory.load(bytes([0xA9, 0x42]), 0x0600)
+        self.cpu.pc = 0x0600
+        self.cache.execute(2)
+
+        self.cache.clear()
+
+        self.assertEqual(self.cache.blocks, {})
+        self.assertEqual(self.cache.code[0x0600], 0)
+
+    def test_cold_code_is_interpreted(self):
+        cache = BlockCache(self.cpu)
+        self.cpu.reset()
+        self.cpu.memory.load(bytes([0xA9, 0x42]), 0x0600)
+
+        self.cpu.pc = 0x0600
+        cache.execute(2)
+        self.assertEqual(cache.blocks, {})
+
+        self.cpu.pc = 0x0600
+        cache.execute(2)
+        self.assertIn(0x0600, cache.blocks)
+        self.assertEqual(self.cpu.a, 0x42)
+
+    def test_interpreted_store_into_block_invalidates_it(self):
+        # INC $0601 is not translated, but still rewrites the LDA #$01 block
+        self.cpu.reset()
+        self.cpu.memory.load(bytes([0xA9, 0x01, 0xEE, 0x01, 0x06]), 0x0600)
+        self.cpu.pc = 0x0600
+        self.cache.execute(2)
+        self.assertIn(0x0600, self.cache.blocks)
+
+        self.cache.execute(6)
+        self.assertNotIn(0x0600, self.cache.blocks)
+
+        self.cpu.pc = 0x0600
+        self.cache.execute(2)
+        self.assertEqual(self.cpu.a, 0x02)
+
+    def test_block_wraps_like_interpreter(self):
+        self.cpu.memory.data[0x7F] = 0x42
+        self.cpu.memory.data[0xFF] = 0x00
+        self.cpu.memory.data[0x00] = 0x20
+        # LDX #$FF, LDA $80,X, STA ($00,X)
+        self.cpu.reset()
+        self.cpu.memory.load(bytes([0xA2, 0xFF, 0xB5, 0x80, 0x81, 0x00]), 0x0600)
+        self.cpu.pc = 0x0600
+        self.cache.execute(12)
+
+        self.assertIn(0x0600, self.cache.blocks)
+        self.assertEqual(self.cpu.a, 0x42)
+        self.assertEqual(self.cpu.memory.data[0x2000], 0x42)
+
+    def test_interrupt_between_blocks(self):
+        self.cpu.reset()
+        self.cpu.memory.load(bytes([0xA9, 0x01]), 0x0600)
+        self.cpu.memory.load(bytes([0x00, 0x07]), 0xFFFE)
+        self.cpu.pc = 0x0600
+        self.cache.execute(2)
+
+        self.cpu.pc = 0x0600
+        self.cpu.assert_irq()
+        self.cache.execute(7)
+
+        self.assertEqual(self.cpu.pc, 0x0700)
+        self.assertEqual(self.cpu.taken_cycles, 9)
+
+    def test_stops_in_idle_loop(self):
+        # LDA #$01, STA $10, JMP $0604
+        self.cpu.reset()
+        self.cpu.memory.load(bytes([0xA9, 0x01, 0x85, 0x10, 0x4C, 0x04, 0x06]), 0x0600)
+        self.cpu.pc = 0x0600
+
+        self.cache.execute(1000)
+
+        self.assertEqual(self.cpu.trapped, 0x0604)
+        self.assertEqual(self.cpu.taken_cycles, 2 + 3 + 3 * 2)
+        self.assertEqual(self.cpu.memory.data[0x10], 0x01)
+
+    def test_poll_loop_matches_interpreter(self):
+        # LDA $10, BEQ $0600, LDX #$01, STX $11, JMP $0600, $10 set at cycle 3001
+        def make():
+            cpu = CPU()
+            cpu.reset()
+            cpu.memory.load(bytes([0xA5, 0x10, 0xF0, 0xFC, 0xA2, 0x01, 0x86, 0x11, 0x4C, 0x00, 0x06]), 0x0600)
+            cpu.pc = 0x0600
+            cpu.scheduler = Scheduler()
+            cpu.scheduler.at(3001, lambda cycle: cpu.memory.data.__setitem__(0x10, 1))
+            return cpu
+
+        expected = make()
+        expected.execute(5000)
+
+        cpu = make()
+        BlockCache(cpu, threshold=1).execute(5000)
+
+        self.assertEqual((cpu.pc, cpu.a, cpu.x, cpu.taken_cycles),
+                         (expected.pc, expected.a, expected.x, expected.taken_cycles))
+        self.assertEqual(cpu.memory.data[0x11], 0x01)
@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+import unittest
+from components.Vectors import Harness, read_cases, run_files, vector_files
+
+
+def state(pc, a, p, ram, s=0xFD):
+    return {'pc': pc, 's': s, 'a': a, 'x': 0, 'y': 0, 'p': p, 'ram': ram}
+
+
+# LDA #$B6
+LDA = {
+    'name': 'a9 b6',
+    'initial': state(0x1234, 0x00, 0x24, [[0x1234, 0xA9], [0x1235, 0xB6]]),
+    'final': state(0x1236, 0xB6, 0xA4, [[0x1234, 0xA9], [0x1235, 0xB6]]),
+    'cycles': [[0x1234, 0xA9, 'read'], [0x1235, 0xB6, 'read']],
+}
+
+# STA $10
+STA = {
+    'name': '85 10',
+    'initial': state(0x0600, 0x42, 0x24, [[0x0600, 0x85], [0x0601, 0x10], [0x0010, 0x00]]),
+    'final': state(0x0602, 0x42, 0x24, [[0x0600, 0x85], [0x0601, 0x10], [0x0010, 0x42]]),
+    'cycles': [[0x0600, 0x85, 'read'], [0x0601, 0x10, 'read'], [0x0010, 0x42, 'write']],
+}
+
+
+class Test_Vectors(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, name, cases):
+        path = os.path.join(self.dir.name, name)
+        with open(path, 'w') as f:
+            json.dump(cases, f, indent=1)
+        return path
+
+    def test_case_passes(self):
+        harness = Harness()
+
+        self.assertEqual(harness.run(LDA), [])
+        self.assertEqual(harness.run(STA), [])
+
+    def test_case_fails(self):
+        wrong = json.loads(json.dumps(STA))
+        wrong['final']['ram'][2][1] = 0x43
+        wrong['cycles'].append([0x0010, 0x42, 'write'])
+
+        errors = Harness().run(wrong)
+
+        self.assertEqual(errors, ['$0010 0x42, expected 0x43', '3 cycles, expected 4'])
+
+    def test_memory_put_back_between_cases(self):
+        harness = Harness()
+        harness.run(STA)
+
+        self.assertEqual(harness.cpu.memory.data[0x10], 0x00)
+        self.assertEqual(harness.cpu.memory.data[0x0600], 0x00)
+
+    def test_read_cases_across_chunks(self):
+        path = self.write('a9.json', [LDA, STA] * 3)
+
+        cases = list(read_cases(path, chunk=7))
+
+        self.assertEqual(cases, [LDA, STA] * 3)
+
+    def test_read_cases_truncated(self):
+        path = self.write('a9.json', [LDA])
+        with open(path, 'r+') as f:
+            f.truncate(os.path.getsize(path) - 5)
+
+        with self.assertRaises(ValueError):
+            list(read_cases(path, chunk=16))
+
+    def test_vector_files_skip_undocumented(self):
+        self.write('a9.json', [LDA])
+        self.write('85.json', [STA])
+        self.write('02.json', [])
+
+        names = [os.path.basename(path) for path in vector_files(self.dir.name)]
+
+        self.assertEqual(names, ['85.json', 'a9.json'])
+
+    def test_run_files_in_parallel(self):
+        wrong = json.loads(json.dumps(LDA))
+        wrong['final']['a'] = 0xB7
+        paths = [self.write('a9.json', [LDA] * 20 + [wrong]), self.write('85.json', [STA] * 20)]
+
+        results = run_files(paths, workers=2)
+
+        self.assertEqual([(result.passed, result.failed) for result in results], [(20, 1), (20, 0)])
+        self.assertEqual(results[0].failures, [('a9 b6', ['a 0xb6, expected 0xb7'])])